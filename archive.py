@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# columnar archive of the closed weeks: the rows of the week tables
+# older than a cutoff are written as one NumPy .npy file per column,
+# partitioned by year (<archive>/<table>/<year>/<column>.npy), and read
+# back memory-mapped; the cutoff is kept in <archive>/manifest.json,
+# the archive holds the weeks before it and SQLite the weeks from it on
+# (with --compact the archived weeks are deleted from SQLite)
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from maitri_db import db, open_db
+from param import archive_dir, archive_keep_weeks
+from repository import bump_week_versions, ALL_WEEKS, ARCHIVED_LAST_PERFORMED_TABLE, UNTIMED_TASKS
+from repository import get_assignment_weeks, get_week_assignments, get_week_assignments_timed, get_week_people
+
+# the archived tables with the NumPy type of every column
+ARCHIVE_COLUMNS = {
+    'requests': {
+        'week_start_date': 'datetime64[D]', 'person_id': 'int64',
+        'days_in_town': 'int64', 'dishes_am': 'int64', 'dishes_pm': 'int64',
+        'cook_meal': 'int64', 'sous_chef': 'int64', 'meal_cleanup': 'int64',
+        'night_sweep': 'int64',
+    },
+    'hours': {
+        'week_start_date': 'datetime64[D]', 'person_id': 'int64',
+        'days_in_town': 'float64', 'hours_worked': 'float64',
+        'target_hours': 'float64', 'leftover_hours': 'float64',
+    },
+    'assignments': {
+        'week_start_date': 'datetime64[D]', 'person_id': 'int64',
+        'task_type': 'U10', 'task_id': 'int64',
+    },
+    'assignments_timed': {
+        'week_start_date': 'datetime64[D]', 'person_id': 'int64',
+        'weekday': 'int64', 'task_id': 'int64',
+    },
+}
+
+def get_cutoff(directory: str = archive_dir):
+    # the first week that is not in the archive, None without archive
+    path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return date.fromisoformat(json.load(f)['cutoff'])
+
+def partition_years(directory: str, table: str):
+    path = os.path.join(directory, table)
+    if not os.path.isdir(path):
+        return []
+    return sorted(int(year) for year in os.listdir(path) if year.isdigit())
+
+def read_partition(directory: str, table: str, year: int) -> dict:
+    # the memory-mapped columns of a year, keys are the column names
+    path = os.path.join(directory, table, str(year))
+    return {
+        column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode = 'r')
+        for column in ARCHIVE_COLUMNS[table]
+    }
+
+def write_partition(directory: str, table: str, year: int, columns: dict):
+    # the files of a year are written next to the old ones and swapped
+    # in with renames, so a reader sees either the old or the new year
+    path = os.path.join(directory, table, str(year))
+    os.makedirs(os.path.join(directory, table), exist_ok = True)
+    shutil.rmtree(path + '.new', ignore_errors = True)
+    os.makedirs(path + '.new')
+    for column, values in columns.items():
+        np.save(os.path.join(path + '.new', f'{column}.npy'), values)
+    if os.path.exists(path):
+        os.rename(path, path + '.old')
+    os.rename(path + '.new', path)
+    shutil.rmtree(path + '.old', ignore_errors = True)
+
+def to_columns(table: str, rows: pd.DataFrame) -> dict:
+    return {
+        column: rows[column].to_numpy().astype(dtype)
+        for column, dtype in ARCHIVE_COLUMNS[table].items()
+    }
+
+def to_frame(table: str, columns: dict) -> pd.DataFrame:
+    # the archived rows as the SQLite rows (dates as YYYY-MM-DD text)
+    return pd.DataFrame({
+        column: np.asarray(values).astype(str) if column == 'week_start_date' else np.asarray(values)
+        for column, values in columns.items()
+    }, columns = list(ARCHIVE_COLUMNS[table]))
+
+def export_weeks(con, cutoff: date, directory: str = archive_dir, compact: bool = False) -> dict:
+    # archive the weeks before cutoff one year at a time, the years
+    # already archived before the previous cutoff are only extended;
+    # returns the number of rows archived per table
+    old_cutoff = get_cutoff(directory)
+    if old_cutoff is not None and cutoff < old_cutoff:
+        raise ValueError(f'The archive already holds the weeks before {old_cutoff}')
+    exported = {}
+    for table, dtypes in ARCHIVE_COLUMNS.items():
+        start = old_cutoff or date.fromisoformat(con.execute(
+            f"SELECT MIN(week_start_date) FROM {table} WHERE week_start_date != 'NaT'"
+        ).fetchone()[0] or str(cutoff))
+        exported[table] = 0
+        for year in range(start.year, cutoff.year + 1):
+            first = max(start, date(year, 1, 1))
+            last = min(cutoff, date(year + 1, 1, 1))
+            if first >= last:
+                continue
+            rows = pd.read_sql(
+                con = con, params = (str(first), str(last)),
+                sql = f"""SELECT {', '.join(dtypes)} FROM {table}
+                WHERE week_start_date >= ? AND week_start_date < ?
+                ORDER BY week_start_date, rowid"""
+            )
+            if rows.empty:
+                continue
+            columns = to_columns(table, rows)
+            if year in partition_years(directory, table):
+                # rows of these weeks left by an interrupted export are
+                # replaced
+                archived = read_partition(directory, table, year)
+                keep = archived['week_start_date'] < np.datetime64(first, 'D')
+                columns = {
+                    column: np.concatenate((archived[column][keep], values))
+                    for column, values in columns.items()
+                }
+            write_partition(directory, table, year, columns)
+            exported[table] += len(rows)
+    os.makedirs(directory, exist_ok = True)
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump({'cutoff': str(cutoff)}, f)
+    if compact:
+        # the latest week of the tasks whose assignments are deleted here
+        # goes to archived_last_performed, task_last_performed falls back
+        # to it when their later weeks are planned again; the table is
+        # created in the transaction of the deletes
+        if not con.in_transaction:
+            con.execute('BEGIN')
+        with con:
+            con.execute(ARCHIVED_LAST_PERFORMED_TABLE)
+            con.execute("""
+                INSERT INTO archived_last_performed (task_type, task_id, week_start_date)
+                SELECT task_type, task_id, MAX(week_start_date) FROM assignments
+                WHERE week_start_date < ? GROUP BY task_type, task_id
+                ON CONFLICT (task_type, task_id) DO UPDATE
+                SET week_start_date = MAX(week_start_date, excluded.week_start_date)""",
+                (str(cutoff),)
+            )
+            for table in ARCHIVE_COLUMNS:
+                con.execute(f'DELETE FROM {table} WHERE week_start_date < ?', (str(cutoff),))
+            bump_week_versions(con, [ALL_WEEKS])
+        con.execute('VACUUM')
+    return exported
+
+def read_weeks(con, table: str, first_monday = None, last_monday = None,
+               directory: str = archive_dir) -> pd.DataFrame:
+    # the rows of table between the two mondays (both included, default
+    # all), the weeks before the archive cutoff from the archive and
+    # the others from SQLite
+    first = np.datetime64(str(first_monday or '0001-01-01'), 'D')
+    last = np.datetime64(str(last_monday or '9999-12-31'), 'D')
+    cutoff = get_cutoff(directory)
+    frames = []
+    if cutoff is not None:
+        for year in partition_years(directory, table):
+            if not first.astype(object).year <= year <= last.astype(object).year:
+                continue
+            columns = read_partition(directory, table, year)
+            keep = (columns['week_start_date'] >= first) & (columns['week_start_date'] <= last)
+            if keep.any():
+                frames.append(to_frame(table, {
+                    column: values[keep] for column, values in columns.items()
+                }))
+        first = max(first, np.datetime64(cutoff, 'D'))
+    frames.append(pd.read_sql(
+        con = con, params = (str(first), str(last)),
+        sql = f"""SELECT {', '.join(ARCHIVE_COLUMNS[table])} FROM {table}
+        WHERE week_start_date BETWEEN ? AND ? ORDER BY week_start_date, rowid"""
+    ))
+    frames = [frame for frame in frames if not frame.empty] or frames[-1:]
+    return pd.concat(frames, ignore_index = True)
+
+def is_archived(monday, directory: str = archive_dir) -> bool:
+    # whether the week is read from the archive, after a compaction
+    # SQLite no longer has it
+    cutoff = get_cutoff(directory)
+    return cutoff is not None and str(monday) < str(cutoff)
+
+def read_assignment_weeks(con, directory: str = archive_dir) -> list:
+    # the mondays with assignments in the archive or in SQLite, in order
+    weeks = set(get_assignment_weeks(con))
+    cutoff = get_cutoff(directory)
+    if cutoff is not None:
+        for year in partition_years(directory, 'assignments'):
+            mondays = read_partition(directory, 'assignments', year)['week_start_date']
+            weeks.update(np.unique(mondays[mondays < np.datetime64(cutoff, 'D')]).astype(str))
+    return sorted(weeks)
+
+def read_week_chores(con, monday, directory: str = archive_dir) -> tuple:
+    # (assignments, timed assignments, people) of the week as
+    # get_week_assignments, get_week_assignments_timed and
+    # get_week_people return them; an archived week is read from the
+    # archive (in the order it was written) and joined with the catalog
+    if not is_archived(monday, directory):
+        return (get_week_assignments(con, monday), get_week_assignments_timed(con, monday),
+                get_week_people(con, monday))
+    people = pd.read_sql(con = con, sql = "SELECT id AS person_id, first_name FROM people")
+    untimed_tasks = pd.read_sql(con = con, sql = f"""
+        SELECT task_type, id AS task_id, task, category, description, duration_hours
+        FROM ({UNTIMED_TASKS})""")
+    daily_tasks = pd.read_sql(con = con, sql = """
+        SELECT id AS task_id, task, category, description, duration_hours FROM daily_tasks""")
+    assign = read_weeks(con, 'assignments', monday, monday, directory)
+    assign_timed = read_weeks(con, 'assignments_timed', monday, monday, directory)
+    # the people in the order they first appear, first in the
+    # assignments and then in the timed assignments
+    order = pd.concat((assign.person_id, assign_timed.person_id)).drop_duplicates()
+    # an inner merge keeps the order of the left rows
+    return (
+        assign.merge(untimed_tasks, on = ['task_type', 'task_id']).merge(people, on = 'person_id'),
+        assign_timed.merge(daily_tasks, on = 'task_id').merge(people, on = 'person_id'),
+        pd.DataFrame({'person_id': order.to_numpy()}).merge(people, on = 'person_id'),
+    )
+
+def task_counts(con, first_monday = None, last_monday = None,
+                directory: str = archive_dir) -> pd.DataFrame:
+    # how many times each person was assigned each task between the two
+    # mondays, the daily tasks have task type 'daily'; e.g. who cooked
+    # least is the task_id of 'House Meal' sorted by count
+    untimed = read_weeks(con, 'assignments', first_monday, last_monday, directory)
+    timed = read_weeks(con, 'assignments_timed', first_monday, last_monday, directory)
+    chores = pd.concat((
+        untimed[['person_id', 'task_type', 'task_id']],
+        timed[['person_id', 'task_id']].assign(task_type = 'daily'),
+    ), ignore_index = True)
+    return chores.groupby(['person_id', 'task_type', 'task_id']).size().rename('count').reset_index()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--archive', default = archive_dir, help = 'archive directory')
+    parser.add_argument('--before', type = str, default = None,
+                        help = f'archive the weeks before this monday (default {archive_keep_weeks} weeks ago)')
+    parser.add_argument('--compact', action = 'store_true',
+                        help = 'delete the archived weeks from the database')
+    args = parser.parse_args()
+    if args.before is None:
+        today = date.today()
+        cutoff = today - timedelta(days = today.weekday() + 7*archive_keep_weeks)
+    else:
+        cutoff = date.fromisoformat(args.before)
+    with open_db(args.db) as con:
+        exported = export_weeks(con, cutoff, args.archive, args.compact)
+    con.close()
+    print(f'Archived the weeks before {cutoff}:', exported)
@@ -1,61 +1,275 @@
-from maitri_db import tables
-from maitri_db import db
+from maitri_db import db, open_db
 from param import *
 import pandas as pd
 import numpy as np
-import sqlite3
 from typing import List
-import re
 import sys
+import time
 from collections import defaultdict
-from datetime import date, timedelta, datetime
+from datetime import date, timedelta
 import yaml
+import argparse
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from optimal_assign import solve_assignment
+import repository
 
-def get_max_gap(days: List[int]) -> int:
-    # calculate the largest circular gap between days
+# availability is stored as a 7-bit mask, Monday is the most
+# significant bit, e.g. 0101101 is the binary for 45 and means
+# available on Tue, Thu, Fri, and Sun
+DAY_BIT = tuple(1 << (6 - day) for day in range(7))
+ALL_DAYS = 127
+# lookup tables indexed by the availability mask
+POPCOUNT = np.array([bin(mask).count('1') for mask in range(128)], dtype = np.uint8)
+MASK_DAYS = tuple(
+    tuple(day for day in range(7) if mask & DAY_BIT[day]) for mask in range(128)
+)
+# the trash has to be taken out on Wednesday and Thursday
+TRASH_DAYS = DAY_BIT[2] | DAY_BIT[3]
+
+def get_gaps(days: List[int]) -> List[int]:
+    # calculate the circular gaps between days
     days = sorted(days)
     num_days = len(days)
     days.append(days[0] + 7)
-    return max(days[i+1] - days[i] for i in range(num_days))
+    return [days[i+1] - days[i] for i in range(num_days)]
+
+def get_max_gap(days: List[int]) -> int:
+    # calculate the largest circular gap between days
+    return max(get_gaps(days))
+
+# largest gap between meals for every subset of the week, a single
+# meal (or none) leaves a gap of the whole week
+MAX_GAP = np.array(
+    [get_max_gap(MASK_DAYS[mask]) if mask else 7 for mask in range(128)],
+    dtype = np.uint8
+)
+# non-empty subsets of the week from the best meal schedule to the
+# worst: most meals, then the smallest largest gap, then the most even
+# spacing, then the earliest days
+MEAL_SCHEDULES = tuple(sorted(
+    range(1, 128),
+    key = lambda mask: (
+        -int(POPCOUNT[mask]), int(MAX_GAP[mask]),
+        sum(gap**2 for gap in get_gaps(MASK_DAYS[mask])), -mask
+    )
+))
+
+def days_to_mask(days: List[int]) -> int:
+    mask = 0
+    for day in days:
+        mask |= DAY_BIT[day]
+    return mask
 
 def count_avail_days(request: int) -> int:
-    return np.binary_repr(request, 7).count('1')
+    return int(POPCOUNT[request & ALL_DAYS])
 
 def get_weekdays(request: int) -> List[int]:
-    # request int is the integer value of the binary representation of
-    # availablility, e.g. 0101101 is the binary for 45 and means
-    # available on Tue, Thu, Fri, and Sun
     # this function returns a list of day integers Monday is 0
-    return [match.span()[0] for match in
-            re.finditer('1', np.binary_repr(request, 7))]
+    return list(MASK_DAYS[request & ALL_DAYS])
+
+def choose_meal_days(cook_ids, cook_masks, clean_ids, clean_masks):
+    # exact search over the subsets of the week for the meal schedule
+    # with the most meals and the smallest largest gap; every cook
+    # makes at most one meal and every meal day needs two cleaners
+    # other than the cooks; returns a dict with the cook person_ids
+    # as keys and the meal day as values, in the order of cook_ids
+    clean_mask_of = dict(zip(clean_ids, clean_masks))
+    # days on which each cook would be missing from the cleaners
+    cook_cleans = [clean_mask_of.get(person_id, 0) for person_id in cook_ids]
+    num_cleaners = [
+        sum(1 for mask in clean_masks if mask & DAY_BIT[day]) for day in range(7)
+    ]
+    # days that have two cleaners before any cook is taken out
+    coverage = days_to_mask(day for day in range(7) if num_cleaners[day] >= 2)
+    cookable = 0
+    for mask in cook_masks:
+        cookable |= mask
+
+    def search(schedule, days, used, counts):
+        # assign a cook to days[0] and recurse on the rest, returns a
+        # dict with cook indices as keys and days as values
+        if not days:
+            return {}
+        day, tried = days[0], set()
+        for k, (mask, cleans) in enumerate(zip(cook_masks, cook_cleans)):
+            if k in used or not mask & DAY_BIT[day]:
+                continue
+            # cooks that look the same on this schedule are interchangeable
+            signature = (mask & schedule, cleans & schedule)
+            if signature in tried:
+                continue
+            tried.add(signature)
+            if cleans & schedule:
+                new_counts = [
+                    count - bool(cleans & DAY_BIT[d]) for d, count in enumerate(counts)
+                ]
+                if any(new_counts[d] < 2 for d in MASK_DAYS[schedule]):
+                    continue
+            else:
+                new_counts = counts
+            found = search(schedule, days[1:], used | {k}, new_counts)
+            if found is not None:
+                found[k] = day
+                return found
+        return None
 
-def get_table(con, table):
-    return pd.read_sql(con=con, sql=f"SELECT * FROM {table}")
+    for schedule in MEAL_SCHEDULES:
+        if POPCOUNT[schedule] > len(cook_ids) or schedule & ~(coverage & cookable):
+            continue
+        # start with the days that have the fewest cooks
+        days = sorted(
+            MASK_DAYS[schedule],
+            key = lambda day: sum(1 for mask in cook_masks if mask & DAY_BIT[day])
+        )
+        found = search(schedule, days, frozenset(), num_cleaners)
+        if found is not None:
+            return {cook_ids[k]: found[k] for k in sorted(found)}
+    return {}
 
 def get_people_and_days(values):
-    # returns a pd.Series with person_id as index and days lists as
-    # values
-    day = values.apply(get_weekdays).rename('day')
-    num_days = day.apply(len).rename('num_days')
-    return pd.concat(
-        (day, num_days),
-        axis = 1
+    # returns a pd.DataFrame with person_id as index, the uint8
+    # availability mask and the number of available days
+    mask = values.fillna(0).to_numpy(dtype = np.int64).astype(np.uint8) & ALL_DAYS
+    return pd.DataFrame(
+        {'mask': mask, 'num_days': POPCOUNT[mask].astype(np.int64)},
+        index = values.index
     ).sort_values('num_days').query('num_days > 0')
 
-def merge_prefs(people, avail_df, pref_df, task_name):
-    return avail_df.merge(
-        pref_df[pref_df.task == task_name][['person_id', 'preference']],
-        left_index = True,
-        right_on = 'person_id',
-        how = 'left'
-    ).merge(
-        people[['chore_hours']],
-        right_index = True,
-        left_on = 'person_id',
-        how = 'left'
-    ).sort_values(
-        ['chore_hours', 'preference'], ascending = False
-    ).set_index('person_id')
+class SolverState:
+    # remaining chore hours of the people being scheduled, kept in a
+    # flat float64 array indexed by slot so that every phase can read
+    # and update a person in O(1) instead of going through people.loc
+    __slots__ = ('ids', 'slot', 'hours')
+
+    def __init__(self, people, target_hours):
+        self.ids = people.index.to_numpy()
+        self.slot = {person_id: i for i, person_id in enumerate(self.ids.tolist())}
+        self.hours = target_hours.reindex(people.index).fillna(0).to_numpy(
+            dtype = np.float64, copy = True
+        )
+
+    def remaining(self, person_id) -> float:
+        # people that are not being scheduled have no hours
+        idx = self.slot.get(person_id)
+        return 0. if idx is None else self.hours[idx]
+
+    def has_hours(self, person_id, duration) -> bool:
+        return self.remaining(person_id) >= duration
+
+    def charge(self, person_id, duration):
+        self.hours[self.slot[person_id]] -= duration
+
+    def refund(self, person_id, duration):
+        self.hours[self.slot[person_id]] += duration
+
+    def slots_of(self, person_ids) -> np.ndarray:
+        # slots for an array of person ids, -1 for unknown ids
+        return np.fromiter(
+            (self.slot.get(person_id, -1) for person_id in person_ids),
+            dtype = np.int64, count = len(person_ids)
+        )
+
+    def hours_at(self, slots) -> np.ndarray:
+        # remaining hours for an array of slots, NaN for unknown slots
+        return np.append(self.hours, np.nan)[slots]
+
+    def hours_series(self) -> pd.Series:
+        return pd.Series(self.hours, index = self.ids, name = 'chore_hours')
+
+# the phase reported to a progress callback when a lap of solve_week
+# ends, i.e. the phase whose work starts next (solve_week starts with
+# 'setup'); the cleanup laps stay in 'cleanup' and 'finish' ends it
+PROGRESS_PHASES = {
+    'setup': 'meals',
+    'meals': 'cleanup',
+    'sweep': 'weekly',
+    'weekly': 'dishes',
+    'dishes': 'seasonal',
+    'seasonal': 'occasional',
+    'occasional': 'scoring',
+}
+
+class PhaseClock:
+    # accumulates the seconds spent in each phase of solve_week into
+    # a dict and tells progress(phase) which phase of PROGRESS_PHASES
+    # starts, does nothing without them
+    __slots__ = ('timings', 'progress', 'last')
+
+    def __init__(self, timings = None, progress = None):
+        self.timings = timings
+        self.progress = progress
+        if progress is not None:
+            progress('setup')
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        if self.progress is not None and phase in PROGRESS_PHASES:
+            self.progress(PROGRESS_PHASES[phase])
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.) + now - self.last
+        self.last = now
+
+class PreferenceMatrix:
+    # dense person x task preference matrix built once per run, rows
+    # are the people with requests this week and columns are the task
+    # names, missing preferences are NaN
+    __slots__ = ('row', 'col', 'values', 'state_slots', 'roles', 'cache')
+
+    def __init__(self, preferences, person_ids, state):
+        person_ids = pd.unique(np.asarray(person_ids))
+        self.row = {person_id: i for i, person_id in enumerate(person_ids.tolist())}
+        tasks = preferences.task.unique()
+        self.col = {task: j for j, task in enumerate(tasks)}
+        self.values = np.full((len(person_ids), len(tasks)), np.nan)
+        prefs = preferences[preferences.person_id.isin(self.row.keys())]
+        self.values[
+            prefs.person_id.map(self.row).to_numpy(dtype = np.int64),
+            prefs.task.map(self.col).to_numpy(dtype = np.int64)
+        ] = prefs.preference.to_numpy(dtype = np.float64)
+        self.state_slots = state.slots_of(person_ids)
+        # keys are role names, values are (rows, person_ids, masks)
+        # arrays in the order of the availability frame
+        self.roles = {}
+        # keys are (role, task), values are the sort keys for preference
+        self.cache = {}
+
+    def add_role(self, role, avail):
+        rows = np.fromiter(
+            (self.row[person_id] for person_id in avail.index),
+            dtype = np.int64, count = len(avail)
+        )
+        self.roles[role] = (rows, avail.index.to_numpy(), avail['mask'].to_numpy())
+
+    def rank(self, role, task, state, duration = None):
+        # returns the person ids, availability masks and preferences
+        # of the people in the role ordered by remaining hours and then
+        # preference, both descending with NaN last and ties in the
+        # order of the availability frame; if a duration is given only
+        # people with enough hours and a positive preference are kept
+        rows, person_ids, masks = self.roles[role]
+        if (role, task) not in self.cache:
+            col = self.col.get(task)
+            pref = self.values[rows, col] if col is not None \
+                else np.full(len(rows), np.nan)
+            self.cache[role, task] = (pref, np.where(np.isnan(pref), np.inf, -pref))
+        pref, pref_key = self.cache[role, task]
+        hours = state.hours_at(self.state_slots[rows])
+        order = np.lexsort((pref_key, np.where(np.isnan(hours), np.inf, -hours)))
+        if duration is not None:
+            order = order[(hours[order] >= duration) & (pref[order] > 0)]
+        return person_ids[order], masks[order], pref[order]
+
+    def role_preferences(self, role, tasks):
+        # (people x tasks) preferences of the people in the role
+        rows, _, _ = self.roles[role]
+        cols = [self.col.get(task, -1) for task in tasks]
+        values = np.append(self.values, np.full((len(self.values), 1), np.nan), axis = 1)
+        return values[np.ix_(rows, cols)]
 
 def append_timed_rows(assign_dict, task_id, monday, rows):
     for person_id, days in assign_dict.items():
@@ -89,8 +303,9 @@ def get_hours_worked(monday, assignments, assignments_timed,
     )
     hours_timed = timed.groupby('person_id').duration_hours.sum()
     frames = []
-    for task_type in ['daily', 'weekly', 'seasonal', 'occasional']:
-        df = eval(task_type)[['id', 'duration_hours']].copy()
+    task_tables = {'daily': daily, 'weekly': weekly, 'seasonal': seasonal, 'occasional': occasional}
+    for task_type, tasks in task_tables.items():
+        df = tasks[['id', 'duration_hours']].copy()
         df['task_type'] = task_type
         frames.append(df)
     chores = assignments.query(
@@ -106,8 +321,11 @@ def get_hours_worked(monday, assignments, assignments_timed,
 def calc_target_hours(people, days_in_town, deficit):
     # compute the maximum number of hours each person can work
     max_hours = max_weekly_person_hours*(people.load_fraction*days_in_town/7).fillna(0)
-    # if a person is not in town, igonre them
-    deficit.loc[max_hours[max_hours == 0].index] = 0
+    # people without last week's hours (new, or not planned last week)
+    # have no deficit rather than no target, and if a person is not in
+    # town, igonre them
+    deficit = deficit.reindex(max_hours.index).fillna(0)
+    deficit[max_hours == 0] = 0
     # compute factors
     factors = len(max_hours)*(max_hours + deficit)/(max_hours + deficit).sum()
     target_hours = max_hours*factors
@@ -116,54 +334,256 @@ def calc_target_hours(people, days_in_town, deficit):
     target_hours = target_hours[target_hours > 0]
     return target_hours
 
-def assign_chore_to_person(people, assgmt, tasks, assignments):
+def assign_chore_to_person(people, state, assgmt, tasks, assignments):
     person_name = assgmt['person']
     task_name = assgmt['chore']
     person_id = people[people.first_name == person_name].squeeze().name
     task = tasks[tasks.task == task_name].squeeze()
     duration = assgmt.get('credit') or task.duration_hours
     # make sure there are enough hours
-    if people.loc[person_id, 'chore_hours'] < duration - 0.1:
+    if not state.has_hours(person_id, duration - 0.1):
         print('Cant assign', task.task, 'to', person_name)
-        return assignments, tasks, people, False
+        return assignments, tasks, False
     else:
         assignments[person_id].append(task.id)
         tasks = tasks[tasks.id != task.id]
-        people.loc[person_id, 'chore_hours'] -= duration
-        return assignments, tasks, people, True
+        state.charge(person_id, duration)
+        return assignments, tasks, True
+
+def assign_optimal(tasks, state, prefs, assignments, time_budget):
+    # assign the tasks to the people in town as a capacitated
+    # assignment problem solved by optimal_assign: the value of a task
+    # is weighted by its hours so that the assigned hours are maximized
+    # first and the sum of preferences second; returns the tasks that
+    # could not be assigned
+    #
+    # each phase is solved on its own: the weekly phase does not see the
+    # seasonal and occasional tasks that come after it, so among its
+    # solutions with the most hours it takes the one with the best
+    # preferences even when that spends the hours a later task needed.
+    # A week can then get fewer seasonal and occasional hours than with
+    # the greedy solver: on the sample database 2026-04-13 keeps the
+    # same weekly hours but loses greedy's 0.50 seasonal and occasional
+    # hours, 7 of the planned weeks get fewer and 8 get more (see
+    # benchmarks/solver_modes.py); the weekly tasks come first by design
+    rows, person_ids, masks = prefs.roles['intown']
+    slots = prefs.state_slots[rows]
+    capacity = np.nan_to_num(state.hours_at(slots))
+    duration = tasks.duration_hours.to_numpy(dtype = np.float64)
+    pref = prefs.role_preferences('intown', tasks.task)
+    feasible = (pref > 0) & (slots >= 0)[:, None]
+    # custom logic for "Manage Trash & Recycling": the person has
+    # to be in town 5 or more days including Wednesday and Thursday
+    trash = (tasks.task == 'Manage Trash & Recycling').to_numpy()
+    feasible[:, trash] &= ((masks & TRASH_DAYS == TRASH_DAYS) & (POPCOUNT[masks] > 4))[:, None]
+    weight = 100*(np.where(feasible, pref, 0).max(axis = 0, initial = 0).sum() + 1)
+    value = np.where(feasible, weight*duration + pref, np.nan)
+    assignment, optimal = solve_assignment(capacity, duration, value, time_budget)
+    if not optimal:
+        print('Time budget exhausted, using the best assignment found')
+    for k, (_, task) in zip(assignment, tasks.iterrows()):
+        if k < 0:
+            continue
+        person_id = int(person_ids[k])
+        print('Assigning', task.task, 'to', person_id)
+        assignments[person_id].append(int(task.id))
+        state.charge(person_id, task.duration_hours)
+    return tasks[assignment < 0]
+
+def load_catalog(con):
+    # the tables that do not change from week to week
+    return {
+        'people': repository.get_people(con, active_only = True).set_index('id'),
+        'preferences': repository.get_preferences(con),
+        'daily': repository.get_tasks(con, 'daily'),
+        'weekly': repository.get_tasks(con, 'weekly'),
+        'occasional': repository.get_tasks(con, 'occasional'),
+        'seasonal': repository.get_tasks(con, 'seasonal'),
+    }
+
+def load_requests(con, first_monday: date, last_monday: date):
+    return repository.get_requests(con, first_monday, last_monday)
+
+def load_deficit(con, monday: date) -> pd.Series:
+    # total leftover hours of the active people in the previous week
+    return repository.get_deficit(con, monday)
+
+def load_last_performed(con, monday: date) -> dict:
+    # the week each seasonal and occasional task was last assigned
+    # before monday (from the task_last_performed table, which is built
+    # on first use); keys are the task types, values are pd.Series of
+    # dates indexed by task id
+    last_performed = {}
+    for task_type in ('seasonal', 'occasional'):
+        last_performed[task_type] = repository.get_last_performed(con, task_type, monday)
+    return last_performed
+
+# columns of the tables written for every week
+WEEK_COLUMNS = {
+    'assignments': ['week_start_date', 'person_id', 'task_type', 'task_id'],
+    'assignments_timed': ['week_start_date', 'person_id', 'weekday', 'task_id'],
+    'hours': ['week_start_date', 'person_id', 'days_in_town', 'hours_worked',
+              'target_hours', 'leftover_hours'],
+    'assignment_runs': ['week_start_date', 'solver', 'seed', 'samples',
+                        'unassigned_hours', 'leftover_std', 'preference'],
+}
+
+# one row per planned week with the solver settings and the score of
+# the schedule, the seed replays a randomized run exactly (NULL when
+# the run used the unseeded global random state)
+ASSIGNMENT_RUNS_TABLE = """CREATE TABLE IF NOT EXISTS assignment_runs(
+    week_start_date DATE, solver TEXT, seed INT, samples INT,
+    unassigned_hours REAL, leftover_std REAL, preference REAL)"""
+
+def week_rows(frame, columns):
+    # plain python rows for executemany with the dates as strings
+    if frame.empty:
+        return []
+    return list(frame[columns].astype({'week_start_date': str}).itertuples(
+        index = False, name = None
+    ))
 
-def assign_chores(monday: date):
+def write_weeks(con, weeks: dict) -> dict:
+    # replace the rows of the weeks (keys are mondays, values are the
+    # dicts returned by solve_week) in all the WEEK_COLUMNS tables; the
+    # rows are staged first and then deleted and inserted in one
+    # transaction, so a failure leaves the previous rows in place;
+    # returns the number of rows written per table and the seconds
+    # spent
+    start = time.perf_counter()
+    staged = {
+        table: [row for week in weeks.values() for row in week_rows(week[table], columns)]
+        for table, columns in WEEK_COLUMNS.items()
+    }
+    mondays = [(str(monday),) for monday in weeks]
+    with con:
+        con.execute(ASSIGNMENT_RUNS_TABLE)
+        for table, columns in WEEK_COLUMNS.items():
+            con.executemany(f'DELETE FROM {table} WHERE week_start_date = ?', mondays)
+            con.executemany(
+                f"""INSERT INTO {table} ({', '.join(columns)})
+                VALUES ({', '.join('?'*len(columns))})""",
+                staged[table]
+            )
+        repository.update_last_performed(con, weeks)
+        repository.bump_week_versions(con, weeks)
+    rows = {table: len(table_rows) for table, table_rows in staged.items()}
+    seconds = time.perf_counter() - start
+    print(f'Wrote {sum(rows.values())} rows for {len(weeks)} weeks in {seconds:.3f}s:', rows)
+    return {'rows': rows, 'seconds': seconds}
+
+def check_solver(solver: str):
+    # solver is 'greedy' or 'optimal', the latter assigns the weekly,
+    # seasonal and occasional tasks of each phase with optimal_assign
+    # and leaves only the tasks that can not be assigned to the greedy
+    # loops (the phases are solved one at a time, see assign_optimal)
+    if solver not in ('greedy', 'optimal'):
+        raise ValueError(f'Unknown solver: {solver}')
+
+def assign_chores(monday: date, solver: str = 'greedy', database = db,
+                  fixed_chores_path: str = 'fixed_chores.yaml',
+                  seed: int = None, samples: int = 1, progress = None):
+    # database is a path or an open sqlite3 connection; with a seed the
+    # main bathroom rotation is drawn from samples seeded schedules
+    # (see search_week); progress(phase) is told when the loading, each
+    # phase of the solver and the writing start
+    check_solver(solver)
+    if progress is not None:
+        progress('load')
     # read the data
-    with sqlite3.connect(db) as con:
-        people = get_table(con, "people").query("active == 1").set_index('id')
-        requests = get_table(con, "requests")
-        preferences = get_table(con, "preferences")
-        daily = get_table(con, "daily_tasks")
-        weekly = get_table(con, "weekly_tasks")
-        occasional = get_table(con, "occasional_tasks")
-        seasonal = get_table(con, "seasonal_tasks")
-        year = monday.year
-        prev_monday = monday + timedelta(days = -7)
-        seasonal['start_date'] = pd.to_datetime(seasonal.start_date + f"/{year}")
-        seasonal['end_date'] = pd.to_datetime(seasonal.end_date + f"/{year}")
-        seasonal['end_date'] = seasonal.apply(
-            lambda row: row.end_date if row.end_date > row.start_date
-            else row.end_date + timedelta(days = 365),
-            axis = 1
-        )
-        # get total leftover hours
-        hours = pd.read_sql(
-            con = con, sql = f"""
-            select h.person_id, sum(leftover_hours) as leftover_hours
-            from hours as h join people as p on h.person_id = p.id
-            where p.active and week_start_date = '{prev_monday}'
-            group by person_id
-            """
-        )
-        deficit = hours.set_index('person_id').leftover_hours
+    with open_db(database) as con:
+        catalog = load_catalog(con)
+        requests = load_requests(con, monday, monday)
+        deficit = load_deficit(con, monday)
+        last_performed = load_last_performed(con, monday)
 
     # read the fixed chore assignments
-    fixed_chores_config = yaml.safe_load(open('fixed_chores.yaml', 'r'))
+    fixed_chores_config = yaml.safe_load(open(fixed_chores_path, 'r'))
+
+    success, message, week = search_week(
+        monday, catalog, requests, deficit, last_performed,
+        fixed_chores_config, solver, seed, samples, progress = progress
+    )
+    if not success:
+        return False, message
+
+    # update the database: assignments, assignments_timed, hours and
+    # assignment_runs
+    if progress is not None:
+        progress('write')
+    with open_db(database) as con:
+        written = write_weeks(con, {monday: week})
+    return True, f"Wrote {sum(written['rows'].values())} rows in {written['seconds']:.3f}s"
+
+def assign_range(start_monday: date, weeks: int, solver: str = 'greedy',
+                 database = db, fixed_chores_path: str = 'fixed_chores.yaml',
+                 seed: int = None, samples: int = 1):
+    # plan several consecutive weeks at once: the catalog and the
+    # requests are read once, the deficit and the date each seasonal
+    # and occasional task was last performed are carried from week to
+    # week in memory, and all the weeks are written in one transaction
+    # at the end (nothing is written if any week fails)
+    check_solver(solver)
+    mondays = [start_monday + timedelta(days = 7*week) for week in range(weeks)]
+    with open_db(database) as con:
+        catalog = load_catalog(con)
+        requests = load_requests(con, mondays[0], mondays[-1])
+        deficit = load_deficit(con, mondays[0])
+        last_performed = load_last_performed(con, mondays[0])
+    fixed_chores_config = yaml.safe_load(open(fixed_chores_path, 'r'))
+
+    solved = {}
+    for monday in mondays:
+        success, message, week = search_week(
+            monday, catalog, requests, deficit, last_performed,
+            fixed_chores_config, solver, seed, samples
+        )
+        if not success:
+            return False, message
+        solved[monday] = week
+        # carry this week's leftover hours and performed tasks forward
+        deficit = week['hours'].set_index('person_id').leftover_hours
+        chores = week['assignments']
+        for task_type, last in last_performed.items():
+            if chores.empty:
+                continue
+            task_ids = chores.task_id[chores.task_type == task_type].unique()
+            last_performed[task_type] = pd.concat((
+                last[~last.index.isin(task_ids)],
+                pd.Series(str(monday), index = pd.Index(task_ids, name = 'id'), name = last.name)
+            ))
+
+    with open_db(database) as con:
+        written = write_weeks(con, solved)
+    return True, f"Wrote {sum(written['rows'].values())} rows in {written['seconds']:.3f}s"
+
+def solve_week(monday: date, catalog: dict, requests: pd.DataFrame,
+               deficit: pd.Series, last_performed: dict,
+               fixed_chores_config: dict, solver: str = 'greedy',
+               seed: int = None, timings: dict = None, progress = None):
+    # compute the assignments of one week without touching the
+    # database; returns success, a message and a dict with the
+    # assignments, assignments_timed, hours and assignment_runs data
+    # frames to write; the random draws use the global random state
+    # unless a seed is given, the seconds spent in each phase are
+    # added to timings if given and progress is told the phases as
+    # they start (see PhaseClock)
+    clock = PhaseClock(timings, progress)
+    rng = np.random if seed is None else np.random.RandomState(seed)
+    people = catalog['people']
+    preferences = catalog['preferences']
+    daily = catalog['daily']
+    weekly = catalog['weekly']
+    occasional = catalog['occasional']
+    seasonal = catalog['seasonal'].copy()
+    year = monday.year
+    seasonal['start_date'] = pd.to_datetime(seasonal.start_date + f"/{year}")
+    seasonal['end_date'] = pd.to_datetime(seasonal.end_date + f"/{year}")
+    seasonal['end_date'] = seasonal.apply(
+        lambda row: row.end_date if row.end_date > row.start_date
+        else row.end_date + timedelta(days = 365),
+        axis = 1
+    )
 
     # get availability for various tasks
     requests = requests.query(f'week_start_date == "{monday}"').set_index('person_id')
@@ -181,9 +601,15 @@ def assign_chores(monday: date):
     hours_this_week['days_in_town'] = intown.num_days
     hours_this_week['target_hours'] = calc_target_hours(people, intown.num_days, deficit)
     hours_this_week = hours_this_week.fillna(0)
-    people['chore_hours'] = hours_this_week.target_hours
-    print(people[['first_name', 'chore_hours']])
-    print('Total:', people.chore_hours.sum())
+    state = SolverState(people, hours_this_week.target_hours)
+    print(people[['first_name']].assign(chore_hours = state.hours))
+    print('Total:', state.hours.sum())
+
+    # build the preference matrix and the candidate lists once
+    prefs = PreferenceMatrix(preferences, requests.index, state)
+    prefs.add_role('intown', intown)
+    prefs.add_role('dishes_am', dishes_am)
+    prefs.add_role('dishes_pm', dishes_pm)
 
     # get the task data
     meal_task = daily.query('task == "House Meal"').squeeze()
@@ -193,77 +619,69 @@ def assign_chores(monday: date):
     night_sweep_task = daily.query('task == "Night Cleanup"').squeeze()
     dishes_am_task = daily.query('task == "Unload Dishes AM"').squeeze()
     dishes_pm_task = daily.query('task == "Unload Dishes PM"').squeeze()
+    clock.lap('setup')
 
     # assign meals
+    # make sure the cooks have enough remaining hours
+    cooks = meal.loc[[
+        state.remaining(person_id) > meal_task.duration_hours
+        for person_id in meal.index
+    ]]
+    meal_days = choose_meal_days(
+        cooks.index.tolist(), cooks['mask'].tolist(),
+        clean.index.tolist(), clean['mask'].tolist()
+    )
+    # the cooks do not clean
+    clean = clean[~clean.index.isin(meal_days.keys())]
     cook = defaultdict(list)
     souschef = defaultdict(list)
-    max_gap = 7
-    for person_id, row in meal.iterrows():
-        # make sure the cook has enough remaining hours
-        if people.loc[person_id, 'chore_hours'] <= meal_task.duration_hours:
-            continue
-
-        for day in row.day:
-            # skip days that already have a cook
-            if day in sum(cook.values(), []):
-                continue
-
-            # make sure that two cleaners (other than the cooks) are
-            # available on this day
-            clean = clean[~clean.index.isin(cook.keys())]
-            num_cleaners = clean.day.apply(lambda l: day in l).sum()
-            if num_cleaners < 2:
-                continue
-
-            days = sum(cook.values(), [day])
-            putative_max_gap = get_max_gap(days)
-            if putative_max_gap <= max_gap:
-                max_gap = putative_max_gap
-                best_day = day
-
+    for person_id, best_day in meal_days.items():
         cook[person_id].append(best_day)
         # if a sous chef is available on this day, use the first one found
         sous_person = None
-        for sous_id, row in sous.iterrows():
-            if best_day in row.day and \
-               people.loc[sous_id, 'chore_hours'] <= sous_task.duration_hours:
+        for sous_id, sous_mask in sous['mask'].items():
+            if sous_mask & DAY_BIT[best_day] and \
+               state.remaining(sous_id) <= sous_task.duration_hours:
                 sous_person = sous_id
                 sous = sous[sous.index != sous_id]
                 break
 
         # subtract 2.5h from chore_hours for the cook
-        people.loc[person_id, 'chore_hours'] -= meal_task.duration_hours
+        state.charge(person_id, meal_task.duration_hours)
         # if there is a sous chef, adjust
         if sous_person is not None:
             souschef[sous_person].append(best_day)
-            people.loc[person_id, 'chore_hours'] += sous_task.duration_hours
-            people.loc[sous_person, 'chore_hours'] -= sous_task.duration_hours
+            state.refund(person_id, sous_task.duration_hours)
+            state.charge(sous_person, sous_task.duration_hours)
+    clock.lap('meals')
 
     # assign clean lead
-    clean_pref = merge_prefs(people, clean, preferences, "Meal Cleanup Lead")
+    prefs.add_role('clean', clean)
+    clean_ids, clean_masks, _ = prefs.rank('clean', "Meal Cleanup Lead", state)
     clean_lead = defaultdict(list)
-    clean_days = sum(cook.values(), [])
-    for person_id, row in clean_pref.iterrows():
+    clean_days = list(meal_days.values())
+    for person_id, mask in zip(clean_ids.tolist(), clean_masks.tolist()):
         if not clean_days: break
         # make sure this person is not a cook
         if person_id in cook.keys():
             continue
         for day in clean_days:
-            if day in row.day:
+            if mask & DAY_BIT[day]:
                 # make sure there is enough hours
-                if people.loc[person_id, 'chore_hours'] < clean_lead_task.duration_hours:
+                if not state.has_hours(person_id, clean_lead_task.duration_hours):
                     continue
                 clean_lead[person_id].append(day)
                 clean_days.remove(day)
-                row.day.remove(day)
-                people.loc[person_id, 'chore_hours'] -= clean_lead_task.duration_hours
+                mask &= ~DAY_BIT[day]
+                state.charge(person_id, clean_lead_task.duration_hours)
+    clock.lap('cleanup_lead')
 
     # assing clean_help
-    clean_pref = merge_prefs(people, clean, preferences, "Meal Cleanup Helper")
+    clean_ids, clean_masks, _ = prefs.rank('clean', "Meal Cleanup Helper", state)
     clean_help = defaultdict(list)
-    clean_days = sum(cook.values(), [])
+    clean_days = list(meal_days.values())
     sweep_days = [d for d in range(7) if d not in clean_days]
-    for person_id, row in clean_pref.iterrows():
+    for person_id, mask in zip(clean_ids.tolist(), clean_masks.tolist()):
         if not clean_days: break
         # make sure this person is not a cook
         if person_id in cook.keys():
@@ -272,32 +690,34 @@ def assign_chores(monday: date):
             # make sure this person is not the lead
             if day in clean_lead.get(person_id, []):
                 continue
-            if day in row.day:
+            if mask & DAY_BIT[day]:
                 # make sure there is enough hours
-                if people.loc[person_id, 'chore_hours'] < clean_help_task.duration_hours:
+                if not state.has_hours(person_id, clean_help_task.duration_hours):
                     continue
                 clean_help[person_id].append(day)
                 clean_days.remove(day)
-                row.day.remove(day)
-                people.loc[person_id, 'chore_hours'] -= clean_help_task.duration_hours
+                mask &= ~DAY_BIT[day]
+                state.charge(person_id, clean_help_task.duration_hours)
+    clock.lap('cleanup_helper')
 
     # assign night sweep to all days that do not have a meal
-    clean_pref = merge_prefs(people, clean, preferences, "Night Cleanup")
+    clean_ids, clean_masks, _ = prefs.rank('clean', "Night Cleanup", state)
     sweep = defaultdict(list)
-    for person_id, row in clean_pref.iterrows():
+    for person_id, mask in zip(clean_ids.tolist(), clean_masks.tolist()):
         if not sweep_days: break
         # make sure this person is not a cook
         if person_id in cook.keys():
             continue
         for day in sweep_days:
-            if day in row.day:
+            if mask & DAY_BIT[day]:
                 # make sure there is enough hours
-                if people.loc[person_id, 'chore_hours'] < night_sweep_task.duration_hours:
+                if not state.has_hours(person_id, night_sweep_task.duration_hours):
                     continue
                 sweep[person_id].append(day)
                 sweep_days.remove(day)
-                row.day.remove(day)
-                people.loc[person_id, 'chore_hours'] -= night_sweep_task.duration_hours
+                mask &= ~DAY_BIT[day]
+                state.charge(person_id, night_sweep_task.duration_hours)
+    clock.lap('sweep')
 
     # assign the weekly chores
     # the main bathroom chore needs to be assigned at random with
@@ -308,8 +728,8 @@ def assign_chores(monday: date):
     # assign fixed chores
     fixed_tasks = []
     for asnmgt in fixed_chores_config.get('weekly'):
-        weekly_chores, weekly, people, done = assign_chore_to_person(
-            people, asnmgt, weekly, weekly_chores
+        weekly_chores, weekly, done = assign_chore_to_person(
+            people, state, asnmgt, weekly, weekly_chores
         )
         if done:
             fixed_tasks.append(asnmgt['chore'])
@@ -319,72 +739,70 @@ def assign_chores(monday: date):
 
     # Main bathroom needs to rotate
     task = weekly.query('task == "Bathrm, Main"').squeeze()
-    intown_avail = merge_prefs(people, intown, preferences, 'Bathrm, Main')
-    # add a column with boolean enough hours
-    intown_avail['enough_hours'] = people.chore_hours >= task.duration_hours
-    intown_avail = intown_avail.query(
-        'num_days > 0 & preference > 0 & enough_hours'
-    ).copy()
-    intown_avail['prob'] = intown_avail.preference/intown_avail.preference.sum()
-    person_id = int(intown_avail.sample(weights = 'prob').squeeze().name)
-    weekly_chores[person_id].append(int(task.id))
-    print('Assigning Main Floor Bathroom to', people.loc[person_id, 'first_name'])
-    people.loc[person_id, 'chore_hours'] -= task.duration_hours
+    intown_ids, _, intown_pref = prefs.rank('intown', task.task, state, task.duration_hours)
+    if len(intown_ids):
+        prob = intown_pref/intown_pref.sum()
+        person_id = int(intown_ids[
+            rng.choice(len(intown_ids), size = 1, replace = False, p = prob)[0]
+        ])
+        weekly_chores[person_id].append(int(task.id))
+        print('Assigning Main Floor Bathroom to', people.loc[person_id, 'first_name'])
+        state.charge(person_id, task.duration_hours)
+    else:
+        print(f"Not enough hours for weekly task: {task.task}")
     weekly = weekly[~(weekly.index == task.name)]
 
+    if solver == 'optimal':
+        weekly = assign_optimal(weekly, state, prefs, weekly_chores, solver_time_budget_sec)
+
     # the rest of the tasks are assigned by availability and
     # preference
     for _, task in weekly.iterrows():
         print('Assigning weekly:', task.task)
-        intown_avail = merge_prefs(people, intown, preferences, task.task)
-        intown_avail['enough_hours'] = people.chore_hours >= task.duration_hours
-        intown_avail = intown_avail.query(
-            'num_days > 0 & enough_hours & preference > 0'
-        )
-        if intown_avail.empty:
+        intown_ids, intown_masks, _ = prefs.rank('intown', task.task, state, task.duration_hours)
+        if not len(intown_ids):
             print(f"Not enough hours for weekly task: {task.task}")
             continue
         # custom logic for "Manage Trash & Recycling": the person has
         # to be in town 5 or more days including Wednesday and Thursday
         if task.task == 'Manage Trash & Recycling':
-            match = False
-            for person_id, row in intown_avail.iterrows():
-                if 2 in row.day and 3 in row.day and row.num_days > 4:
-                    match = True
-                    break
-            if not match:
+            match = (intown_masks & TRASH_DAYS == TRASH_DAYS) & (POPCOUNT[intown_masks] > 4)
+            if not match.any():
                 print(f"Could not find someome to {task.task}")
                 continue
+            person_id = int(intown_ids[match.argmax()])
         else:
-            person_id = int(intown_avail.iloc[0].name)
+            person_id = int(intown_ids[0])
         print('Assigned to', person_id)
         weekly_chores[person_id].append(int(task.id))
-        people.loc[person_id, 'chore_hours'] -= task.duration_hours
+        state.charge(person_id, task.duration_hours)
+    clock.lap('weekly')
     
     # assign AM/PM dishwasher emptying
     empty_dishes_am = defaultdict(list)
-    am_pref = merge_prefs(people, dishes_am, preferences, 'Unload Dishes AM')
+    am_ids, am_masks, _ = prefs.rank('dishes_am', 'Unload Dishes AM', state)
     for day in range(7):
-        for person_id, row in am_pref.iterrows():
-            if day not in row.day:
+        for person_id, mask in zip(am_ids.tolist(), am_masks.tolist()):
+            if not mask & DAY_BIT[day]:
                 continue
-            if people.loc[person_id, 'chore_hours'] < dishes_am_task.duration_hours:
+            if not state.has_hours(person_id, dishes_am_task.duration_hours):
                 continue
             empty_dishes_am[person_id].append(day)
-            people.loc[person_id, 'chore_hours'] -= dishes_am_task.duration_hours
+            state.charge(person_id, dishes_am_task.duration_hours)
             break
 
     empty_dishes_pm = defaultdict(list)
-    pm_pref = merge_prefs(people, dishes_pm, preferences, 'Unload Dishes PM')
+    pm_ids, pm_masks, _ = prefs.rank('dishes_pm', 'Unload Dishes PM', state)
     for day in range(7):
-        for person_id, row in pm_pref.iterrows():
-            if day not in row.day:
+        for person_id, mask in zip(pm_ids.tolist(), pm_masks.tolist()):
+            if not mask & DAY_BIT[day]:
                 continue
-            if people.loc[person_id, 'chore_hours'] < dishes_pm_task.duration_hours:
+            if not state.has_hours(person_id, dishes_pm_task.duration_hours):
                 continue
             empty_dishes_pm[person_id].append(day)
-            people.loc[person_id, 'chore_hours'] -= dishes_pm_task.duration_hours
+            state.charge(person_id, dishes_pm_task.duration_hours)
             break
+    clock.lap('dishes')
 
     # construct the assignments_timed dataframe with
     # week_start_date,person_id,weekday,task_id columns
@@ -395,15 +813,10 @@ def assign_chores(monday: date):
     rows = append_timed_rows(sweep, night_sweep_task.id, monday, rows)
     rows = append_timed_rows(empty_dishes_am, dishes_am_task.id, monday, rows)
     rows = append_timed_rows(empty_dishes_pm, dishes_pm_task.id, monday, rows)
-    assignments_timed = pd.DataFrame(rows)
+    assignments_timed = pd.DataFrame(rows, columns = WEEK_COLUMNS['assignments_timed'])
     
     # add the urgency column to the seasonal task definitions
-    date_last_performed = pd.read_sql(
-        con=con,
-        sql=f"""SELECT task_id as id, MAX(week_start_date) as date_last_performed
-        FROM assignments WHERE task_type = 'seasonal' and week_start_date < '{monday}'
-        GROUP BY task_id"""
-    )
+    date_last_performed = last_performed['seasonal'].reset_index()
     seasonal = seasonal.merge(
         date_last_performed, on = 'id', how = 'left'
     ).fillna(monday - timedelta(days = 365))
@@ -412,32 +825,31 @@ def assign_chores(monday: date):
         pd.to_datetime(monday) - pd.to_datetime(seasonal.date_last_performed)
     ).dt.days - seasonal.frequency_days
     seasonal = seasonal[seasonal.urgency > 0]
+    in_season = (seasonal.start_date.dt.date <= monday) & (seasonal.end_date.dt.date >= monday)
+    due_seasonal = seasonal[in_season].set_index('id').duration_hours
     # seasonal assignments
     seasonal_chores = defaultdict(list)
+    if solver == 'optimal':
+        seasonal = pd.concat((
+            seasonal[~in_season],
+            assign_optimal(seasonal[in_season], state, prefs, seasonal_chores, solver_time_budget_sec)
+        ))
     for _, task in seasonal.sort_values('urgency', ascending = False).iterrows():
         if monday > task.end_date.date() or monday < task.start_date.date():
             print('Skipping seasonal', task.task, ': out of season')
             continue
-        intown_avail = merge_prefs(people, intown, preferences, task.task)
-        intown_avail['enough_hours'] = people.chore_hours >= task.duration_hours
-        intown_avail = intown_avail.query(
-            'num_days > 0 & enough_hours & preference > 0'
-        )
-        if intown_avail.empty:
+        intown_ids, _, _ = prefs.rank('intown', task.task, state, task.duration_hours)
+        if not len(intown_ids):
             print("Not enough hours for seasonal task: " + task.task)
             continue
-        person_id = int(intown_avail.iloc[0].name)
+        person_id = int(intown_ids[0])
         print('Assigning seasonal:', task.task, 'to', person_id)
         seasonal_chores[person_id].append(int(task.id))
-        people.loc[person_id, 'chore_hours'] -= task.duration_hours
+        state.charge(person_id, task.duration_hours)
+    clock.lap('seasonal')
 
     # add the urgency column to the occasional task definitions
-    date_last_performed = pd.read_sql(
-        con=con,
-        sql=f"""SELECT task_id as id, MAX(week_start_date) as date_last_performed
-        FROM assignments WHERE task_type = 'occasional' and week_start_date < '{monday}'
-        GROUP BY task_id"""
-    )
+    date_last_performed = last_performed['occasional'].reset_index()
     occasional = occasional.merge(
         date_last_performed, on = 'id', how = 'left'
     ).fillna(monday - timedelta(days = 365))
@@ -447,8 +859,26 @@ def assign_chores(monday: date):
     )
     # remove tasks with negative urgency (they don't have to be done yet)
     occasional = occasional[occasional.urgency > 0]
+    # the hours of the tasks due this week, keys are the task types,
+    # values are pd.Series of durations indexed by task id
+    due = {
+        'weekly': catalog['weekly'].set_index('id').duration_hours,
+        'seasonal': due_seasonal,
+        'occasional': occasional.set_index('id').duration_hours,
+    }
     # occasional assignments
     occasional_chores = defaultdict(list)
+    if solver == 'optimal':
+        # the fixed assignments are hard constraints
+        for asnmgt in fixed_chores_config.get('occasional', []):
+            if asnmgt['chore'] not in occasional.task.values:
+                continue
+            occasional_chores, occasional, done = assign_chore_to_person(
+                people, state, asnmgt, occasional, occasional_chores
+            )
+            if done:
+                print('Assigning occasional:', asnmgt['chore'], 'to', asnmgt['person'])
+        occasional = assign_optimal(occasional, state, prefs, occasional_chores, solver_time_budget_sec)
 
     for _, task in occasional.sort_values('urgency', ascending = False).iterrows():
         print('Assigning occasional task', task.task)
@@ -458,31 +888,28 @@ def assign_chores(monday: date):
             asnmgt = [a for a in fixed_chores_config['occasional'] if a['chore'] == task.task]
             if len(asnmgt) == 1:
                 asnmgt = asnmgt[0]
-                occasional_chores, occasional, people, done = assign_chore_to_person(
-                    people, asnmgt, occasional, occasional_chores
+                occasional_chores, occasional, done = assign_chore_to_person(
+                    people, state, asnmgt, occasional, occasional_chores
                 )
                 if done:
                     print('Assigning occasional:', task.task, 'to', asnmgt['person'])
                     
         if not done:
-            intown_avail = merge_prefs(people, intown, preferences, task.task)
-            intown_avail['enough_hours'] = people.chore_hours >= task.duration_hours
-            intown_avail = intown_avail.query(
-                'num_days > 0 & enough_hours & preference > 0'
-            )
-            if intown_avail.empty:
+            intown_ids, _, _ = prefs.rank('intown', task.task, state, task.duration_hours)
+            if not len(intown_ids):
                 print("Not enough hours for occasional task: " + task.task)
                 continue
-            person_id = int(intown_avail.iloc[0].name)
+            person_id = int(intown_ids[0])
             print('Assigning occasional:', task.task, 'to', person_id)
             occasional_chores[person_id].append(int(task.id))
-            people.loc[person_id, 'chore_hours'] -= task.duration_hours
+            state.charge(person_id, task.duration_hours)
+    clock.lap('occasional')
 
     # create the assignments dataframe with week_start_date,person_id,task_type,chore_id columns
     rows = append_chore_rows(weekly_chores, 'weekly', monday, [])
     rows = append_chore_rows(seasonal_chores, 'seasonal', monday, rows)
     rows = append_chore_rows(occasional_chores, 'occasional', monday, rows)
-    assignments = pd.DataFrame(rows)
+    assignments = pd.DataFrame(rows, columns = WEEK_COLUMNS['assignments'])
 
     # check that the meal cleanup and night cleanup and dishes are all
     # covered
@@ -490,26 +917,123 @@ def assign_chores(monday: date):
     num_cleanup_total = 7 + num_meals
     num_slots = assignments_timed.task_id.isin((2,3,4)).sum()
     if num_slots != num_cleanup_total:
-        message = 'Not enough labor for meal/night cleanup'
+        message = f'Not enough labor for meal/night cleanup in the week of {monday}'
         print(message)
         print(num_cleanup_total, num_slots)
-        return False, message
+        return False, message, None
+
+    # the hours table
+    hours_this_week['leftover_hours'] = state.hours_series()
+    hours_this_week = hours_this_week.fillna(0)
+    hours_this_week['hours_worked'] = hours_this_week.target_hours - hours_this_week.leftover_hours
+    hours_this_week['person_id'] = hours_this_week.index
+    week = {
+        'assignments': assignments,
+        'assignments_timed': assignments_timed,
+        'hours': hours_this_week,
+    }
+    week['assignment_runs'] = pd.DataFrame([{
+        'week_start_date': monday, 'solver': solver, 'seed': seed, 'samples': 1,
+        **score_week(week, catalog, due)
+    }], columns = WEEK_COLUMNS['assignment_runs'])
+    clock.lap('finish')
+    return True, '', week
 
-    # update the database: assignments and people (deficit column)
-    with sqlite3.connect(db) as con:
-        cur = con.cursor()
-        con.execute(f'DELETE FROM assignments WHERE week_start_date = "{monday}"')
-        con.execute(f'DELETE FROM assignments_timed WHERE week_start_date = "{monday}"')
-        con.execute(f'DELETE FROM hours WHERE week_start_date = "{monday}"')
-        con.commit()
-        assignments.to_sql(con=con, name='assignments', index=False, if_exists='append')
-        assignments_timed.to_sql(con=con, name='assignments_timed', index=False, if_exists='append')
-        # update the hours table
-        hours_this_week['leftover_hours'] = people.chore_hours
-        hours_this_week = hours_this_week.fillna(0)
-        hours_this_week['hours_worked'] = hours_this_week.target_hours - hours_this_week.leftover_hours
-        hours_this_week['person_id'] = hours_this_week.index
-        hours_this_week.to_sql(con=con, name="hours", index=False, if_exists="append")
-
-    # return success
-    return True, ''
+def score_week(week: dict, catalog: dict, due: dict) -> dict:
+    # the hours of the due tasks nobody was assigned, the spread of the
+    # leftover hours of the people in town and the sum of the
+    # preferences of the assigned weekly, seasonal and occasional tasks
+    chores = week['assignments']
+    unassigned_hours = sum(
+        hours[~hours.index.isin(chores.task_id[chores.task_type == task_type])].sum()
+        for task_type, hours in due.items()
+    )
+    names = pd.concat([
+        catalog[task_type][['id', 'task']].assign(task_type = task_type)
+        for task_type in due
+    ])
+    preference = chores.merge(
+        names, left_on = ['task_id', 'task_type'], right_on = ['id', 'task_type']
+    ).merge(
+        catalog['preferences'][['task', 'person_id', 'preference']],
+        on = ['task', 'person_id'], how = 'left'
+    ).preference.fillna(0).sum()
+    hours = week['hours']
+    leftover = hours.leftover_hours[hours.target_hours > 0]
+    return {
+        'unassigned_hours': float(unassigned_hours),
+        'leftover_std': float(leftover.std()) if len(leftover) > 1 else 0.,
+        'preference': float(preference),
+    }
+
+def score_key(runs: pd.DataFrame):
+    # schedules compare by the fewest unassigned hours, then the most
+    # even leftover hours, then the most preferred chores
+    run = runs.iloc[0]
+    return (round(run.unassigned_hours, 6), round(run.leftover_std, 6), -run.preference)
+
+def sample_week(seed: int, *args):
+    # one seeded schedule in a worker process, the log of the run is
+    # returned so only the winner's is printed
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        success, message, week = solve_week(*args, seed = seed)
+    return seed, success, message, week, log.getvalue()
+
+def search_week(monday: date, catalog: dict, requests: pd.DataFrame,
+                deficit: pd.Series, last_performed: dict,
+                fixed_chores_config: dict, solver: str = 'greedy',
+                seed: int = None, samples: int = 1, workers: int = None,
+                progress = None):
+    # run the schedules seeded with seed, seed + 1, ... seed + samples - 1
+    # in parallel worker processes and keep the best one by score_key
+    # (the lowest seed wins ties); the winning seed is recorded in the
+    # assignment_runs frame so that assign_chores(..., seed = seed)
+    # replays the run exactly; without a seed a single run uses the
+    # global random state; the phases of a single run are told to
+    # progress, the samples only report the phase 'samples'
+    args = (monday, catalog, requests, deficit, last_performed, fixed_chores_config, solver)
+    if seed is None or samples == 1:
+        return solve_week(*args, seed = seed, progress = progress)
+    if progress is not None:
+        progress('samples')
+    seeds = [seed + sample for sample in range(samples)]
+    with ProcessPoolExecutor(max_workers = min(samples, workers or os.cpu_count())) as pool:
+        results = list(pool.map(sample_week, seeds, *([arg]*samples for arg in args)))
+    solved = [result for result in results if result[1]]
+    if not solved:
+        seed, success, message, week, log = results[0]
+        print(log, end = '')
+        return success, message, week
+    seed, success, message, week, log = min(solved, key = lambda result: score_key(result[3]['assignment_runs']))
+    print(log, end = '')
+    print(f'Seed {seed} scored best of {samples} samples')
+    week['assignment_runs']['samples'] = samples
+    return success, message, week
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('monday', type = str,
+                        help = 'first monday date in YYYY-MM-DD format')
+    parser.add_argument('--weeks', type = int, default = 1,
+                        help = 'number of consecutive weeks to plan')
+    parser.add_argument('--solver', choices = ('greedy', 'optimal'), default = 'greedy')
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--fixed-chores', default = 'fixed_chores.yaml',
+                        help = 'fixed chore assignments')
+    parser.add_argument('--seed', type = int,
+                        help = 'seed of the randomized main bathroom rotation')
+    parser.add_argument('--samples', type = int, default = 1,
+                        help = 'number of seeded schedules to search (needs --seed)')
+    args = parser.parse_args()
+    if args.samples > 1 and args.seed is None:
+        parser.error('--samples needs --seed')
+    monday = pd.to_datetime(args.monday).date()
+    if monday.weekday() != 0:
+        parser.error(f'{args.monday} is not a Monday')
+    success, message = assign_range(
+        monday, args.weeks, args.solver, args.db, args.fixed_chores,
+        args.seed, args.samples
+    )
+    if not success:
+        sys.exit(message)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# time the construction of the per-person chore tables of a week (the
+# assignment page and the chore emails) on synthetic houses: the
+# previous per-person loop against chore_chart.week_chores, which
+# works on the whole week at once; both results are checked to be equal
+import argparse
+import contextlib
+import io
+import json
+import time
+import numpy as np
+import pandas as pd
+import assign_chores
+import repository
+from chore_chart import fixed_credits, week_chores
+from benchmarks.synthetic import make_house
+
+def loop_chores(assign, assign_timed, names, fixed_chores) -> dict:
+    # the previous implementation, one pass over the week per person
+    # (with a stable sort, the chores of a day stay in the order they
+    # were written as in week_chores)
+    custom_duration = {}
+    for assignments in fixed_chores.values():
+        for assnmt in assignments or []:
+            if 'credit' in assnmt:
+                custom_duration.setdefault(assnmt['person'], {})[assnmt['chore']] = assnmt['credit']
+    chores = {}
+    for person_id, person_name in names.items():
+        rows = []
+        for _, chore in assign_timed[assign_timed.person_id == person_id].sort_values('weekday', kind = 'stable').iterrows():
+            ts = pd.Timestamp(chore.week_start_date) + pd.Timedelta(days = chore.weekday)
+            rows.append({
+                'task': chore.task,
+                'duration_hours': chore.duration_hours,
+                'weekday': ts.strftime("%A")
+            })
+        for _, chore in assign[assign.person_id == person_id].iterrows():
+            if person_name in custom_duration and chore.task in custom_duration[person_name]:
+                duration = custom_duration[person_name][chore.task]
+            else:
+                duration = chore.duration_hours
+            rows.append({
+                'task': chore.task,
+                'duration_hours': float(duration),
+                'weekday': ''
+            })
+        chores[person_name] = pd.DataFrame(rows, columns = ['task', 'duration_hours', 'weekday'])
+    return chores
+
+def planned_week(num_people: int, num_tasks: int, monday, seed: int):
+    # a synthetic house with its week solved and written
+    con = make_house(num_people, num_tasks, monday, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message, week = assign_chores.solve_week(
+            monday, assign_chores.load_catalog(con),
+            assign_chores.load_requests(con, monday, monday),
+            assign_chores.load_deficit(con, monday),
+            assign_chores.load_last_performed(con, monday),
+            {'weekly': [], 'occasional': []}, 'greedy', seed = seed
+        )
+        if not success:
+            raise RuntimeError(message)
+        assign_chores.write_weeks(con, {monday: week})
+    return con
+
+def best_of(repeat: int, function, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def run_scenario(num_people: int, num_tasks: int, seed: int, repeat: int, monday) -> dict:
+    con = planned_week(num_people, num_tasks, monday, seed)
+    assign = repository.get_week_assignments(con, monday)
+    assign_timed = repository.get_week_assignments_timed(con, monday)
+    names = repository.get_week_people(con, monday).set_index('person_id').first_name
+    con.close()
+    # a custom credit for a tenth of the untimed chores
+    rng = np.random.default_rng(seed)
+    fixed = assign.sample(frac = .1, random_state = seed)
+    fixed_chores = {'weekly': [
+        {'chore': row.task, 'person': row.first_name, 'credit': float(rng.integers(1, 4))}
+        for row in fixed.itertuples()
+    ]}
+    loop_seconds, expected = best_of(repeat, loop_chores, assign, assign_timed, names, fixed_chores)
+    vector_seconds, result = best_of(
+        repeat, lambda: week_chores(assign, assign_timed, names, fixed_credits(fixed_chores))
+    )
+    assert list(expected) == list(result)
+    for name, frame in expected.items():
+        pd.testing.assert_frame_equal(frame, result[name])
+    return {
+        'people': num_people,
+        'tasks': num_tasks,
+        'rows': len(assign) + len(assign_timed),
+        'loop': loop_seconds,
+        'vectorized': vector_seconds,
+        'speedup': loop_seconds/vector_seconds,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', default = '20x20,100x100,200x200,500x400',
+                        help = 'comma separated PEOPLExTASKS scenarios')
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--monday', default = '2026-05-11')
+    parser.add_argument('--json', help = 'write the results to this file')
+    args = parser.parse_args()
+    monday = pd.to_datetime(args.monday).date()
+    results = []
+    for scale in args.scales.split(','):
+        num_people, num_tasks = (int(value) for value in scale.split('x'))
+        result = run_scenario(num_people, num_tasks, args.seed, args.repeat, monday)
+        results.append(result)
+        print(f"{num_people:5d} people {num_tasks:5d} tasks {result['rows']:6d} rows  "
+              f"loop {1000*result['loop']:8.1f}ms  vectorized {1000*result['vectorized']:6.1f}ms  "
+              f"x{result['speedup']:.1f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
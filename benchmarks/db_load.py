@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# load test of the app's connections: reader processes run the queries
+# of the assignment and preference pages while writer processes save
+# requests and preferences like /requests and /prefs, once with the
+# default rollback journal and once with the WAL settings of
+# maitri_db.connect, on scratch copies of the chore database
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import numpy as np
+import repository
+from maitri_db import db, connect
+
+def reader(path, settings, monday, deadline, queue):
+    con = connect(path, **settings)
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            repository.get_week_assignments(con, monday)
+            repository.get_week_assignments_timed(con, monday)
+            repository.get_week_hours(con, monday)
+            repository.get_active_preferences(con)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    con.close()
+    queue.put(('read', latencies, errors))
+
+def writer(path, settings, monday, deadline, queue, seed):
+    con = connect(path, **settings)
+    rng = np.random.default_rng(seed)
+    person_ids = [row[0] for row in con.execute("SELECT id FROM people WHERE active")]
+    pref_ids = [row[0] for row in con.execute("SELECT id FROM preferences")]
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            with con:
+                if rng.random() < .5:
+                    repository.replace_request(
+                        con, monday, int(rng.choice(person_ids)),
+                        [int(mask) for mask in rng.integers(0, 128, size = 7)]
+                    )
+                else:
+                    con.executemany(
+                        "UPDATE preferences SET preference = ? WHERE id = ?",
+                        [(int(rng.integers(0, 6)), pref_id) for pref_id in pref_ids]
+                    )
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    con.close()
+    queue.put(('write', latencies, errors))
+
+def run(source, settings, readers, writers, seconds, monday):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'chores.db')
+        shutil.copy(source, path)
+        con = sqlite3.connect(path)
+        con.execute('PRAGMA journal_mode = ' + ('WAL' if settings['wal'] else 'DELETE'))
+        con.close()
+        queue = multiprocessing.Queue()
+        deadline = time.time() + 1 + seconds
+        processes = [
+            multiprocessing.Process(target = reader, args = (path, settings, monday, deadline, queue))
+            for _ in range(readers)
+        ] + [
+            multiprocessing.Process(target = writer, args = (path, settings, monday, deadline, queue, seed))
+            for seed in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    report = {}
+    for kind in ('read', 'write'):
+        latencies = np.concatenate([result[1] for result in results if result[0] == kind] + [[]])
+        report[kind] = {
+            'ops_per_sec': len(latencies)/seconds,
+            'p50_ms': 1000*float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p95_ms': 1000*float(np.percentile(latencies, 95)) if len(latencies) else None,
+            'p99_ms': 1000*float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'errors': sum(result[2] for result in results if result[0] == kind),
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--readers', type = int, default = 4)
+    parser.add_argument('--writers', type = int, default = 2)
+    parser.add_argument('--seconds', type = float, default = 5)
+    parser.add_argument('--timeout', type = float, default = 5, help = 'busy timeout in seconds')
+    parser.add_argument('--monday', default = None, help = 'week the readers load (default latest)')
+    parser.add_argument('--json', help = 'write the results to this file')
+    args = parser.parse_args()
+    monday = args.monday
+    if monday is None:
+        with sqlite3.connect(args.db) as con:
+            monday = repository.get_assignment_weeks(con).iloc[-1]
+    results = {}
+    for name, wal in (('rollback journal', False), ('wal', True)):
+        settings = {'wal': wal, 'timeout': args.timeout}
+        results[name] = run(args.db, settings, args.readers, args.writers, args.seconds, monday)
+        for kind, stats in results[name].items():
+            print(f"{name:16s} {kind:5s} {stats['ops_per_sec']:8.1f} ops/s  "
+                  f"p50 {stats['p50_ms'] or 0:7.2f}ms  p95 {stats['p95_ms'] or 0:7.2f}ms  "
+                  f"p99 {stats['p99_ms'] or 0:7.2f}ms  errors {stats['errors']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# show the query plans and timings of the week-scoped queries before
+# and after the migrations, on an in-memory copy of the chore database
+# (optionally padded with synthetic weeks of history)
+import argparse
+import json
+import sqlite3
+import time
+import numpy as np
+import migrations
+from maitri_db import db
+
+# (name, sql, parameters) of the queries the app runs every week
+QUERIES = [
+    ('requests of a week',
+     "SELECT * FROM requests WHERE week_start_date BETWEEN ? AND ?",
+     ('2026-05-11', '2026-05-11')),
+    ('request of a person',
+     "SELECT * FROM requests WHERE person_id = ? AND week_start_date = ?",
+     (3, '2026-05-11')),
+    ('deficit',
+     """SELECT h.person_id, SUM(leftover_hours) AS leftover_hours
+     FROM hours AS h JOIN people AS p ON h.person_id = p.id
+     WHERE p.active AND week_start_date = ? GROUP BY person_id""",
+     ('2026-05-04',)),
+    ('last performed',
+     """SELECT task_id AS id, MAX(week_start_date) AS date_last_performed
+     FROM assignments WHERE task_type = ? AND week_start_date < ?
+     GROUP BY task_id""",
+     ('occasional', '2026-05-11')),
+    ('assignments of a week',
+     "SELECT * FROM assignments WHERE week_start_date = ?",
+     ('2026-05-11',)),
+    ('timed assignments of a week',
+     "SELECT * FROM assignments_timed WHERE week_start_date = ?",
+     ('2026-05-11',)),
+    ('preference of a person',
+     "SELECT preference FROM preferences WHERE task = ? AND person_id = ?",
+     ('House Meal', 3)),
+]
+
+def pad_history(con, weeks: int, seed: int):
+    # copy the last planned week back in time so that the tables look
+    # like several years of use
+    rng = np.random.default_rng(seed)
+    for table in ('requests', 'hours', 'assignments', 'assignments_timed'):
+        last = con.execute(f"SELECT MAX(week_start_date) FROM {table} WHERE week_start_date != 'NaT'").fetchone()[0]
+        columns = [row[1] for row in con.execute(f'PRAGMA table_info({table})')]
+        rows = con.execute(f'SELECT * FROM {table} WHERE week_start_date = ?', (last,)).fetchall()
+        for week in range(1, weeks + 1):
+            monday = str(np.datetime64(last) - np.timedelta64(7*(week + 520), 'D'))
+            con.executemany(
+                f"INSERT INTO {table} VALUES ({', '.join('?'*len(columns))})",
+                [(monday,) + row[1:] for row in rows if rng.random() < .95]
+            )
+    con.commit()
+
+def measure(con, repeat: int):
+    results = {}
+    for name, sql, params in QUERIES:
+        plan = [row[3] for row in con.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            con.execute(sql, params).fetchall()
+        results[name] = {
+            'plan': plan,
+            'ms': 1000*(time.perf_counter() - start)/repeat,
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--pad-weeks', type = int, default = 0,
+                        help = 'synthetic weeks of history to add')
+    parser.add_argument('--repeat', type = int, default = 200)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--json', help = 'write the results to this file')
+    args = parser.parse_args()
+    con = sqlite3.connect(':memory:')
+    with sqlite3.connect(args.db) as source:
+        source.backup(con)
+    # the plans of the database as it is, then of the migrated one
+    migrations.migrate(con, target = 1)
+    pad_history(con, args.pad_weeks, args.seed)
+    con.execute('ANALYZE')
+    before = measure(con, args.repeat)
+    migrations.migrate(con)
+    con.execute('ANALYZE')
+    after = measure(con, args.repeat)
+    for name, _, _ in QUERIES:
+        print(f"{name}: {before[name]['ms']:.3f}ms -> {after[name]['ms']:.3f}ms")
+        print('   before:', '; '.join(before[name]['plan']))
+        print('   after: ', '; '.join(after[name]['plan']))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'before': before, 'after': after}, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# compare the greedy and the optimal solver on the historical weeks in
+# the chore database, every run works on a scratch copy of the database;
+# the optimal solver can trade seasonal and occasional hours for the
+# preferences of the weekly tasks (see assign_chores.assign_optimal),
+# the weeks where it does are counted at the end
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import assign_chores
+from maitri_db import db
+
+def get_weeks(db_path):
+    with sqlite3.connect(db_path) as con:
+        weeks = [row[0] for row in con.execute(
+            "SELECT DISTINCT week_start_date FROM requests ORDER BY week_start_date"
+        )]
+    return [week for week in weeks if week and week[0].isdigit()]
+
+def score_week(db_path, monday):
+    # assigned hours by task type, unassigned weekly hours, the sum of
+    # the preferences of the assigned chores and the spread of the
+    # leftover hours
+    with sqlite3.connect(db_path) as con:
+        chores = pd.read_sql(con = con, params = (monday,), sql = """
+            SELECT a.person_id, a.task_type, t.task, t.duration_hours
+            FROM assignments AS a JOIN (
+                SELECT id, task, duration_hours, 'weekly' AS task_type FROM weekly_tasks
+                UNION ALL SELECT id, task, duration_hours, 'seasonal' FROM seasonal_tasks
+                UNION ALL SELECT id, task, duration_hours, 'occasional' FROM occasional_tasks
+            ) AS t ON a.task_id = t.id AND a.task_type = t.task_type
+            WHERE a.week_start_date = ?""")
+        weekly_hours = con.execute("SELECT SUM(duration_hours) FROM weekly_tasks").fetchone()[0]
+        preferences = pd.read_sql(con = con, sql = "SELECT task, person_id, preference FROM preferences")
+        hours = pd.read_sql(con = con, params = (monday,), sql = """
+            SELECT leftover_hours FROM hours
+            WHERE week_start_date = ? AND target_hours > 0""")
+    assigned = chores.groupby('task_type').duration_hours.sum()
+    satisfaction = chores.merge(preferences, on = ['task', 'person_id'], how = 'left').preference
+    return {
+        'weekly_hours': float(assigned.get('weekly', 0)),
+        'seasonal_hours': float(assigned.get('seasonal', 0)),
+        'occasional_hours': float(assigned.get('occasional', 0)),
+        'unassigned_weekly_hours': float(weekly_hours - assigned.get('weekly', 0)),
+        'preference': float(satisfaction.fillna(0).sum()),
+        'leftover_std': float(hours.leftover_hours.std()) if len(hours) > 1 else 0.,
+    }
+
+def run_week(db_path, monday, solver, seed):
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = os.path.join(tmp, 'chores.db')
+        shutil.copy(db_path, scratch)
+        np.random.seed(seed)
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                success, message = assign_chores.assign_chores(
+                    pd.to_datetime(monday).date(), solver = solver, database = scratch
+                )
+        except Exception as error:
+            success, message = False, repr(error)
+        result = {'seconds': time.perf_counter() - start, 'success': success}
+        if success:
+            result.update(score_week(scratch, monday))
+        else:
+            result['message'] = message
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--weeks', type = int, default = 0,
+                        help = 'only the last WEEKS weeks (default all)')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--json', help = 'write the results to this file')
+    args = parser.parse_args()
+    weeks = get_weeks(args.db)[-args.weeks:] if args.weeks else get_weeks(args.db)
+    results = {}
+    for monday in weeks:
+        results[monday] = {
+            solver: run_week(args.db, monday, solver, args.seed)
+            for solver in ('greedy', 'optimal')
+        }
+        greedy, optimal = results[monday]['greedy'], results[monday]['optimal']
+        if greedy['success'] and optimal['success']:
+            print(f"{monday}  unassigned weekly h {greedy['unassigned_weekly_hours']:5.2f} -> "
+                  f"{optimal['unassigned_weekly_hours']:5.2f}  "
+                  f"seasonal+occasional h {greedy['seasonal_hours'] + greedy['occasional_hours']:5.2f} -> "
+                  f"{optimal['seasonal_hours'] + optimal['occasional_hours']:5.2f}  "
+                  f"preference {greedy['preference']:5.0f} -> {optimal['preference']:5.0f}  "
+                  f"time {greedy['seconds']:.2f}s -> {optimal['seconds']:.2f}s")
+        else:
+            print(monday, 'failed:', greedy.get('message'), optimal.get('message'))
+    both = [
+        result for result in results.values()
+        if result['greedy']['success'] and result['optimal']['success']
+    ]
+    def later_hours(result):
+        return result['seasonal_hours'] + result['occasional_hours']
+    fewer = sum(later_hours(result['optimal']) < later_hours(result['greedy']) - 1e-9 for result in both)
+    more = sum(later_hours(result['optimal']) > later_hours(result['greedy']) + 1e-9 for result in both)
+    print(f'seasonal+occasional hours of optimal vs greedy: fewer in {fewer}, '
+          f'more in {more} of {len(both)} weeks')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
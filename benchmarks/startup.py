@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# startup cost of a chore_chart worker: the import time of the app, the
+# modules it loads and the latency of the first request to a few
+# pages, each measured in a fresh interpreter, once as a worker that
+# imports the solver and the Google integrations lazily and once after
+# create_app(preload = True) as with gunicorn --preload (where the
+# import cost is paid once by the master)
+import argparse
+import json
+import subprocess
+import sys
+import numpy as np
+from maitri_db import db
+
+# runs in the fresh interpreter, prints a JSON report
+WORKER = """
+import json, resource, sys, time
+start = time.perf_counter()
+import chore_chart
+report = {'import': time.perf_counter() - start}
+if sys.argv[1] == 'preload':
+    start = time.perf_counter()
+    chore_chart.create_app(preload = True)
+    report['preload'] = time.perf_counter() - start
+chore_chart.app.config['DATABASE'] = sys.argv[2]
+report['modules'] = len(sys.modules)
+report['lazy_loaded'] = [name for name in chore_chart.LAZY_MODULES if name in sys.modules]
+client = chore_chart.app.test_client()
+for path in sys.argv[3:]:
+    start = time.perf_counter()
+    status = client.get(path).status_code
+    report[path] = time.perf_counter() - start
+    report[path + ' status'] = status
+report['maxrss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+print(json.dumps(report))
+"""
+
+def measure(mode: str, database: str, paths, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', WORKER, mode, database, *paths],
+            capture_output = True, text = True, check = True
+        ).stdout
+        runs.append(json.loads(out.splitlines()[-1]))
+    result = {
+        key: float(np.median([run[key] for run in runs]))
+        for key in runs[0] if isinstance(runs[0][key], float)
+    }
+    result['modules'] = runs[0]['modules']
+    result['lazy_loaded'] = runs[0]['lazy_loaded']
+    result['status'] = {path: runs[0][path + ' status'] for path in paths}
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--paths', default = '/robots.txt,/,/people,/prefs,/assignments',
+                        help = 'comma separated pages requested in order')
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--json', help = 'write the results to this file')
+    args = parser.parse_args()
+    paths = args.paths.split(',')
+    results = {}
+    for mode in ('lazy', 'preload'):
+        results[mode] = measure(mode, args.db, paths, args.repeat)
+        result = results[mode]
+        print(f"{mode:8s} import {result['import']:.3f}s" +
+              (f"  preload {result['preload']:.3f}s" if 'preload' in result else '') +
+              f"  {result['modules']} modules  {result['maxrss_mb']:.0f} MB  first requests: " +
+              '  '.join(f'{path} {1000*result[path]:.1f}ms' for path in paths))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent = 2)
+
+if __name__ == '__main__':
+    main()
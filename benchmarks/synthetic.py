@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# time the assignment engine on synthetic houses of configurable size
+# held in in-memory SQLite databases, with one timing per phase of
+# solve_week, and write a JSON report that can be compared between
+# commits with --compare
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sqlite3
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+import assign_chores
+
+# the daily tasks the engine looks up by name
+DAILY_TASKS = [
+    ('House Meal', 2.5),
+    ('Sous Chef for House Meal', 0.5),
+    ('Meal Cleanup Lead', 0.75),
+    ('Meal Cleanup Helper', 0.75),
+    ('Night Cleanup', 0.5),
+    ('Unload Dishes AM', 0.25),
+    ('Unload Dishes PM', 0.25),
+]
+# weekly tasks with custom logic in the engine
+SPECIAL_WEEKLY_TASKS = [('Bathrm, Main', 1.0), ('Manage Trash & Recycling', 0.5)]
+PHASES = ('load', 'setup', 'meals', 'cleanup_lead', 'cleanup_helper', 'sweep',
+          'weekly', 'dishes', 'seasonal', 'occasional', 'finish')
+
+def random_masks(rng, size, p_any, p_day):
+    # availability masks: a fraction p_any of the people volunteer and
+    # each of them is available on a day with probability p_day
+    days = rng.random((size, 7)) < p_day
+    masks = days.astype(np.int64) @ (1 << np.arange(6, -1, -1))
+    return np.where(rng.random(size) < p_any, masks, 0)
+
+def task_table(rng, prefix, count, first_id = 0):
+    return pd.DataFrame({
+        'id': np.arange(first_id, first_id + count),
+        'task': [f'{prefix} {k}' for k in range(count)],
+        'category': prefix,
+        'description': '',
+        'duration_hours': rng.choice([0.25, 0.5, 0.75, 1.0], size = count),
+    })
+
+def make_house(num_people: int, num_tasks: int, monday, seed: int = 0):
+    # returns an in-memory database with the tables assign_chores reads
+    # for the week of monday; the tasks are split 60/25/15 between
+    # weekly, occasional and seasonal tasks
+    rng = np.random.default_rng(seed)
+    people = pd.DataFrame({
+        'id': np.arange(num_people),
+        'first_name': [f'Resident{k}' for k in range(num_people)],
+        'last_name': '',
+        'load_fraction': rng.choice([0.5, 0.75, 1.0], size = num_people, p = [.1, .1, .8]),
+        'parent': (rng.random(num_people) < .1).astype(int),
+        'active': 1,
+        'email': '',
+    })
+    num_weekly = max(len(SPECIAL_WEEKLY_TASKS), int(.6*num_tasks))
+    num_occasional = max(1, int(.25*num_tasks))
+    num_seasonal = max(1, num_tasks - num_weekly - num_occasional)
+    daily = pd.DataFrame({
+        'id': np.arange(len(DAILY_TASKS)),
+        'task': [task for task, _ in DAILY_TASKS],
+        'category': 'Daily',
+        'description': '',
+        'duration_hours': [hours for _, hours in DAILY_TASKS],
+    })
+    weekly = task_table(rng, 'Weekly', num_weekly)
+    weekly.loc[:len(SPECIAL_WEEKLY_TASKS) - 1, ['task', 'duration_hours']] = SPECIAL_WEEKLY_TASKS
+    occasional = task_table(rng, 'Occasional', num_occasional).assign(
+        frequency_weeks = rng.choice([2., 4., 8.], size = num_occasional)
+    )
+    start = rng.integers(1, 13, size = num_seasonal)
+    seasonal = task_table(rng, 'Seasonal', num_seasonal).assign(
+        frequency_days = rng.choice([30, 60, 120], size = num_seasonal),
+        start_date = [f'{month:02d}/01' for month in start],
+        end_date = [f'{(month + 3) % 12 + 1:02d}/01' for month in start],
+    )
+    frames = [
+        pd.DataFrame({'task': tasks.task, 'task_type': task_type})
+        for task_type, tasks in (('daily', daily), ('weekly', weekly),
+                                 ('occasional', occasional), ('seasonal', seasonal))
+    ]
+    tasks = pd.concat(frames, ignore_index = True)
+    preferences = pd.DataFrame({
+        'task': np.tile(tasks.task.to_numpy(), num_people),
+        'task_type': np.tile(tasks.task_type.to_numpy(), num_people),
+        'person_id': np.repeat(people.id.to_numpy(), len(tasks)),
+        'preference': rng.choice(6, size = num_people*len(tasks),
+                                 p = [.2, .07, .12, .35, .13, .13]),
+    })
+    preferences.insert(0, 'id', np.arange(len(preferences)))
+    requests = pd.DataFrame({
+        'week_start_date': str(monday),
+        'person_id': people.id,
+        'days_in_town': random_masks(rng, num_people, .95, .9),
+        'dishes_am': random_masks(rng, num_people, .3, .5),
+        'dishes_pm': random_masks(rng, num_people, .3, .5),
+        'cook_meal': random_masks(rng, num_people, .25, .3),
+        'sous_chef': random_masks(rng, num_people, .2, .3),
+        'meal_cleanup': random_masks(rng, num_people, .6, .6),
+        'night_sweep': random_masks(rng, num_people, .4, .5),
+    })
+    prev_monday = monday - pd.Timedelta(days = 7)
+    hours = pd.DataFrame({
+        'week_start_date': str(prev_monday),
+        'person_id': people.id,
+        'days_in_town': 7.,
+        'hours_worked': 4.,
+        'target_hours': 4.,
+        'leftover_hours': rng.normal(0, .5, size = num_people),
+    })
+    # some seasonal and occasional tasks were done a few weeks ago
+    history = pd.concat((
+        pd.DataFrame({'task_type': 'occasional', 'task_id': occasional.id}),
+        pd.DataFrame({'task_type': 'seasonal', 'task_id': seasonal.id}),
+    ), ignore_index = True).sample(frac = .5, random_state = seed)
+    assignments = history.assign(
+        week_start_date = [str(monday - pd.Timedelta(days = 7*int(weeks)))
+                           for weeks in rng.integers(1, 10, size = len(history))],
+        person_id = rng.integers(0, num_people, size = len(history)),
+    )[['week_start_date', 'person_id', 'task_type', 'task_id']]
+
+    con = sqlite3.connect(':memory:')
+    tables = {
+        'people': people, 'daily_tasks': daily, 'weekly_tasks': weekly,
+        'occasional_tasks': occasional, 'seasonal_tasks': seasonal,
+        'preferences': preferences, 'requests': requests, 'hours': hours,
+        'assignments': assignments,
+        'assignments_timed': pd.DataFrame(columns = assign_chores.WEEK_COLUMNS['assignments_timed']).astype(
+            {'person_id': int, 'weekday': int, 'task_id': int}
+        ),
+    }
+    for table, frame in tables.items():
+        frame.to_sql(con = con, name = table, index = False)
+    return con
+
+def run_scenario(num_people: int, num_tasks: int, solver: str, seed: int,
+                 repeat: int, monday):
+    # median seconds per phase over the repeats, the database is built
+    # once and every repeat reads it and solves the week again
+    con = make_house(num_people, num_tasks, monday, seed)
+    fixed_chores_config = {'weekly': [], 'occasional': []}
+    runs = []
+    for _ in range(repeat):
+        timings = {}
+        start = time.perf_counter()
+        catalog = assign_chores.load_catalog(con)
+        requests = assign_chores.load_requests(con, monday, monday)
+        deficit = assign_chores.load_deficit(con, monday)
+        last_performed = assign_chores.load_last_performed(con, monday)
+        timings['load'] = time.perf_counter() - start
+        with contextlib.redirect_stdout(io.StringIO()):
+            success, message, week = assign_chores.solve_week(
+                monday, catalog, requests, deficit, last_performed,
+                fixed_chores_config, solver, seed = seed, timings = timings
+            )
+        timings['total'] = time.perf_counter() - start
+        runs.append(timings)
+    con.close()
+    result = {
+        'people': num_people,
+        'tasks': num_tasks,
+        'solver': solver,
+        'success': success,
+        'phases': {phase: float(np.median([run.get(phase, 0.) for run in runs]))
+                   for phase in PHASES + ('total',)},
+    }
+    if success:
+        result['score'] = week['assignment_runs'][
+            ['unassigned_hours', 'leftover_std', 'preference']
+        ].iloc[0].to_dict()
+    else:
+        result['message'] = message
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True,
+                              text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline):
+    # print the ratio of the total and the slowest phases to a baseline
+    # report, scenarios are matched on people, tasks and solver
+    key = lambda result: (result['people'], result['tasks'], result['solver'])
+    before = {key(result): result for result in baseline['scenarios']}
+    for result in report['scenarios']:
+        old = before.get(key(result))
+        if old is None:
+            continue
+        ratios = {
+            phase: result['phases'][phase]/old['phases'][phase]
+            for phase in result['phases'] if old['phases'].get(phase, 0) > 0
+        }
+        slowest = sorted(PHASES, key = lambda phase: -old['phases'].get(phase, 0))[:3]
+        print(f"{key(result)}: total x{ratios['total']:.2f}  " + '  '.join(
+            f'{phase} x{ratios[phase]:.2f}' for phase in slowest if phase in ratios
+        ))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', default = '10x10,50x50,200x200,2000x1000',
+                        help = 'comma separated PEOPLExTASKS scenarios')
+    parser.add_argument('--solver', choices = ('greedy', 'optimal'), default = 'greedy')
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--monday', default = '2026-05-11')
+    parser.add_argument('--json', help = 'write the report to this file')
+    parser.add_argument('--compare', help = 'a previous report to compare with')
+    args = parser.parse_args()
+    monday = pd.to_datetime(args.monday).date()
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'scenarios': [],
+    }
+    for scale in args.scales.split(','):
+        num_people, num_tasks = (int(value) for value in scale.split('x'))
+        result = run_scenario(num_people, num_tasks, args.solver, args.seed, args.repeat, monday)
+        report['scenarios'].append(result)
+        phases = result['phases']
+        print(f"{num_people:5d} people {num_tasks:5d} tasks  total {phases['total']:7.3f}s  " +
+              '  '.join(f'{phase} {phases[phase]:.3f}' for phase in PHASES) +
+              ('' if result['success'] else f"  failed: {result['message']}"))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent = 2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == '__main__':
+    main()
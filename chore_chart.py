@@ -1,22 +1,113 @@
 #!/usr/bin/env python3
-
-from flask import Flask, redirect, request, send_from_directory
+# the solver (assign_chores, reassign_chores) and the Google
+# integrations (construct_gsheet, chore_mailer) are imported by the
+# routes and jobs that use them, so a worker that only serves the other
+# pages never loads them; create_app(preload = True) imports them up
+# front for gunicorn --preload
+import argparse
+import importlib
+import itertools
+import json
+import os
+import threading
+from contextlib import closing
+from flask import Flask, redirect, request, send_from_directory, g, jsonify
 from flask import render_template, flash, url_for
-import sqlite3
+from werkzeug.http import is_resource_modified
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta
-from maitri_db import db
-import assign_chores
-import construct_gsheet
-import multiprocessing
-from construct_gsheet import GsheetConstructor
-from chore_mailer import ChoreMailer
+from datetime import date, datetime, timedelta, timezone
+from maitri_db import db, connect
+from param import sqlite_wal, sqlite_busy_timeout_sec, sqlite_cached_statements
+from param import job_workers, job_queue_size, api_page_rows, api_max_page_rows
+import repository
+import jobs
+import history
+import archive
 import yaml
-from collections import defaultdict
+
+# the modules the routes import on first use
+LAZY_MODULES = ('assign_chores', 'reassign_chores', 'construct_gsheet', 'chore_mailer')
 
 app = Flask(__name__)
 app.secret_key = 'compassionatecommunication'
+# the database and the settings of its connections, see maitri_db.connect
+app.config.from_mapping(
+    DATABASE = db,
+    SQLITE_WAL = sqlite_wal,
+    SQLITE_BUSY_TIMEOUT_SEC = sqlite_busy_timeout_sec,
+    SQLITE_CACHED_STATEMENTS = sqlite_cached_statements,
+    # the background jobs, JOB_BACKENDS replaces the functions that run
+    # them (e.g. jobs.stub_backend instead of the Google ones)
+    JOB_WORKERS = job_workers,
+    JOB_QUEUE_SIZE = job_queue_size,
+    JOB_BACKENDS = None,
+)
+
+def create_app(preload: bool = False, **config):
+    # app factory for gunicorn, e.g.
+    #   gunicorn 'chore_chart:create_app()'
+    #   gunicorn --preload 'chore_chart:create_app(preload=True)'
+    # with preload the master imports the lazily loaded modules once and
+    # the forked workers share them copy-on-write; config overrides
+    # app.config (DATABASE, SQLITE_WAL, ...)
+    app.config.update(config)
+    if preload:
+        for name in LAZY_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError as error:
+                # the routes that need it fail when they are used
+                app.logger.warning(f'Not preloading {name}: {error}')
+    return app
+
+def get_db():
+    # one connection per request, opened on first use and closed when
+    # the request ends, so its prepared statements are reused by all
+    # the queries of the request
+    if 'con' not in g:
+        g.con = open_connection()
+    return g.con
+
+def open_connection():
+    return connect(
+        app.config['DATABASE'],
+        wal = app.config['SQLITE_WAL'],
+        timeout = app.config['SQLITE_BUSY_TIMEOUT_SEC'],
+        cached_statements = app.config['SQLITE_CACHED_STATEMENTS'],
+    )
+
+@app.teardown_appcontext
+def close_db(error):
+    con = g.pop('con', None)
+    if con is not None:
+        con.close()
+
+def set_validators(response, etag: str, modified):
+    # modified is unix seconds or None; clients keep the page but check
+    # it with the server every time
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = datetime.fromtimestamp(modified, timezone.utc)
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag: str, modified):
+    # the 304 response when the copy of the client (If-None-Match or
+    # If-Modified-Since) is current, otherwise None
+    last_modified = None if modified is None else datetime.fromtimestamp(modified, timezone.utc)
+    if is_resource_modified(request.environ, etag = etag, last_modified = last_modified):
+        return None
+    return set_validators(app.response_class(status = 304), etag, modified)
+
+def week_validators(con, monday):
+    # the ETag and modification time of a week page: the versions of the
+    # week and of ALL_WEEKS and the fixed chores file, whose credits
+    # show in the page
+    week, every, modified = repository.get_week_version(con, monday)
+    fixed_modified = os.path.getmtime('fixed_chores.yaml')
+    return (f'{monday}-{week}-{every}-{int(fixed_modified)}',
+            fixed_modified if modified is None else max(modified, fixed_modified))
 
 def int_to_bits(number: int):
     return list(np.binary_repr(number, 7))
@@ -34,30 +125,22 @@ def people():
     today = date.today()
     this_monday = today - timedelta(days = today.weekday())
     next_monday = this_monday + timedelta(days = 7)
-    with sqlite3.connect(db) as con:
-        people = pd.read_sql(con=con, sql="SELECT * FROM people")
+    with get_db() as con:
+        people = repository.get_people(con)
     return render_template("people.html", people = people,
                            this_monday = this_monday,
                            next_monday = next_monday)
 
 @app.route("/update_person", methods=["POST"])
 def update_person():
-    person_id = request.form["id"]
+    person_id = int(request.form["id"])
     load_fraction = float(request.form["frac"])
     if load_fraction < 0: load_fraction = 0
     if load_fraction > 1: load_fraction = 1
     parent = 1 if "parent" in request.form else 0
     active = 1 if "active" in request.form else 0
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        cursor.execute(
-            f"""UPDATE people SET
-            load_fraction = {load_fraction},
-            parent = {parent},
-            active = {active}
-            WHERE id = {person_id}"""
-        )
-        con.commit()
+    with get_db() as con:
+        repository.update_person(con, person_id, load_fraction, parent, active)
     return redirect(url_for("people"))
 
 @app.route("/add_person", methods=["POST"])
@@ -67,45 +150,21 @@ def add_person():
     frac = float(request.form["frac"].strip())
     email = request.form["email"].strip()
     parent = 1 if "parent" in request.form else 0
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        cursor.execute("SELECT MAX(id) FROM people")
-        person_id = 1 + cursor.fetchone()[0]
-        cursor.execute(
-            f"""INSERT INTO people
-            VALUES ('{person_id}', '{first_name}', '{last_name}',
-            {frac}, {parent}, 1, '{email}')"""
-        )
-        con.commit()
-        # create default chore preferences for this person
-        prefs = pd.read_sql(con=con, sql="SELECT DISTINCT task, task_type FROM preferences")
-        prefs["person_id"] = person_id
-        prefs["preference"] = 3
-        # reindex to make sure no duplicate ids exist
-        cursor.execute("SELECT MAX(id) FROM preferences")
-        min_new_idx = 1 + cursor.fetchone()[0]
-        prefs.index = np.arange(min_new_idx, min_new_idx + len(prefs))
-        prefs.to_sql(
-            con = con,
-            name = "preferences",
-            if_exists = "append",
-            index_label = "id"
-        )
-
+    # the person and the default preferences in one transaction
+    with get_db() as con:
+        repository.add_person(con, first_name, last_name, frac, parent, email)
     return redirect(url_for("people"))
 
 @app.route("/tasks")
 def tasks():
-    with sqlite3.connect(db) as con:
-        daily_tasks = pd.read_sql(con=con, sql="SELECT * FROM daily_tasks")
-        weekly_tasks = pd.read_sql(con=con, sql="SELECT * FROM weekly_tasks")
-        occasional_tasks = pd.read_sql(
-            con=con, sql="SELECT * FROM occasional_tasks",
-            parse_dates = 'date_last_performed'
+    with get_db() as con:
+        daily_tasks = repository.get_tasks(con, 'daily')
+        weekly_tasks = repository.get_tasks(con, 'weekly')
+        occasional_tasks = repository.get_tasks(
+            con, 'occasional', parse_dates = 'date_last_performed'
         )
-        seasonal_tasks = pd.read_sql(
-            con=con, sql="SELECT * FROM seasonal_tasks",
-            parse_dates = 'date_last_performed'
+        seasonal_tasks = repository.get_tasks(
+            con, 'seasonal', parse_dates = 'date_last_performed'
         )
     return render_template(
         "tasks.html",
@@ -115,222 +174,130 @@ def tasks():
         seasonal_chores = seasonal_tasks
     )
 
+# the fields of the task forms a new task can not do without, keys are
+# the task types, values map the columns to the fields
+REQUIRED_TASK_FIELDS = {
+    'weekly': {'task': "name", 'duration_hours': "duration"},
+    'occasional': {'task': "name", 'duration_hours': "duration", 'frequency_weeks': "frequency"},
+    'seasonal': {'task': "name", 'duration_hours': "duration", 'frequency_days': "frequency",
+                 'start_date': "season_start", 'end_date': "season_end"},
+}
+
+def task_form(task_type: str, form, new: bool = False) -> dict:
+    # the columns of a task from the fields of the add and edit forms
+    # that are filled in, a new task needs the REQUIRED_TASK_FIELDS; a
+    # blank name, a missing required field or one that is not a number
+    # is a ValueError
+    values = {
+        'task': form.get("name"),
+        'category': form.get("category"),
+        'description': form.get("description"),
+        'duration_hours': form.get("duration", type = float),
+    }
+    if task_type == 'occasional':
+        values['frequency_weeks'] = form.get("frequency", type = float)
+    if task_type == 'seasonal':
+        values['frequency_days'] = form.get("frequency", type = int)
+        for column, field in (('start_date', "season_start"), ('end_date', "season_end")):
+            if form.get(field):
+                values[column] = form[field] + "/01"
+    if values['task'] is not None and not values['task'].strip():
+        raise ValueError('The task needs a name')
+    missing = [
+        field for column, field in REQUIRED_TASK_FIELDS.get(task_type, {}).items()
+        if values.get(column) is None and (new or form.get(field))
+    ]
+    if missing:
+        raise ValueError(f"Missing or invalid fields of the {task_type} task: {', '.join(missing)}")
+    return {column: value for column, value in values.items() if value is not None}
+
+def add_task(task_type: str):
+    try:
+        values = task_form(task_type, request.form, new = True)
+    except ValueError as error:
+        return str(error), 400
+    with get_db() as con:
+        repository.add_task(con, task_type, values)
+    return redirect(url_for("tasks"))
+
+def delete_task(task_type: str):
+    with get_db() as con:
+        repository.delete_task(con, task_type, int(request.form["id"]))
+    return redirect(url_for("tasks"))
+
 @app.route("/add_weekly_task", methods=["POST"])
 def add_weekly_task():
-    name = request.form["name"]
-    description = request.form["description"]
-    category = request.form["category"]
-    duration = request.form["duration"]
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        # get the MAX preference_id
-        cursor.execute("SELECT MAX(id) FROM preferences")
-        pref_id = cursor.fetchone()[0]
-        # get all person ids
-        cursor.execute("SELECT id FROM people WHERE active")
-        for person_id in cursor.fetchall():
-            pref_id += 1
-            cursor.execute(
-                f"""INSERT INTO preferences VALUES
-                ({pref_id}, '{name}', 'weekly', {person_id[0]}, 3)"""
-            )
-        # get the new task id
-        cursor.execute("SELECT MAX(id) FROM weekly_tasks")
-        task_id = 1 + cursor.fetchone()[0]
-        cursor.execute(
-            f"""INSERT INTO weekly_tasks VALUES
-            ({task_id}, '{name}', '{category}',
-            '{description}', {duration})"""
-        )
-        con.commit()
-    return redirect(url_for("tasks"))
+    return add_task('weekly')
 
 @app.route("/add_occasional_task", methods=["POST"])
 def add_occasional_task():
-    name = request.form["name"]
-    description = request.form["description"]
-    category = request.form["category"]
-    duration = request.form["duration"]
-    frequency = request.form["frequency"]
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        # get the MAX preference_id
-        cursor.execute("SELECT MAX(id) FROM preferences")
-        pref_id = cursor.fetchone()[0]
-        # get all person ids
-        cursor.execute("SELECT id FROM people WHERE active")
-        for person_id in cursor.fetchall():
-            pref_id += 1
-            cursor.execute(
-                f"""INSERT INTO preferences VALUES
-                ({pref_id}, '{name}', 'occasional', {person_id[0]}, 3)"""
-            )
-        # get the new task id
-        cursor.execute("SELECT MAX(id) FROM occasional_tasks")
-        task_id = 1 + cursor.fetchone()[0]
-        cursor.execute(
-            f"""INSERT INTO occasional_tasks VALUES
-            ({task_id}, '{name}', '{category}',
-            '{description}', {duration}, {frequency})"""
-        )
-        con.commit()
-    return redirect(url_for("tasks"))
+    return add_task('occasional')
 
 @app.route("/add_seasonal_task", methods=["POST"])
 def add_seasonal_task():
-    name = request.form["name"]
-    description = request.form["description"]
-    duration = request.form["duration"]
-    frequency = request.form["frequency"]
-    category = request.form["category"]
-    start = request.form["season_start"] + "/01"
-    end = request.form["season_end"] + "/01"
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        # get the MAX preference_id
-        cursor.execute("SELECT MAX(id) FROM preferences")
-        pref_id = cursor.fetchone()[0]
-        # get all person ids
-        cursor.execute("SELECT id FROM people WHERE active")
-        for person_id in cursor.fetchall():
-            pref_id += 1
-            cursor.execute(
-                f"""INSERT INTO preferences VALUES
-                ({pref_id}, '{name}', 'seasonal', {person_id[0]}, 3)"""
-            )
-        cursor.execute("SELECT MAX(id) FROM seasonal_tasks")
-        task_id = 1 + cursor.fetchone()[0]
-        cursor.execute(
-            f"""INSERT INTO seasonal_tasks VALUES
-            ({task_id}, '{name}', '{category}',
-            '{description}', {duration}, {frequency},
-            '{start}', '{end}')"""
-        )
-        con.commit()
-    return redirect(url_for("tasks"))
+    return add_task('seasonal')
 
 @app.route("/delete_weekly_task", methods=["POST"])
 def delete_weekly_task():
-    task_id = request.form["id"]
-    task_name = request.form["name"]
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        cursor.execute(
-            f"DELETE FROM weekly_tasks WHERE id = {task_id}"
-        )
-        cursor.execute(
-            f"""DELETE FROM preferences
-            WHERE task_type = "weekly" AND task = "{task_name}" """
-        )
-        con.commit()
-    return redirect(url_for("tasks"))
+    return delete_task('weekly')
 
 @app.route("/edit_task", methods=["GET", "POST"])
 def edit_task():
     if request.method == "POST":
-        tid = request.form["id"]
-        ttype = request.form["type"]
-        name = request.form["name"]
-        desc = request.form.get("description")
-        duration = request.form.get("duration")
-        freq = request.form.get("frequency")
-        category = request.form.get("category")
-        start = request.form.get("season_start")
-        if start is not None: start += "/01"
-        end = request.form.get("season_end")
-        if end is not None: end += "/01"
-        query = f"""update {ttype}_tasks set
-        task = '{name}', category = '{category}',
-        description = '{desc}',
-        duration_hours = '{duration}'"""
-        if ttype == 'occasional':
-            query += f', frequency_weeks = {freq}'
-        if ttype == 'seasonal':
-            query += f""", frequency_days = {freq},
-            start_date = '{start}', end_date = '{end}'"""
-        query += f" where id = {tid}"
-        with sqlite3.connect(db) as con:
-            cursor = con.cursor() 
-            # find whether the name of the task has changed
-            cursor.execute(f'select task from {ttype}_tasks where id = {tid}')
-            old_name = cursor.fetchone()[0]
-            # if the new name is different update the task name in the
-            # preferences table
-            if old_name != name:
-                cursor.execute(f'''
-                update preferences set task = '{name}' where
-                task = '{old_name}' ''')
-            # update the tasks table
-            cursor.execute(query)
-            con.commit()
+        task_type = request.form["type"]
+        try:
+            values = task_form(task_type, request.form)
+        except ValueError as error:
+            return str(error), 400
+        with get_db() as con:
+            repository.update_task(con, task_type, int(request.form["id"]), values)
         return redirect(url_for("tasks"))
     elif request.method == "GET":
         task_id = request.args.get("id")
         task_type = request.args.get("type")
-        with sqlite3.connect(db) as con:
-            task = pd.read_sql(
-                con=con, sql=f"select * from {task_type}_tasks where id = {task_id}"
-            ).squeeze()
+        with get_db() as con:
+            task = repository.get_task(con, task_type, task_id).squeeze()
             task['task_type'] = task_type
         return render_template("edit_task.html", task = task)
-        
+
 @app.route("/delete_occasional_task", methods=["POST"])
 def delete_occasional_task():
-    task_id = request.form["id"]
-    task_name = request.form["name"]
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        cursor.execute(
-            f"DELETE FROM occasional_tasks WHERE id = {task_id}"
-        )
-        cursor.execute(
-            f"""DELETE FROM preferences
-            WHERE task_type = "occasional" AND task = "{task_name}" """
-        )
-        con.commit()
-    return redirect(url_for("tasks"))
+    return delete_task('occasional')
 
 @app.route("/delete_seasonal_task", methods=["POST"])
 def delete_seasonal_task():
-    task_id = request.form["id"]
-    task_name = request.form["name"]
-    with sqlite3.connect(db) as con:
-        cursor = con.cursor()
-        cursor.execute(
-            f"DELETE FROM seasonal_tasks WHERE id = {task_id}"
-        )
-        cursor.execute(
-            f"""DELETE FROM preferences
-            WHERE task_type = "seasonal" AND task = "{task_name}" """
-        )
-        con.commit()
-    return redirect(url_for("tasks"))
+    return delete_task('seasonal')
 
 @app.route("/prefs", methods=["GET", "POST"])
 def prefs():
-    with sqlite3.connect(db) as con:
-        # if the request is post, modify the preferences
-        cur = con.cursor()
+    with get_db() as con:
+        # if the request is post, write the preferences that changed
         if request.method == 'POST':
-            for pref_id, value in request.form.items():
-                cur.execute(f"UPDATE preferences SET preference = {value} WHERE id = {pref_id}")
+            repository.update_preferences(con, {
+                int(pref_id): int(value)
+                for pref_id, value in request.form.items() if value.strip()
+            })
             con.commit()
 
-        people = pd.read_sql(con=con, sql = f"SELECT * FROM people WHERE active")
-        people = people.rename(columns = {'id': 'person_id'})
-        prefs = pd.read_sql(con=con, sql = f"SELECT * FROM preferences")
-        prefs = prefs.merge(people[['person_id','first_name']], on = 'person_id')
-        prefs = prefs.sort_values(['task','first_name']).set_index(['task','first_name'])
-
-    return render_template("prefs.html", prefs = prefs)
+        pivot = repository.get_preference_pivot(con)
+        names = repository.get_people(con).set_index('id').first_name
+    # rows of (task, [(preference id, preference) per person]), None
+    # where a person has no preference for the task
+    ids = pivot['id'].to_numpy(dtype = object, na_value = None)
+    values = pivot['preference'].to_numpy(dtype = object, na_value = None)
+    rows = [
+        (task, list(zip(ids[k], values[k]))) for k, task in enumerate(pivot.index)
+    ]
+    return render_template("prefs.html", names = names[pivot['id'].columns].tolist(),
+                           rows = rows)
 
 @app.route("/requests/<int:person_id>/<monday>", methods=["POST", "GET"])
 def requests(person_id, monday):
     date_week_starts = pd.to_datetime(monday).date()
-    with sqlite3.connect(db) as con:
+    with get_db() as con:
 
         # get the person
-        person = pd.read_sql(con=con, sql=f"SELECT * FROM people WHERE id = {person_id}").squeeze()
+        person = repository.get_person(con, person_id).squeeze()
 
         # if method is POST, modify the requests
         if request.method == "POST":
@@ -390,25 +357,20 @@ def requests(person_id, monday):
                 sweep = int(''.join(
                     '1' if f"sweep_{b}" in request.form else '0'
                     for b in range(7)), 2)
-            cur = con.cursor()
-            cur.execute(
-                f"""DELETE FROM requests WHERE person_id = {person_id}
-                AND week_start_date = '{date_week_starts}'"""
-            )
-            cur.execute(
-                f"""INSERT INTO requests VALUES (
-                '{date_week_starts}', {person_id}, {intown}, {am}, {pm},
-                {cook}, {sous}, {clean}, {sweep})
-                """
+            repository.replace_request(
+                con, date_week_starts, person_id,
+                (intown, am, pm, cook, sous, clean, sweep)
             )
+            planned = repository.is_week_planned(con, date_week_starts)
+            if planned:
+                repository.add_pending_repair(con, date_week_starts, person_id)
             con.commit()
+            # a week that was already planned is repaired in place by a
+            # background job instead of being recomputed
+            if "form_submit" in request.form and planned:
+                return queue_job('reassign', date_week_starts, rerun = True)
         # get the requests original or modified
-        requests_df = pd.read_sql(
-            con = con,
-            sql = f"""SELECT * FROM requests
-            WHERE person_id = {person_id} AND
-            week_start_date = '{date_week_starts}'"""
-        )
+        requests_df = repository.get_person_requests(con, person_id, date_week_starts)
         # if requests are empty (either because the person does not
         # exist, or the date does not exist, add a row with all 0's
         if requests_df.empty:
@@ -429,12 +391,16 @@ def requests(person_id, monday):
 
 @app.route("/assignments")
 def current_assignment():
-    with sqlite3.connect(db) as con:
-        mondays = pd.read_sql(
-            con=con, sql="SELECT DISTINCT week_start_date FROM assignments"
-        ).week_start_date.sort_values().values
-    return render_template("assignments.html",
-                           mondays=mondays[::-1])
+    with get_db() as con:
+        count, versions, latest, modified = repository.get_weeks_version(con)
+        etag = f'weeks-{count}-{versions}-{latest}'
+        response = not_modified(etag, modified)
+        if response is not None:
+            return response
+        mondays = archive.read_assignment_weeks(con)
+    return set_validators(app.make_response(render_template(
+        "assignments.html", mondays=mondays[::-1]
+    )), etag, modified)
 
 @app.route("/chores")
 def chores():
@@ -447,85 +413,259 @@ def chores():
 
 @app.route("/assign-chores/<monday>")
 def make_chore_chart(monday):
-    success, message = assign_chores.assign_chores(pd.to_datetime(monday).date())
-    if not success:
-        flash(message, 'confirm')
-        return redirect(url_for('people'))
-    else:
-        return redirect(url_for('display_assignment', monday = monday))
+    # the week is solved by a background job, the browser waits on its
+    # progress page and lands on the assignment when it is done
+    return queue_job('assign', monday)
+
+def fixed_credits(fixed_chores: dict) -> pd.DataFrame:
+    # the custom durations of fixed_chores.yaml as (first_name, task,
+    # credit) rows, a later entry for the same person and chore wins
+    credits = pd.DataFrame(
+        [(assnmt['person'], assnmt['chore'], assnmt['credit'])
+         for assignments in fixed_chores.values() if assignments
+         for assnmt in assignments if 'credit' in assnmt],
+        columns = ['first_name', 'task', 'credit']
+    )
+    return credits.drop_duplicates(['first_name', 'task'], keep = 'last')
+
+def week_chores(assign, assign_timed, names, credits) -> dict:
+    # the chores of the week per first name (in the order of names) as
+    # frames of task, duration_hours and weekday: first the timed
+    # chores by weekday, then the others with their custom durations
+    # (an empty frame for a person whose tasks were deleted); computed
+    # for the whole week at once and split by person at the end
+    days = pd.to_datetime(assign_timed.week_start_date) + pd.to_timedelta(assign_timed.weekday, unit = 'D')
+    timed = pd.DataFrame({
+        'person_id': assign_timed.person_id,
+        'part': 0,
+        'order': assign_timed.weekday,
+        'task': assign_timed.task,
+        'duration_hours': assign_timed.duration_hours,
+        'weekday': days.dt.day_name(),
+    })
+    untimed = assign[['person_id', 'first_name', 'task', 'duration_hours']].merge(
+        credits, how = 'left', on = ['first_name', 'task']
+    )
+    untimed = pd.DataFrame({
+        'person_id': untimed.person_id,
+        'part': 1,
+        'order': 0,
+        'task': untimed.task,
+        'duration_hours': untimed.credit.fillna(untimed.duration_hours).astype(float),
+        'weekday': '',
+    })
+    rows = pd.concat((timed, untimed), ignore_index = True)
+    # the people in the order of names, each one a contiguous slice
+    rows['position'] = rows.person_id.map(pd.Series(np.arange(len(names)), index = names.index))
+    rows = rows.dropna(subset = ['position']).sort_values(['position', 'part', 'order'], kind = 'stable')
+    positions = rows.position.to_numpy()
+    rows = rows[['task', 'duration_hours', 'weekday']]
+    starts = np.searchsorted(positions, np.arange(len(names)), side = 'left')
+    ends = np.searchsorted(positions, np.arange(len(names)), side = 'right')
+    return {
+        name: rows.iloc[start:end].reset_index(drop = True)
+        for name, start, end in zip(names.values, starts, ends)
+    }
 
 def assemble_assignments(monday):
-    with sqlite3.connect(db) as con:
-        people = pd.read_sql(con=con, sql="SELECT * FROM people").set_index('id')
-        daily = pd.read_sql(con=con, sql="SELECT * FROM daily_tasks").set_index('id')
-        weekly = pd.read_sql(con=con, sql="SELECT * FROM weekly_tasks").set_index('id')
-        seasonal = pd.read_sql(con=con, sql="SELECT * FROM seasonal_tasks").set_index('id')
-        occasional = pd.read_sql(con=con, sql="SELECT * FROM occasional_tasks").set_index('id')
-        assign = pd.read_sql(con=con, sql="SELECT * FROM assignments").query(f'week_start_date == "{monday}"')
-        assign_timed = pd.read_sql(con=con, sql="SELECT * FROM assignments_timed").query(f'week_start_date == "{monday}"')
-    # fixed chores
-    fixed_chores = yaml.safe_load(open('fixed_chores.yaml'))
-    custom_duration = defaultdict(dict) # keys are the first names,
-                                        # values are dictionaries with
-                                        # task names as keys
-    for task_type, assignments in fixed_chores.items():
-        for assnmt in assignments:
-            if 'credit' in assnmt:
-                custom_duration[assnmt['person']][assnmt['chore']] = assnmt['credit']
-    
-    # construct the dict of assignments with names as keys
-    people_ids = pd.concat((assign.person_id, assign_timed.person_id)).unique()
-    chores = {}
-    for person_id in people_ids:
-        person_name = people.loc[person_id, 'first_name']
-        rows = []
-        for _, chore in assign_timed.query(f'person_id == {person_id}').sort_values('weekday').iterrows():
-            task = daily.loc[chore.task_id]
-            ts = pd.Timestamp(chore.week_start_date) + pd.Timedelta(days = chore.weekday)
-            rows.append({
-                'task': task.task,
-                'duration_hours': task.duration_hours,
-                'weekday': ts.strftime("%A")
-            })
-        for _, chore in assign.query(f'person_id == {person_id}').iterrows():
-            try:
-                task = eval(f'{chore.task_type}.loc[{chore.task_id}]')
-            except:
-                continue
-            # see if there is a custom duration
-            if person_name in custom_duration and task.task in custom_duration[person_name]:
-                duration = custom_duration[person_name][task.task]
-            else:
-                duration = task.duration_hours
-            rows.append({
-                'task': task.task,
-                'duration_hours': duration,
-                'weekday': ''
-            })
-        chores[person_name] = pd.DataFrame(rows)
-    return chores
+    with get_db() as con:
+        # a compacted week is only in the archive
+        assign, assign_timed, people = archive.read_week_chores(con, monday)
+        names = people.set_index('person_id').first_name
+    with open('fixed_chores.yaml') as f:
+        credits = fixed_credits(yaml.safe_load(f))
+    return week_chores(assign, assign_timed, names, credits)
 
 @app.route("/assignment/<monday>")
 def display_assignment(monday):
+    # a client with the current version of the week gets a 304 before
+    # anything is read
+    etag, modified = week_validators(get_db(), monday)
+    response = not_modified(etag, modified)
+    if response is not None:
+        return response
     chores = assemble_assignments(monday)
-    return render_template("assignment.html", monday=monday, chores=chores)
+    return set_validators(app.make_response(render_template(
+        "assignment.html", monday=monday, chores=chores
+    )), etag, modified)
+
+def assign_job(monday, progress):
+    import assign_chores
+    with closing(open_connection()) as con:
+        success, message = assign_chores.assign_chores(
+            pd.to_datetime(monday).date(), database = con, progress = progress
+        )
+    if not success:
+        raise jobs.JobFailed(message)
+    return message
+
+def gsheet_job(monday, progress):
+    from construct_gsheet import GsheetConstructor
+    progress('sheet')
+    GsheetConstructor(monday).main()
+    return f'Exported the chores of the week of {monday} to the spreadsheet'
+
+def emails_job(monday, progress):
+    from chore_mailer import ChoreMailer
+    progress('load')
+    with app.app_context():
+        with get_db() as con:
+            people = repository.get_people(con)
+        assign = assemble_assignments(monday)
+    progress('send')
+    ChoreMailer(people, monday, assign).mail_chores()
+    return f'Sent the chores of the week of {monday} to {len(assign)} people'
+
+def reassign_job(monday, progress):
+    # repairs the week for the people whose requests changed since its
+    # last repair, they are pending again if it fails
+    from reassign_chores import reassign_chores
+    monday = pd.to_datetime(monday).date()
+    with closing(open_connection()) as con:
+        person_ids = repository.take_pending_repairs(con, monday)
+        if not person_ids:
+            return f'The chores of the week of {monday} are up to date'
+        success, message = reassign_chores(monday, person_ids, database = con, progress = progress)
+        if not success:
+            with con:
+                for person_id in person_ids:
+                    repository.add_pending_repair(con, monday, person_id)
+    if not success:
+        raise jobs.JobFailed(message)
+    return message
+
+JOB_BACKENDS = {
+    'assign': assign_job, 'reassign': reassign_job, 'gsheet': gsheet_job, 'emails': emails_job,
+}
+
+# the job queue of this process, created on first use so that the
+# threads are started in the worker and not in a preloading master
+job_queue = None
+job_queue_lock = threading.Lock()
+
+def get_jobs():
+    global job_queue
+    with job_queue_lock:
+        if job_queue is None or job_queue.pid != os.getpid():
+            job_queue = jobs.JobQueue(
+                open_connection, app.config['JOB_BACKENDS'] or JOB_BACKENDS,
+                workers = app.config['JOB_WORKERS'],
+                queue_size = app.config['JOB_QUEUE_SIZE'],
+            )
+        return job_queue
+
+def queue_job(kind, monday, rerun: bool = False):
+    # a double click returns the job that is already queued or running,
+    # with rerun that job runs again for what changed meanwhile
+    monday = pd.to_datetime(monday).date()
+    try:
+        job_id, queued = get_jobs().submit(kind, monday, rerun = rerun)
+    except jobs.QueueFull as error:
+        flash(str(error), 'confirm')
+        return redirect(url_for('display_assignment', monday = monday))
+    return redirect(url_for('job_progress', job_id = job_id))
 
 @app.route("/make_gsheet/<monday>")
 def make_gsheet(monday):
-    constructor = GsheetConstructor(monday)
-    process = multiprocessing.Process(target = constructor.main)
-    process.start()
-    return render_template("index.html")
+    return queue_job('gsheet', monday)
 
 @app.route("/send_chore_emails/<monday>")
 def send_chore_emails(monday):
-    with sqlite3.connect(db) as con:
-        people = pd.read_sql(con = con, sql = 'select * from people')
-    assign = assemble_assignments(monday)
-    mailer = ChoreMailer(people, monday, assign)
-    process = multiprocessing.Process(target = mailer.mail_chores)
-    process.start()
-    return render_template("index.html")
-    
+    return queue_job('emails', monday)
+
+@app.route("/jobs/<int:job_id>")
+def job_status(job_id):
+    job = jobs.get_job(get_db(), job_id)
+    if job is None:
+        return jsonify(error = f'No job {job_id}'), 404
+    return jsonify(job)
+
+# what a job is doing, as shown on its progress page
+JOB_TITLES = {
+    'assign': 'Constructing the chore chart',
+    'reassign': 'Updating the chore chart',
+    'gsheet': 'Exporting the chore chart to the spreadsheet',
+    'emails': 'Sending the chore emails',
+}
+
+# what the residents are told when a job is done, the message of the
+# job (rows written and seconds) is for /jobs/<id>; the backends of the
+# other kinds return a message for the residents
+JOB_DONE = {
+    'assign': 'The chores of the week of {monday} are assigned',
+    'reassign': 'The chores of the week of {monday} are updated for the new requests',
+}
+
+@app.route("/jobs/<int:job_id>/progress")
+def job_progress(job_id):
+    # refreshes itself until the job ends, then goes to the assignment
+    # of the week or shows why the job failed
+    job = jobs.get_job(get_db(), job_id)
+    if job is None:
+        return f'No job {job_id}', 404
+    if job['state'] == 'done':
+        flash(JOB_DONE.get(job['kind'], job['message']).format(monday = job['monday']), 'confirm')
+        return redirect(url_for('display_assignment', monday = job['monday']))
+    return render_template("job.html", job = job, title = JOB_TITLES.get(job['kind'], job['kind']))
+
+def api_error(message: str, status: int):
+    return jsonify(error = message), status
+
+@app.route("/api/<table>")
+def api_history(table):
+    # the read-only history of a week table (assignments,
+    # assignments_timed, hours, requests) in the order of its key:
+    # pages of ?limit= rows with the ?after= cursor of the next one, or
+    # with ?format=ndjson every row streamed as one JSON object per
+    # line; ?week=YYYY-MM-DD and ?person=ID keep a week or a person
+    if table not in history.HISTORY_KEYS:
+        return api_error(f'No table {table}', 404)
+    args = request.args
+    ndjson = args.get('format') == 'ndjson'
+    try:
+        after = None if 'after' not in args else history.decode_cursor(table, args['after'])
+        week = None if 'week' not in args else date.fromisoformat(args['week'])
+        person = None if 'person' not in args else int(args['person'])
+        if ndjson:
+            # without a limit every row is streamed, a bad limit is
+            # refused here since the stream can not fail once started
+            limit = None if 'limit' not in args else int(args['limit'])
+            if limit is not None and limit < 1:
+                raise ValueError('The limit is at least 1 row')
+        else:
+            limit = int(args.get('limit', api_page_rows))
+            if not 0 < limit <= api_max_page_rows:
+                raise ValueError(f'The limit is between 1 and {api_max_page_rows} rows')
+    except ValueError as error:
+        return api_error(str(error), 400)
+    if ndjson:
+        # the rows are read in chunks while they are sent, on a
+        # connection of the stream since the one of the request is
+        # closed when the view returns
+        def stream():
+            with closing(open_connection()) as con:
+                rows = history.iter_history(con, table, after, week, person)
+                for row in itertools.islice(rows, limit):
+                    yield json.dumps(row) + '\n'
+        return app.response_class(stream(), mimetype = 'application/x-ndjson')
+    rows = history.iter_history(get_db(), table, after, week, person)
+    page = list(itertools.islice(rows, limit + 1))
+    more = len(page) > limit
+    page = page[:limit]
+    return jsonify(
+        table = table,
+        rows = page,
+        next = history.encode_cursor(history.row_key(table, page[-1])) if more else None,
+    )
+
 if __name__ == '__main__':
-    app.run(debug = True)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--preload', action = 'store_true',
+                        help = 'import the solver and the Google integrations at startup')
+    parser.add_argument('--stub-jobs', action = 'store_true',
+                        help = 'run stand-ins instead of the spreadsheet export and the emails')
+    args = parser.parse_args()
+    config = {}
+    if args.stub_jobs:
+        config['JOB_BACKENDS'] = {kind: jobs.stub_backend(seconds = 5) for kind in JOB_BACKENDS}
+    create_app(preload = args.preload, **config).run(debug = True)
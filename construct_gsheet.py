@@ -5,6 +5,7 @@ import sqlite3
 import pandas as pd
 from param import *
 from maitri_db import db
+import repository
 from datetime import timedelta
 import time
 import argparse
@@ -23,31 +24,16 @@ class GsheetConstructor:
         self.separator_rows = []
 
     def load_data(self):
-        self.people = pd.read_sql(con=self.con, sql="SELECT * FROM people").rename(columns = {'id': 'person_id'})
+        self.people = repository.get_people(self.con).rename(columns = {'id': 'person_id'})
         for task_type in ('daily', 'weekly', 'seasonal', 'occasional'):
-            df = pd.read_sql(con=self.con, sql=f"SELECT * FROM {task_type}_tasks").rename(columns = {'id': 'task_id'})
+            df = repository.get_tasks(self.con, task_type).rename(columns = {'id': 'task_id'})
             if task_type != 'daily': df['task_type'] = task_type
             exec(f"self.{task_type} = df.copy()")
-        self.chores = pd.read_sql(
-            con=self.con, sql="SELECT * FROM assignments"
-        ).query(f'week_start_date == "{self.monday}"')
-        self.chores_timed = pd.read_sql(
-            con=self.con, sql="SELECT * FROM assignments_timed"
-        ).query(f'week_start_date == "{self.monday}"')
-        self.hours = pd.read_sql(
-            con=self.con, sql="SELECT * FROM hours"
-        ).query(f'week_start_date == "{self.monday}"')
-        # merge the tasks into the chores
-        self.chores_timed = self.chores_timed.merge(self.daily, on = 'task_id')
-        cols = ['task_id', 'task_type', 'task', 'category', 'description', 'duration_hours']
-        self.tasks = pd.concat(
-            (self.weekly[cols], self.seasonal[cols], self.occasional[cols])
-        )
-        self.chores = self.chores.merge(self.tasks, on = ['task_type', 'task_id'])
-        # merge people's first name
-        self.chores = self.chores.merge(self.people[['person_id', 'first_name']], on = 'person_id')
-        self.chores_timed = self.chores_timed.merge(self.people[['person_id', 'first_name']], on = 'person_id')
-        self.hours = self.hours.merge(self.people[['person_id', 'first_name', 'parent']], on = 'person_id')
+        # this week's chores and hours joined with the tasks and the
+        # people's names
+        self.chores = repository.get_week_assignments(self.con, self.monday)
+        self.chores_timed = repository.get_week_assignments_timed(self.con, self.monday)
+        self.hours = repository.get_week_hours(self.con, self.monday)
         # replace the task duration with the custom duration from
         # fixed_chores.yaml
         fixed_chores = yaml.safe_load(open('fixed_chores.yaml'))
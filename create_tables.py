@@ -3,13 +3,27 @@ import sqlite3
 import pandas as pd
 from maitri_db import db
 from maitri_db import tables
+from migrations import migrate
+from repository import bump_catalog_versions
 
 with sqlite3.connect(db) as con:
     for table in tables:
         print(f'Creating {table}')
-        pd.read_csv(f'data/{table}.csv').to_sql(
+        df = pd.read_csv(f'data/{table}.csv')
+        exists = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        # reload the rows of an existing table so that its keys and
+        # indexes are kept
+        if exists:
+            con.execute(f'DELETE FROM {table}')
+        df.to_sql(
             con = con,
             name = table,
-            if_exists = 'replace',
+            if_exists = 'append',
             index = False
         )
+    # the processes that cache the catalog read it again
+    bump_catalog_versions(con, *tables)
+    con.commit()
+    migrate(con)
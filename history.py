@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# the history of the week tables for the JSON API: the rows of a table
+# ordered by its key, which starts with (week_start_date, person_id),
+# and read as a generator in chunks, so a page costs the rows after its
+# cursor (a keyset, not an offset) and a full export runs in constant
+# memory; the weeks before the archive cutoff are read from the archive
+# and the others from SQLite, as archive.read_weeks does
+import argparse
+import base64
+import json
+import sys
+from datetime import date
+import numpy as np
+from archive import ARCHIVE_COLUMNS, get_cutoff, partition_years, read_partition
+from maitri_db import db, connect
+from param import archive_dir
+
+# the primary keys of the tables (see migrations.KEYED_TABLES), the
+# order of the rows and the keyset of the pages
+HISTORY_KEYS = {
+    'assignments': ('week_start_date', 'person_id', 'task_type', 'task_id'),
+    'assignments_timed': ('week_start_date', 'person_id', 'weekday', 'task_id'),
+    'hours': ('week_start_date', 'person_id'),
+    'requests': ('week_start_date', 'person_id'),
+}
+
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+def decode_cursor(table: str, cursor: str) -> tuple:
+    # ValueError if the cursor is not a key of table
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError(f'Invalid cursor: {cursor}')
+    types = [int if ARCHIVE_COLUMNS[table][column] == 'int64' else str for column in HISTORY_KEYS[table]]
+    if not isinstance(key, list) or len(key) != len(types) or \
+       not all(type(value) is kind for value, kind in zip(key, types)):
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return tuple(key)
+
+def row_key(table: str, row: dict) -> tuple:
+    return tuple(row[column] for column in HISTORY_KEYS[table])
+
+def after_mask(keys: list, after: tuple):
+    # the rows whose key (a list of column arrays) is greater than after
+    if not keys:
+        return False
+    first, rest = keys[0], keys[1:]
+    return (first > after[0]) | ((first == after[0]) & after_mask(rest, after[1:]))
+
+def archived_rows(table: str, cutoff: date, after, week, person, chunk_rows: int, directory: str):
+    # the archived rows in key order, one year at a time
+    columns = list(ARCHIVE_COLUMNS[table])
+    key = HISTORY_KEYS[table]
+    first_year = None if after is None else int(after[0][:4])
+    for year in partition_years(directory, table):
+        if week is not None and year != week.year or first_year is not None and year < first_year:
+            continue
+        partition = read_partition(directory, table, year)
+        values = {
+            column: np.asarray(partition[column]).astype(str) if column == 'week_start_date'
+            else np.asarray(partition[column])
+            for column in columns
+        }
+        keep = values['week_start_date'] < str(cutoff)
+        if week is not None:
+            keep &= values['week_start_date'] == str(week)
+        if person is not None:
+            keep &= values['person_id'] == person
+        if after is not None:
+            keep &= after_mask([values[column] for column in key], after)
+        positions = np.flatnonzero(keep)
+        # np.lexsort sorts by its last key first
+        positions = positions[np.lexsort([values[column][positions] for column in reversed(key)])]
+        for start in range(0, len(positions), chunk_rows):
+            chunk = positions[start:start + chunk_rows]
+            lists = [values[column][chunk].tolist() for column in columns]
+            # NULL was archived as NaN
+            yield [
+                tuple(None if value != value else value for value in row)
+                for row in zip(*lists)
+            ]
+
+def sqlite_rows(con, table: str, cutoff, after, week, person, chunk_rows: int):
+    # the rows in SQLite in key order, the range of the primary key or
+    # the person index is scanned from the cursor on
+    columns = list(ARCHIVE_COLUMNS[table])
+    key = HISTORY_KEYS[table]
+    where, params = [], []
+    if cutoff is not None:
+        where.append('week_start_date >= ?')
+        params.append(str(cutoff))
+    if week is not None:
+        where.append('week_start_date = ?')
+        params.append(str(week))
+    if person is not None:
+        where.append('person_id = ?')
+        params.append(person)
+    if after is not None:
+        where.append(f"({', '.join(key)}) > ({', '.join('?'*len(key))})")
+        params.extend(after)
+    cur = con.execute(
+        f"""SELECT {', '.join(columns)} FROM {table}
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY {', '.join(key)}""", params
+    )
+    yield from iter(lambda: cur.fetchmany(chunk_rows), [])
+
+def iter_history(con, table: str, after: tuple = None, week: date = None, person: int = None,
+                 chunk_rows: int = 1000, directory: str = archive_dir):
+    # the rows of table as dicts in key order, after the key after (a
+    # decoded cursor) and only of the week and the person if given
+    columns = list(ARCHIVE_COLUMNS[table])
+    cutoff = get_cutoff(directory)
+    chunks = sqlite_rows(con, table, cutoff, after, week, person, chunk_rows)
+    if cutoff is not None and (week is None or week < cutoff) and (after is None or after[0] < str(cutoff)):
+        chunks = (chunk for source in (
+            archived_rows(table, cutoff, after, week, person, chunk_rows, directory), chunks
+        ) for chunk in source)
+    for chunk in chunks:
+        for row in chunk:
+            yield dict(zip(columns, row))
+
+if __name__ == '__main__':
+    # export a table as NDJSON
+    parser = argparse.ArgumentParser()
+    parser.add_argument('table', choices = list(HISTORY_KEYS))
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--archive', default = archive_dir, help = 'archive directory')
+    parser.add_argument('--week', help = 'only this monday')
+    parser.add_argument('--person', type = int, help = 'only this person id')
+    args = parser.parse_args()
+    week = None if args.week is None else date.fromisoformat(args.week)
+    con = connect(args.db)
+    for row in iter_history(con, args.table, week = week, person = args.person, directory = args.archive):
+        sys.stdout.write(json.dumps(row) + '\n')
+    con.close()
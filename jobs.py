@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# background jobs of the web app (the spreadsheet export, the chore
+# emails): a job is a row of the jobs table, so any web worker can
+# report on it, and runs on the small thread pool of the worker that
+# queued it; at most one job per (kind, monday) is queued or running at
+# a time (single flight), queueing it again returns that job, or asks
+# it to run once more when it finishes if the caller passes rerun (its
+# input changed while it ran)
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from param import job_workers, job_queue_size
+
+# state is queued, running, done or failed; phase is the step the job
+# is in, timings the seconds of every finished phase (JSON) and message
+# the result or the error shown to the user; rerun is set when the job
+# was queued again with rerun while it was active
+JOBS_TABLE = """CREATE TABLE IF NOT EXISTS jobs(
+    id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, monday TEXT NOT NULL,
+    state TEXT NOT NULL, phase TEXT, message TEXT, pid INT,
+    created REAL NOT NULL, started REAL, finished REAL, timings TEXT,
+    rerun INT NOT NULL DEFAULT 0)"""
+# the single flight of the jobs, enforced by SQLite so it holds across
+# the web workers
+ACTIVE_JOBS_INDEX = """CREATE UNIQUE INDEX IF NOT EXISTS jobs_active
+    ON jobs(kind, monday) WHERE state IN ('queued', 'running')"""
+
+class QueueFull(Exception):
+    pass
+
+class JobFailed(Exception):
+    # raised by a backend to fail its job with a message for the user
+    pass
+
+def create_jobs_table(con):
+    con.execute(JOBS_TABLE)
+    # a jobs table of migration 7 has no rerun column
+    if 'rerun' not in [row[1] for row in con.execute('PRAGMA table_info(jobs)')]:
+        con.execute('ALTER TABLE jobs ADD COLUMN rerun INT NOT NULL DEFAULT 0')
+    con.execute(ACTIVE_JOBS_INDEX)
+
+def pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def fail_orphaned_jobs(con) -> int:
+    # the active jobs of processes that are gone (a restarted web
+    # worker) never finish, they are failed so that they can be queued
+    # again
+    orphaned = [
+        (time.time(), job_id) for job_id, pid in con.execute(
+            "SELECT id, pid FROM jobs WHERE state IN ('queued', 'running')"
+        ) if not pid_alive(pid)
+    ]
+    con.executemany(
+        """UPDATE jobs SET state = 'failed', message = 'Interrupted by a restart',
+        finished = ? WHERE id = ?""", orphaned
+    )
+    return len(orphaned)
+
+def active_job(con, kind: str, monday: str):
+    row = con.execute(
+        "SELECT id FROM jobs WHERE kind = ? AND monday = ? AND state IN ('queued', 'running')",
+        (kind, monday)
+    ).fetchone()
+    return None if row is None else row[0]
+
+def get_job(con, job_id: int):
+    # the job as a dict with its wait and run seconds, None if there is
+    # no such job
+    try:
+        cur = con.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+    except sqlite3.OperationalError:
+        return None
+    row = cur.fetchone()
+    if row is None:
+        return None
+    job = dict(zip([column[0] for column in cur.description], row))
+    job['timings'] = json.loads(job['timings'] or '{}')
+    now = time.time()
+    job['wait_seconds'] = (job['started'] or job['finished'] or now) - job['created']
+    job['run_seconds'] = None if job['started'] is None else (job['finished'] or now) - job['started']
+    return job
+
+def update_job(con, job_id: int, **fields):
+    with con:
+        con.execute(
+            f"UPDATE jobs SET {', '.join(f'{field} = ?' for field in fields)} WHERE id = ?",
+            (*fields.values(), job_id)
+        )
+
+class JobQueue:
+    def __init__(self, connect, backends: dict, workers: int = job_workers,
+                 queue_size: int = job_queue_size):
+        # connect() opens a connection to the database; backends maps a
+        # kind of job to a function(monday, progress) that does the work
+        # and returns the message of the job, calling progress(phase)
+        # when it moves to the next phase; workers jobs run at a time and
+        # queue_size more can wait, a job beyond that is refused
+        self.connect = connect
+        self.backends = backends
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.pool = ThreadPoolExecutor(max_workers = workers, thread_name_prefix = 'job')
+        self.pid = os.getpid()
+        with closing(self.connect()) as con, con:
+            create_jobs_table(con)
+            fail_orphaned_jobs(con)
+
+    def submit(self, kind: str, monday, rerun: bool = False) -> tuple:
+        # (job id, whether it was queued now or is the active job of the
+        # same kind and week); with rerun, an active job runs once more
+        # after it finishes, so it sees what changed while it ran
+        if kind not in self.backends:
+            raise ValueError(f'Unknown job: {kind}')
+        monday = str(monday)
+        with closing(self.connect()) as con:
+            while True:
+                job_id = active_job(con, kind, monday)
+                if job_id is not None:
+                    if not rerun:
+                        return job_id, False
+                    with con:
+                        marked = con.execute(
+                            """UPDATE jobs SET rerun = 1
+                            WHERE id = ? AND state IN ('queued', 'running')""", (job_id,)
+                        ).rowcount
+                    if marked:
+                        return job_id, False
+                    # it finished in the meantime
+                    continue
+                if not self.slots.acquire(blocking = False):
+                    raise QueueFull('Too many jobs are waiting, try again in a few minutes')
+                try:
+                    with con:
+                        job_id = con.execute(
+                            """INSERT INTO jobs (kind, monday, state, pid, created)
+                            VALUES (?, ?, 'queued', ?, ?)""", (kind, monday, self.pid, time.time())
+                        ).lastrowid
+                    break
+                except sqlite3.IntegrityError:
+                    # another web worker queued it first
+                    self.slots.release()
+                except Exception:
+                    self.slots.release()
+                    raise
+        self.pool.submit(self.run, job_id, kind, monday)
+        return job_id, True
+
+    def attempt(self, kind: str, monday: str, progress) -> tuple:
+        # (state, message) of one run of the backend
+        try:
+            return 'done', self.backends[kind](monday, progress)
+        except JobFailed as error:
+            return 'failed', str(error)
+        except Exception as error:
+            traceback.print_exc()
+            return 'failed', f'{type(error).__name__}: {error}'
+
+    def run(self, job_id: int, kind: str, monday: str):
+        con = self.connect()
+        timings = {}
+        current = {'phase': None, 'start': time.time()}
+
+        def progress(phase: str):
+            now = time.time()
+            if current['phase'] is not None:
+                timings[current['phase']] = now - current['start']
+            current.update(phase = phase, start = now)
+            update_job(con, job_id, phase = phase, timings = json.dumps(timings))
+
+        try:
+            update_job(con, job_id, state = 'running', started = current['start'])
+            while True:
+                state, message = self.attempt(kind, monday, progress)
+                now = time.time()
+                if current['phase'] is not None:
+                    timings[current['phase']] = now - current['start']
+                # the job only finishes if no rerun was asked for, in the
+                # same statement, so a submit cannot slip in between
+                with con:
+                    finished = con.execute(
+                        """UPDATE jobs SET state = ?, message = ?, finished = ?, timings = ?
+                        WHERE id = ? AND rerun = 0""",
+                        (state, message, now, json.dumps(timings), job_id)
+                    ).rowcount
+                    if not finished:
+                        con.execute('UPDATE jobs SET rerun = 0 WHERE id = ?', (job_id,))
+                if finished:
+                    break
+                current.update(phase = None, start = now)
+        finally:
+            con.close()
+            self.slots.release()
+
+def stub_backend(phases = ('work',), seconds: float = .1, fail: str = None):
+    # a stand-in for the Google backends in tests and development: goes
+    # through phases in seconds, then returns or fails with fail
+    def backend(monday, progress):
+        for phase in phases:
+            progress(phase)
+            time.sleep(seconds/len(phases))
+        if fail is not None:
+            raise JobFailed(fail)
+        return f'Stub job for {monday} done'
+    return backend
+
+if __name__ == '__main__':
+    from maitri_db import db, connect
+    parser = argparse.ArgumentParser()
+    parser.add_argument('job_id', type = int, nargs = '?', help = 'show this job (default the latest ones)')
+    parser.add_argument('--db', default = db, help = 'chore database')
+    args = parser.parse_args()
+    with closing(connect(args.db)) as con:
+        if args.job_id is not None:
+            print(json.dumps(get_job(con, args.job_id), indent = 2))
+        else:
+            for (job_id,) in con.execute('SELECT id FROM jobs ORDER BY id DESC LIMIT 20'):
+                job = get_job(con, job_id)
+                print(f"{job['id']:5d} {job['kind']:8s} {job['monday']} {job['state']:8s} "
+                      f"wait {job['wait_seconds']:6.1f}s run {job['run_seconds'] or 0:6.1f}s "
+                      f"{job['message'] or ''}")
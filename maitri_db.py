@@ -1,3 +1,6 @@
+import sqlite3
+from param import sqlite_wal, sqlite_busy_timeout_sec, sqlite_cached_statements
+
 tables = [
     'people',
     'daily_tasks',
@@ -7,3 +10,23 @@ tables = [
     'preferences',
 ]
 db = 'data/maitri_chores.db'
+
+def connect(database = db, wal = sqlite_wal, timeout = sqlite_busy_timeout_sec,
+            cached_statements = sqlite_cached_statements):
+    # a connection in WAL mode with synchronous=NORMAL (a commit does not
+    # wait for the disk, the database stays consistent), waiting up to
+    # timeout seconds for a lock instead of failing with "database is
+    # locked"
+    con = sqlite3.connect(database, timeout = timeout, cached_statements = cached_statements)
+    if wal:
+        con.execute('PRAGMA journal_mode = WAL')
+        con.execute('PRAGMA synchronous = NORMAL')
+    return con
+
+def open_db(database = db):
+    # database is a path or an open sqlite3 connection, a connection is
+    # returned as is so that "with open_db(database) as con:" commits
+    # the same way for both
+    if isinstance(database, sqlite3.Connection):
+        return database
+    return connect(database)
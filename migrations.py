@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# versioned schema migrations: PRAGMA user_version holds the number of
+# the last migration applied to a database and migrate applies the
+# newer ones in order, each in its own transaction
+import argparse
+import sqlite3
+from maitri_db import db, open_db
+from repository import rebuild_last_performed, CATALOG_VERSIONS_TABLE, WEEK_VERSIONS_TABLE, \
+    PENDING_REPAIRS_TABLE
+from jobs import create_jobs_table
+
+# the week tables as the app writes them
+WEEK_TABLES = [
+    """CREATE TABLE IF NOT EXISTS requests(
+    week_start_date TEXT, person_id INTEGER, days_in_town INTEGER,
+    dishes_am INTEGER, dishes_pm INTEGER, cook_meal INTEGER,
+    sous_chef INTEGER, meal_cleanup INTEGER, night_sweep INTEGER)""",
+    """CREATE TABLE IF NOT EXISTS hours(
+    week_start_date TEXT, person_id INTEGER, days_in_town REAL,
+    hours_worked REAL, target_hours REAL, leftover_hours REAL)""",
+    """CREATE TABLE IF NOT EXISTS assignments(
+    week_start_date DATE, person_id INT, task_type TEXT, task_id INT)""",
+    """CREATE TABLE IF NOT EXISTS assignments_timed(
+    week_start_date DATE, person_id INT, weekday INT, task_id INT)""",
+    """CREATE TABLE IF NOT EXISTS assignment_runs(
+    week_start_date DATE, solver TEXT, seed INT, samples INT,
+    unassigned_hours REAL, leftover_std REAL, preference REAL)""",
+]
+
+# the same tables with their keys, keys are the table names, values
+# are the new schema and the key columns; the primary keys that start
+# with (week_start_date, person_id) double as the index of the week
+# and person lookups, assignments and assignments_timed are keyed on
+# the whole row since a slot can be shared, and a preference is per
+# task name (tasks of different types with the same name share it)
+KEYED_TABLES = {
+    'requests': ("""CREATE TABLE requests(
+    week_start_date TEXT NOT NULL, person_id INTEGER NOT NULL,
+    days_in_town INTEGER, dishes_am INTEGER, dishes_pm INTEGER,
+    cook_meal INTEGER, sous_chef INTEGER, meal_cleanup INTEGER,
+    night_sweep INTEGER,
+    PRIMARY KEY (week_start_date, person_id))""",
+    ('week_start_date', 'person_id')),
+    'hours': ("""CREATE TABLE hours(
+    week_start_date TEXT NOT NULL, person_id INTEGER NOT NULL,
+    days_in_town REAL, hours_worked REAL, target_hours REAL,
+    leftover_hours REAL,
+    PRIMARY KEY (week_start_date, person_id))""",
+    ('week_start_date', 'person_id')),
+    'assignments': ("""CREATE TABLE assignments(
+    week_start_date DATE NOT NULL, person_id INT NOT NULL,
+    task_type TEXT NOT NULL, task_id INT NOT NULL,
+    PRIMARY KEY (week_start_date, person_id, task_type, task_id))""",
+    ('week_start_date', 'person_id', 'task_type', 'task_id')),
+    'assignments_timed': ("""CREATE TABLE assignments_timed(
+    week_start_date DATE NOT NULL, person_id INT NOT NULL,
+    weekday INT NOT NULL, task_id INT NOT NULL,
+    PRIMARY KEY (week_start_date, person_id, weekday, task_id))""",
+    ('week_start_date', 'person_id', 'weekday', 'task_id')),
+    'assignment_runs': ("""CREATE TABLE assignment_runs(
+    week_start_date DATE PRIMARY KEY, solver TEXT, seed INT, samples INT,
+    unassigned_hours REAL, leftover_std REAL, preference REAL)""",
+    ('week_start_date',)),
+    'preferences': ("""CREATE TABLE preferences(
+    id INTEGER PRIMARY KEY, task TEXT NOT NULL, task_type TEXT,
+    person_id INTEGER NOT NULL, preference INTEGER,
+    UNIQUE (task, person_id))""",
+    ('task', 'person_id')),
+}
+
+INDEXES = [
+    # the date each seasonal and occasional task was last performed
+    """CREATE INDEX IF NOT EXISTS assignments_task
+    ON assignments(task_type, task_id, week_start_date)""",
+    # the weeks a person's chores are looked up by
+    """CREATE INDEX IF NOT EXISTS assignments_person
+    ON assignments(person_id, week_start_date)""",
+]
+
+# the history of a person in the JSON API, assignments_person above
+# serves the assignments
+PERSON_INDEXES = [
+    """CREATE INDEX IF NOT EXISTS assignments_timed_person
+    ON assignments_timed(person_id, week_start_date, weekday, task_id)""",
+    """CREATE INDEX IF NOT EXISTS hours_person
+    ON hours(person_id, week_start_date)""",
+    """CREATE INDEX IF NOT EXISTS requests_person
+    ON requests(person_id, week_start_date)""",
+]
+
+def create_week_tables(con):
+    for schema in WEEK_TABLES:
+        con.execute(schema)
+
+def add_keys(con):
+    # rebuild the tables with their keys, rows that repeat a key are
+    # dropped first keeping the one written last
+    for table, (schema, key) in KEYED_TABLES.items():
+        if not con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone():
+            con.execute(schema)
+            continue
+        deleted = con.execute(
+            f"""DELETE FROM {table} WHERE rowid NOT IN (
+            SELECT MAX(rowid) FROM {table} GROUP BY {', '.join(key)})"""
+        ).rowcount
+        if deleted:
+            print(f'Dropped {deleted} duplicate rows from {table}')
+        con.execute(f'ALTER TABLE {table} RENAME TO {table}_unkeyed')
+        con.execute(schema)
+        columns = ', '.join(
+            row[1] for row in con.execute(f'PRAGMA table_info({table})')
+        )
+        con.execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_unkeyed'
+        )
+        con.execute(f'DROP TABLE {table}_unkeyed')
+
+def add_indexes(con):
+    for index in INDEXES:
+        con.execute(index)
+
+def add_person_indexes(con):
+    for index in PERSON_INDEXES:
+        con.execute(index)
+
+def create_catalog_versions(con):
+    con.execute(CATALOG_VERSIONS_TABLE)
+
+def create_week_versions(con):
+    con.execute(WEEK_VERSIONS_TABLE)
+
+def create_pending_repairs(con):
+    con.execute(PENDING_REPAIRS_TABLE)
+
+# (version, description, function) in the order they are applied,
+# new migrations go at the end with the next version number
+MIGRATIONS = [
+    (1, 'create the week tables', create_week_tables),
+    (2, 'primary and unique keys', add_keys),
+    (3, 'indexes of the week queries', add_indexes),
+    (4, 'latest week of every task', rebuild_last_performed),
+    (5, 'version counters of the catalog tables', create_catalog_versions),
+    (6, 'version stamps of the planned weeks', create_week_versions),
+    (7, 'background jobs', create_jobs_table),
+    (8, 'indexes of the person history', add_person_indexes),
+    (9, 'reruns of the background jobs', create_jobs_table),
+    (10, 'people waiting for the repair of their week', create_pending_repairs),
+]
+
+def get_version(con) -> int:
+    return con.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(con, target: int = None) -> int:
+    # apply the migrations newer than the database up to target
+    # (default all), returns the version of the database
+    target = MIGRATIONS[-1][0] if target is None else target
+    isolation_level = con.isolation_level
+    con.isolation_level = None
+    try:
+        for version, description, migration in MIGRATIONS:
+            if version <= get_version(con) or version > target:
+                continue
+            print(f'Migrating to version {version}: {description}')
+            con.execute('BEGIN')
+            try:
+                migration(con)
+                con.execute(f'PRAGMA user_version = {int(version)}')
+                con.execute('COMMIT')
+            except Exception:
+                con.execute('ROLLBACK')
+                raise
+    finally:
+        con.isolation_level = isolation_level
+    return get_version(con)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--target', type = int, help = 'version to migrate to (default latest)')
+    args = parser.parse_args()
+    con = open_db(args.db)
+    print(f'{args.db} is at version {get_version(con)}')
+    print(f'{args.db} is now at version {migrate(con, args.target)}')
+    con.close()
@@ -0,0 +1,113 @@
+import numpy as np
+import time
+
+class TimeBudgetExceeded(Exception):
+    pass
+
+def greedy_assignment(capacity, duration, value, order):
+    # first-fit assignment of the tasks in order to the feasible person
+    # with the highest value, used as the starting incumbent
+    capacity = capacity.copy()
+    assignment = np.full(len(duration), -1, dtype = np.int64)
+    for task in order:
+        candidates = np.flatnonzero(
+            ~np.isnan(value[:, task]) & (capacity >= duration[task])
+        )
+        if not len(candidates):
+            continue
+        person = candidates[np.argmax(value[candidates, task])]
+        assignment[task] = person
+        capacity[person] -= duration[task]
+    return assignment
+
+def total_value(assignment, value):
+    assigned = np.flatnonzero(assignment >= 0)
+    return value[assignment[assigned], assigned].sum()
+
+def solve_assignment(capacity, duration, value, time_budget = 5.):
+    # capacitated assignment by depth-first branch and bound: every
+    # task goes to at most one person, the durations given to a person
+    # may not exceed their capacity and the total value is maximized;
+    # value is a (people x tasks) array with NaN where the person can
+    # not take the task; returns an array with the person index of
+    # every task (-1 for unassigned tasks) and whether the search
+    # finished within the time budget, i.e. the assignment is optimal
+    capacity = np.asarray(capacity, dtype = np.float64)
+    duration = np.asarray(duration, dtype = np.float64)
+    value = np.asarray(value, dtype = np.float64)
+    num_tasks = len(duration)
+    masked = np.where(np.isnan(value), -np.inf, value)
+    # branch on the most valuable tasks first so the bound bites early,
+    # tasks that nobody can take are left out of the search
+    best_value_per_task = masked.max(axis = 0, initial = -np.inf)
+    order = np.argsort(-best_value_per_task, kind = 'stable')
+    order = order[best_value_per_task[order] > -np.inf]
+    best = greedy_assignment(capacity, duration, value, order)
+    best_total = total_value(best, value)
+    # candidate people for every task, most valuable first
+    candidates = [
+        [int(p) for p in np.argsort(-masked[:, task], kind = 'stable')
+         if masked[p, task] > -np.inf]
+        for task in range(num_tasks)
+    ]
+    deadline = time.perf_counter() + time_budget
+    current = np.full(num_tasks, -1, dtype = np.int64)
+    nodes = 0
+
+    def bound(depth, capacity):
+        # optimistic value of the remaining tasks: each one goes to its
+        # most valuable person that still has room for it, and at most
+        # the pooled capacity of those people is filled (a fractional
+        # knapsack by value per hour)
+        remaining = order[depth:]
+        fits = capacity[:, None] >= duration[None, remaining]
+        best_values = np.where(fits, masked[:, remaining], -np.inf).max(
+            axis = 0, initial = -np.inf
+        )
+        possible = best_values > -np.inf
+        best_values, hours = best_values[possible], duration[remaining][possible]
+        pooled = capacity[fits[:, possible].any(axis = 1)].sum()
+        if hours.sum() <= pooled:
+            return best_values.sum()
+        density = np.argsort(-best_values/hours, kind = 'stable')
+        filled = np.cumsum(hours[density])
+        full = np.searchsorted(filled, pooled, side = 'right')
+        value_full = best_values[density[:full]].sum()
+        left = pooled - (filled[full - 1] if full else 0.)
+        return value_full + best_values[density[full]]*left/hours[density[full]]
+
+    def search(depth, capacity, total):
+        nonlocal best, best_total, nodes
+        nodes += 1
+        if nodes % 256 == 0 and time.perf_counter() > deadline:
+            raise TimeBudgetExceeded
+        if depth == len(order):
+            if total > best_total:
+                best, best_total = current.copy(), total
+            return
+        if total + bound(depth, capacity) <= best_total:
+            return
+        task = order[depth]
+        tried = set()
+        for person in candidates[task]:
+            if capacity[person] < duration[task]:
+                continue
+            # people with the same capacity and the same values for the
+            # remaining tasks are interchangeable
+            key = (capacity[person], masked[person, order[depth:]].tobytes())
+            if key in tried:
+                continue
+            tried.add(key)
+            capacity[person] -= duration[task]
+            current[task] = person
+            search(depth + 1, capacity, total + value[person, task])
+            current[task] = -1
+            capacity[person] += duration[task]
+        # leave the task unassigned
+        search(depth + 1, capacity, total)
+
+    try:
+        search(0, capacity.copy(), 0.)
+    except TimeBudgetExceeded:
+        return best, False
+    return best, True
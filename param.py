@@ -1,6 +1,25 @@
 parent_credit_hours = 1
 target_weekly_hours = 42
 max_weekly_person_hours = 5.25
+# time budget for the optimal assignment of each phase
+solver_time_budget_sec = 10
+# sqlite connections: write-ahead log so that readers do not wait for
+# writers, how long a connection waits for a lock and how many
+# prepared statements it keeps
+sqlite_wal = True
+sqlite_busy_timeout_sec = 5
+sqlite_cached_statements = 256
+# the columnar archive of the closed weeks (archive.py) and how many
+# recent weeks stay in the database only
+archive_dir = 'data/archive'
+archive_keep_weeks = 52
+# background jobs (jobs.py): the threads of a web worker that run them
+# and how many more may wait for a thread
+job_workers = 2
+job_queue_size = 8
+# the JSON API: rows of a page by default and at most
+api_page_rows = 500
+api_max_page_rows = 5000
 sleep_sec = 2
 service_file = 'secret/maitrichorechart-339d26170a7c.json'
 border_thickness = 'SOLID_MEDIUM'
@@ -2,9 +2,9 @@
 
 import pandas as pd
 from param import *
-from maitri_db import db
+from maitri_db import db, connect
+from repository import update_last_performed, bump_week_versions
 import pygsheets
-import sqlite3
 import re
 
 task_name_map = {
@@ -80,7 +80,7 @@ def get_weekday(task_name):
 
 class ChoreChartReader:
     def __init__(self, year):
-        self.con = sqlite3.connect(db)
+        self.con = connect(db)
         self.cur = self.con.cursor()
         self.year = year
         self.people = pd.read_sql(con=self.con, sql='SELECT * FROM people').set_index('first_name')
@@ -88,6 +88,12 @@ class ChoreChartReader:
         self.weekly = pd.read_sql(con=self.con, sql='SELECT * FROM weekly_tasks')
         self.seasonal = pd.read_sql(con=self.con, sql='SELECT * FROM seasonal_tasks')
         self.occasional = pd.read_sql(con=self.con, sql='SELECT * FROM occasional_tasks')
+        self.task_tables = {
+            'daily': self.daily,
+            'weekly': self.weekly,
+            'seasonal': self.seasonal,
+            'occasional': self.occasional,
+        }
 
     def connect_sheet(self):
         gc = pygsheets.authorize(service_file=service_file)
@@ -140,8 +146,7 @@ class ChoreChartReader:
         return people_copy.chore_hours.fillna(0)
 
     def match_task(self, task_name):
-        for table in ['daily', 'weekly', 'seasonal', 'occasional']:
-            data = eval(f'self.{table}')
+        for table, data in self.task_tables.items():
             row = data[data.task == task_name].squeeze()
             if not row.empty:
                 return table, row.id
@@ -176,7 +181,7 @@ class ChoreChartReader:
             prev_task_name = ''
             # update the hours table
             self.cur.execute(
-                f"DELETE FROM hours WHERE week_start_date = '{date}'"
+                "DELETE FROM hours WHERE week_start_date = ?", (date,)
             )
             hours = pd.concat((hours, days_in_town), axis = 1).fillna(0)
             hours['target_hours'] = self.calc_target_hours(days_in_town)
@@ -186,10 +191,10 @@ class ChoreChartReader:
             hours.to_sql(con=self.con, name='hours', index=False, if_exists='append')        
             # clear the assignments for this week first
             self.cur.execute(
-                f"DELETE FROM assignments_timed WHERE week_start_date = '{date}'"
+                "DELETE FROM assignments_timed WHERE week_start_date = ?", (date,)
             )
             self.cur.execute(
-                f"DELETE FROM assignments WHERE week_start_date = '{date}'"
+                "DELETE FROM assignments WHERE week_start_date = ?", (date,)
             )
             for _, row in chores.iterrows():
                 chore_name = process_task_name(row[0], row[0] == prev_task_name)
@@ -201,15 +206,18 @@ class ChoreChartReader:
                     weekday = get_weekday(row[0])
                     if weekday is None: continue
                     self.cur.execute(
-                        f"""INSERT INTO assignments_timed VALUES
-                        ('{date}', {person_id}, {weekday}, {task_id})"""
+                        "INSERT OR IGNORE INTO assignments_timed VALUES (?, ?, ?, ?)",
+                        (date, int(person_id), weekday, int(task_id))
                     )
                 else:
                     # print('Inserting', date, person_id, task_id, 'into assignments')
                     self.cur.execute(
-                        f"""INSERT INTO assignments VALUES
-                        ('{date}', {person_id}, '{task_type}', {task_id})"""
+                        "INSERT OR IGNORE INTO assignments VALUES (?, ?, ?, ?)",
+                        (date, int(person_id), task_type, int(task_id))
                     )
+            update_last_performed(self.con, [date])
+            bump_week_versions(self.con, [date])
+            self.con.commit()
 
 if __name__ == '__main__':
     reader = ChoreChartReader(2025)
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# incremental re-assignment of a week that was already planned: after
+# some people change their requests only the slots that became
+# infeasible for them are released and filled again, everyone else
+# keeps their chores, and only the rows that changed are written
+import argparse
+import sys
+import time
+import yaml
+import pandas as pd
+from collections import Counter
+from datetime import date
+from maitri_db import db, open_db
+import repository
+from assign_chores import (
+    DAY_BIT, ALL_DAYS, POPCOUNT, TRASH_DAYS, WEEK_COLUMNS, SolverState,
+    PreferenceMatrix, get_people_and_days, calc_target_hours,
+    load_catalog, load_requests, load_deficit, assign_chores
+)
+
+# the requests column that gives the availability for each daily task
+# (the night cleanup is drawn from the meal cleanup volunteers, as in
+# assign_chores)
+TIMED_ROLES = {
+    'House Meal': 'cook_meal',
+    'Sous Chef for House Meal': 'sous_chef',
+    'Meal Cleanup Lead': 'meal_cleanup',
+    'Meal Cleanup Helper': 'meal_cleanup',
+    'Night Cleanup': 'meal_cleanup',
+    'Unload Dishes AM': 'dishes_am',
+    'Unload Dishes PM': 'dishes_pm',
+}
+CLEANUP_TASKS = ('Meal Cleanup Lead', 'Meal Cleanup Helper', 'Night Cleanup')
+
+def load_week(con, monday: date) -> dict:
+    # the stored rows of the week with their rowid, keys are the tables
+    return {
+        table: pd.read_sql(
+            con = con, params = (str(monday),),
+            sql = f"SELECT rowid, * FROM {table} WHERE week_start_date = ?"
+        )
+        for table in ('assignments', 'assignments_timed', 'hours')
+    }
+
+def fixed_credits(fixed_chores_config: dict) -> dict:
+    # keys are (first name, chore), values are the credited hours; a
+    # section left empty in the YAML file is None
+    return {
+        (assgmt['person'], assgmt['chore']): assgmt.get('credit')
+        for assignments in fixed_chores_config.values()
+        for assgmt in assignments or []
+    }
+
+def best_candidate(prefs, role, task, state, day, duration, exclude):
+    # the first person of the role ranking that is available on the
+    # day, has the hours and is not excluded
+    ids, masks, _ = prefs.rank(role, task, state)
+    for person_id, mask in zip(ids.tolist(), masks.tolist()):
+        if mask & DAY_BIT[day] and person_id not in exclude and \
+           state.has_hours(person_id, duration):
+            return person_id
+    return None
+
+def repair_week(monday: date, catalog: dict, requests: pd.DataFrame,
+                deficit: pd.Series, old: dict, fixed_chores_config: dict,
+                person_ids):
+    # returns success, a message and a dict with the repaired
+    # assignments, assignments_timed and hours data frames
+    people = catalog['people']
+    daily = catalog['daily'].set_index('task')
+    daily_names = catalog['daily'].set_index('id').task
+    credits = fixed_credits(fixed_chores_config)
+    changed = set(person_ids)
+
+    requests = requests.query(f'week_start_date == "{monday}"').set_index('person_id')
+    masks = {
+        column: (requests[column].fillna(0).astype(int) & ALL_DAYS).to_dict()
+        for column in set(TIMED_ROLES.values()) | {'days_in_town'}
+    }
+    intown = get_people_and_days(requests.days_in_town)
+
+    # the targets follow the new requests, the hours already worked
+    # come from the stored hours rows
+    hours_this_week = pd.DataFrame(index = people.index)
+    hours_this_week.insert(0, 'week_start_date', monday)
+    hours_this_week['days_in_town'] = intown.num_days
+    hours_this_week['target_hours'] = calc_target_hours(people, intown.num_days, deficit)
+    hours_this_week = hours_this_week.fillna(0)
+    state = SolverState(people, hours_this_week.target_hours)
+    worked = old['hours'].groupby('person_id').hours_worked.sum()
+    for person_id, hours in worked.items():
+        if person_id in state.slot:
+            state.charge(person_id, hours)
+
+    prefs = PreferenceMatrix(catalog['preferences'], requests.index, state)
+    prefs.add_role('intown', intown)
+    for column in set(TIMED_ROLES.values()):
+        prefs.add_role(column, get_people_and_days(requests[column]))
+
+    timed = old['assignments_timed'][['person_id', 'weekday', 'task_id']].copy()
+    timed['task'] = timed.task_id.map(daily_names)
+    chores = old['assignments'][['person_id', 'task_type', 'task_id']].copy()
+
+    def slot(task, day):
+        rows = timed[(timed.task == task) & (timed.weekday == day)]
+        return None if rows.empty else int(rows.person_id.iloc[0])
+
+    def cook_charge(day):
+        # the cook of a meal with a sous chef is credited the sous hours
+        charge = daily.loc['House Meal'].duration_hours
+        if slot('Sous Chef for House Meal', day) is not None:
+            charge -= daily.loc['Sous Chef for House Meal'].duration_hours
+        return charge
+
+    def release(index):
+        # remove a timed row and give its hours back
+        row = timed.loc[index]
+        if row.task == 'House Meal':
+            state.refund(row.person_id, cook_charge(row.weekday))
+        elif row.task == 'Sous Chef for House Meal':
+            state.refund(row.person_id, daily.loc[row.task].duration_hours)
+            cook = slot('House Meal', row.weekday)
+            if cook is not None:
+                state.charge(cook, daily.loc[row.task].duration_hours)
+        else:
+            state.refund(row.person_id, daily.loc[row.task].duration_hours)
+        return timed.drop(index)
+
+    def add(person_id, task, day, charge):
+        state.charge(person_id, charge)
+        return pd.concat((timed, pd.DataFrame([{
+            'person_id': person_id, 'weekday': day,
+            'task_id': int(daily.loc[task].id), 'task': task
+        }])), ignore_index = True)
+
+    # release the timed slots the changed people can no longer do
+    released = []
+    for index, row in timed[timed.person_id.isin(changed)].iterrows():
+        mask = masks[TIMED_ROLES[row.task]].get(row.person_id, 0)
+        if not mask & DAY_BIT[row.weekday] or intown.num_days.get(row.person_id, 0) == 0:
+            released.append((row.task, row.weekday, row.person_id))
+    # the sous chef is released before the cook so the hours add up
+    released.sort(key = lambda item: item[0] == 'House Meal')
+    for task, day, _ in released:
+        timed = release(timed[(timed.task == task) & (timed.weekday == day)].index[0])
+    print('Released', [(task, day) for task, day, _ in released])
+
+    # meals first: find another cook for the day or drop the meal and
+    # turn its cleanup into a night cleanup
+    cleaners = set(timed[timed.task.isin(CLEANUP_TASKS)].person_id)
+    for task, day, old_person in released:
+        if task != 'House Meal':
+            continue
+        cooks = set(timed[timed.task == 'House Meal'].person_id) | cleaners | {old_person}
+        charge = cook_charge(day)
+        person_id = best_candidate(prefs, 'cook_meal', task, state, day, charge + 1e-9, cooks)
+        if person_id is not None:
+            print('Moving the meal on day', day, 'to', person_id)
+            timed = add(person_id, task, day, charge)
+            continue
+        print('Dropping the meal on day', day)
+        for other in ('Sous Chef for House Meal', 'Meal Cleanup Lead', 'Meal Cleanup Helper'):
+            rows = timed[(timed.task == other) & (timed.weekday == day)]
+            if not rows.empty:
+                timed = release(rows.index[0])
+        released.append(('Night Cleanup', day, old_person))
+
+    # the cleanup and the dishes, a dropped sous chef is not replaced
+    cooks = set(timed[timed.task == 'House Meal'].person_id)
+    for task, day, old_person in released:
+        if task in ('House Meal', 'Sous Chef for House Meal') or slot(task, day) is not None:
+            continue
+        if task == 'Night Cleanup' and slot('House Meal', day) is not None:
+            continue
+        exclude = {old_person}
+        if task in CLEANUP_TASKS:
+            exclude |= cooks | set(timed[
+                timed.task.isin(CLEANUP_TASKS) & (timed.weekday == day)
+            ].person_id)
+        duration = daily.loc[task].duration_hours
+        person_id = best_candidate(prefs, TIMED_ROLES[task], task, state, day, duration, exclude)
+        if person_id is None:
+            if task in CLEANUP_TASKS:
+                message = f'Could not repair {task} on day {day} in the week of {monday}'
+                print(message)
+                return False, message, None
+            print('Nobody left for', task, 'on day', day)
+            continue
+        print('Assigning', task, 'on day', day, 'to', person_id)
+        timed = add(person_id, task, day, duration)
+
+    # weekly, seasonal and occasional chores of the changed people that
+    # they can no longer do: all of them if they left town, the trash
+    # if they are no longer home Wednesday and Thursday, and the most
+    # recently assigned ones while they are over their new target
+    def chore(row):
+        task = catalog[row.task_type].set_index('id').loc[row.task_id]
+        first_name = people.first_name.get(row.person_id)
+        return task.task, credits.get((first_name, task.task)) or task.duration_hours
+
+    dropped = []
+    for person_id in changed:
+        own = chores[chores.person_id == person_id]
+        mask = masks['days_in_town'].get(person_id, 0)
+        for index, row in own[::-1].iterrows():
+            task, duration = chore(row)
+            trash = task == 'Manage Trash & Recycling' and not (
+                mask & TRASH_DAYS == TRASH_DAYS and POPCOUNT[mask] > 4
+            )
+            if not mask or trash or state.remaining(person_id) < -0.1:
+                state.refund(person_id, duration)
+                chores = chores.drop(index)
+                dropped.append((row.task_type, row.task_id, task, person_id))
+    for task_type, task_id, task, old_person in dropped:
+        duration = catalog[task_type].set_index('id').loc[task_id].duration_hours
+        ids, masks_intown, _ = prefs.rank('intown', task, state, duration)
+        keep = ids != old_person
+        if task == 'Manage Trash & Recycling':
+            keep &= (masks_intown & TRASH_DAYS == TRASH_DAYS) & (POPCOUNT[masks_intown] > 4)
+        if not keep.any():
+            print(f'Not enough hours for {task_type} task: {task}')
+            continue
+        person_id = int(ids[keep][0])
+        print('Assigning', task_type, task, 'to', person_id)
+        chores = pd.concat((chores, pd.DataFrame([{
+            'person_id': person_id, 'task_type': task_type, 'task_id': task_id
+        }])), ignore_index = True)
+        state.charge(person_id, duration)
+
+    hours_this_week['leftover_hours'] = state.hours_series()
+    hours_this_week = hours_this_week.fillna(0)
+    hours_this_week['hours_worked'] = hours_this_week.target_hours - hours_this_week.leftover_hours
+    hours_this_week['person_id'] = hours_this_week.index
+    return True, '', {
+        'assignments': chores.assign(week_start_date = monday)[WEEK_COLUMNS['assignments']],
+        'assignments_timed': timed.assign(week_start_date = monday)[WEEK_COLUMNS['assignments_timed']],
+        'hours': hours_this_week,
+    }
+
+def row_key(row):
+    # rows compare by value, numbers up to rounding
+    return tuple(
+        round(float(value), 9) if isinstance(value, (int, float)) else str(value)
+        for value in row
+    )
+
+class StaleWeek(Exception):
+    # the week was written by someone else after it was read
+    pass
+
+# repairs of a week that keeps being rewritten give up after these
+REPAIR_ATTEMPTS = 3
+
+def write_changes(con, monday: date, old: dict, week: dict, version: int = None) -> int:
+    # delete the stored rows that are not in the repaired week and
+    # insert the new ones in one transaction; returns the number of
+    # rows deleted plus inserted; the rowids of old are only valid for
+    # the version of the week they were read at (get_week_version), with
+    # version StaleWeek is raised and nothing written if the week has
+    # another one now
+    count = 0
+    # the write lock is taken before the check, so no other writer can
+    # rewrite the week in between
+    if not con.in_transaction:
+        con.execute('BEGIN IMMEDIATE')
+    with con:
+        if version is not None and repository.get_week_version(con, monday)[0] != version:
+            raise StaleWeek(f'The week of {monday} changed while it was repaired')
+        for table, columns in WEEK_COLUMNS.items():
+            if table not in old:
+                continue
+            new_rows = list(week[table][columns].astype(
+                {'week_start_date': str}
+            ).itertuples(index = False, name = None))
+            stored = {}
+            for row in old[table][['rowid'] + columns].itertuples(index = False, name = None):
+                stored.setdefault(row_key(row[1:]), []).append(row[0])
+            added = Counter(row_key(row) for row in new_rows)
+            for key, rowids in stored.items():
+                keep = min(added[key], len(rowids))
+                added[key] -= keep
+                removed = rowids[keep:]
+                con.executemany(f'DELETE FROM {table} WHERE rowid = ?', [(rowid,) for rowid in removed])
+                count += len(removed)
+            inserts = []
+            for row in new_rows:
+                if added[row_key(row)] > 0:
+                    added[row_key(row)] -= 1
+                    inserts.append(row)
+            con.executemany(
+                f"""INSERT INTO {table} ({', '.join(columns)})
+                VALUES ({', '.join('?'*len(columns))})""",
+                inserts
+            )
+            count += len(inserts)
+        if 'assignments' in old:
+            repository.update_last_performed(con, [monday])
+        repository.bump_week_versions(con, [monday])
+    return count
+
+def reassign_chores(monday: date, person_ids, database = db,
+                    fixed_chores_path: str = 'fixed_chores.yaml', progress = None):
+    # repair the week after the requests of person_ids changed, a week
+    # that was never planned or can not be repaired locally gets a full
+    # assign_chores run; returns success and a message; progress(phase)
+    # is told when the repair starts and, for a full run, its phases
+    start = time.perf_counter()
+    if progress is not None:
+        progress('repair')
+    fixed_chores_config = yaml.safe_load(open(fixed_chores_path, 'r'))
+    # another job (e.g. a full assign_chores) may rewrite the week while
+    # it is repaired, the repair then starts over from the new rows
+    for attempt in range(REPAIR_ATTEMPTS):
+        with open_db(database) as con:
+            old = load_week(con, monday)
+            version = repository.get_week_version(con, monday)[0]
+            if old['hours'].empty:
+                return assign_chores(monday, database = database, fixed_chores_path = fixed_chores_path,
+                                     progress = progress)
+            catalog = load_catalog(con)
+            requests = load_requests(con, monday, monday)
+            deficit = load_deficit(con, monday)
+        success, message, week = repair_week(
+            monday, catalog, requests, deficit, old, fixed_chores_config, person_ids
+        )
+        if not success:
+            # the local repair ran out of people, plan the week from scratch
+            success, full_message = assign_chores(
+                monday, database = database, fixed_chores_path = fixed_chores_path,
+                progress = progress
+            )
+            return success, f'{message}, recomputed the whole week' if success else full_message
+        try:
+            with open_db(database) as con:
+                count = write_changes(con, monday, old, week, version)
+        except StaleWeek as error:
+            message = str(error)
+            continue
+        return True, f'{count} rows changed in {time.perf_counter() - start:.2f}s'
+    return False, f'{message} {REPAIR_ATTEMPTS} times, try again later'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('monday', type = str, help = 'monday date in YYYY-MM-DD format')
+    parser.add_argument('person_ids', type = int, nargs = '+',
+                        help = 'people whose requests changed')
+    parser.add_argument('--db', default = db, help = 'chore database')
+    parser.add_argument('--fixed-chores', default = 'fixed_chores.yaml',
+                        help = 'fixed chore assignments')
+    args = parser.parse_args()
+    success, message = reassign_chores(
+        pd.to_datetime(args.monday).date(), args.person_ids, args.db, args.fixed_chores
+    )
+    print(message)
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# recompute the task_last_performed table from the whole assignments
+# history, e.g. after the assignments were edited by hand
+import argparse
+import time
+from maitri_db import db, open_db
+from repository import rebuild_last_performed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default = db, help = 'chore database')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    with open_db(args.db) as con:
+        rebuild_last_performed(con)
+        count = con.execute('SELECT COUNT(*) FROM task_last_performed').fetchone()[0]
+    con.close()
+    print(f'Rebuilt task_last_performed with {count} tasks in {time.perf_counter() - start:.3f}s')
@@ -0,0 +1,538 @@
+# the queries of the app in one place: every query is a constant SQL
+# string with ? parameters so that sqlite3 reuses the prepared
+# statement of the connection, and the week-scoped ones filter and
+# join in SQLite and return only the rows of that week
+import sqlite3
+import time
+import pandas as pd
+from datetime import date, timedelta
+
+TASK_TYPES = ('daily', 'weekly', 'seasonal', 'occasional')
+# the columns of the task tables besides the id
+TASK_COLUMNS = {
+    'daily': ('task', 'category', 'description', 'duration_hours'),
+    'weekly': ('task', 'category', 'description', 'duration_hours'),
+    'occasional': ('task', 'category', 'description', 'duration_hours', 'frequency_weeks'),
+    'seasonal': ('task', 'category', 'description', 'duration_hours', 'frequency_days',
+                 'start_date', 'end_date'),
+}
+# the preference of a new person for every task and of everybody for
+# a new task
+DEFAULT_PREFERENCE = 3
+
+# the weekly, seasonal and occasional tasks with their type, the ids
+# are only unique within a type
+UNTIMED_TASKS = """
+    SELECT id, task, category, description, duration_hours, 'weekly' AS task_type FROM weekly_tasks
+    UNION ALL SELECT id, task, category, description, duration_hours, 'seasonal' FROM seasonal_tasks
+    UNION ALL SELECT id, task, category, description, duration_hours, 'occasional' FROM occasional_tasks
+"""
+
+def check_task_type(task_type: str):
+    # task types end up in table names, so only the known ones pass
+    if task_type not in TASK_TYPES:
+        raise ValueError(f'Unknown task type: {task_type}')
+
+# a version counter per catalog table (people, the task tables and
+# preferences), every write to a catalog table bumps its counter in the
+# same transaction (bump_catalog_versions) so that the processes that
+# cache the table know it changed
+CATALOG_VERSIONS_TABLE = """CREATE TABLE IF NOT EXISTS catalog_versions(
+    name TEXT PRIMARY KEY, version INT NOT NULL)"""
+
+# per-process cache of the catalog reads, keys are (database file,
+# reader, arguments), values are (versions of the tables read, result)
+catalog_cache = {}
+
+# a version and modification time (unix seconds) per planned week,
+# bumped by the writers of the week tables, for the ETag and
+# Last-Modified headers of the week pages; the ALL_WEEKS row is bumped
+# by the changes that show in every week (people and task edits, a
+# restore, a compaction)
+WEEK_VERSIONS_TABLE = """CREATE TABLE IF NOT EXISTS week_versions(
+    week_start_date TEXT PRIMARY KEY, version INT NOT NULL, modified REAL NOT NULL)"""
+ALL_WEEKS = '*'
+
+def bump_week_versions(con, mondays):
+    con.execute(WEEK_VERSIONS_TABLE)
+    con.executemany(
+        """INSERT INTO week_versions (week_start_date, version, modified) VALUES (?, 1, ?)
+        ON CONFLICT (week_start_date) DO UPDATE
+        SET version = version + 1, modified = excluded.modified""",
+        [(str(monday), time.time()) for monday in mondays]
+    )
+
+def get_week_version(con, monday) -> tuple:
+    # (version of the week, version of ALL_WEEKS, last modification
+    # time or None), zeros for weeks written before the table existed
+    try:
+        rows = dict((row[0], row[1:]) for row in con.execute(
+            """SELECT week_start_date, version, modified FROM week_versions
+            WHERE week_start_date IN (?, ?)""", (str(monday), ALL_WEEKS)
+        ))
+    except sqlite3.OperationalError:
+        return 0, 0, None
+    week, every = rows.get(str(monday), (0, None)), rows.get(ALL_WEEKS, (0, None))
+    modified = [stamp for stamp in (week[1], every[1]) if stamp is not None]
+    return week[0], every[0], max(modified) if modified else None
+
+def get_weeks_version(con) -> tuple:
+    # (number of stamped weeks, sum and maximum of their versions, last
+    # modification time or None) for the list of weeks
+    try:
+        return con.execute(
+            """SELECT COUNT(*), COALESCE(SUM(version), 0), COALESCE(MAX(version), 0),
+            MAX(modified) FROM week_versions"""
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return 0, 0, 0, None
+
+def bump_week_versions_past(con, version: int):
+    # after a restore wrote older stamps back: every week (and
+    # ALL_WEEKS) gets a version above version, the live maximum before
+    # the restore, so no ETag or Last-Modified a client holds matches
+    now = time.time()
+    con.execute(WEEK_VERSIONS_TABLE)
+    con.execute("UPDATE week_versions SET version = MAX(version, ?) + 1, modified = ?", (version, now))
+    con.execute(
+        """INSERT INTO week_versions (week_start_date, version, modified) VALUES (?, ?, ?)
+        ON CONFLICT (week_start_date) DO NOTHING""", (ALL_WEEKS, version + 1, now)
+    )
+
+def bump_catalog_versions(con, *tables: str, past: dict = None):
+    # past are versions the new ones have to exceed as well (the live
+    # ones before a restore wrote older counters back), so a counter
+    # never returns to a value a process may have cached
+    past = past or {}
+    con.execute(CATALOG_VERSIONS_TABLE)
+    con.executemany(
+        """INSERT INTO catalog_versions (name, version) VALUES (?, ? + 1)
+        ON CONFLICT (name) DO UPDATE SET version = MAX(version, excluded.version - 1) + 1""",
+        [(table, past.get(table, 0)) for table in tables]
+    )
+    # the week pages show the names of the people and the tasks
+    if set(tables) - {'preferences'}:
+        bump_week_versions(con, [ALL_WEEKS])
+
+def get_catalog_versions(con, tables) -> tuple:
+    # None if the database has no catalog_versions table yet
+    try:
+        versions = dict(con.execute("SELECT name, version FROM catalog_versions").fetchall())
+    except sqlite3.OperationalError:
+        return None
+    return tuple(versions.get(table, 0) for table in tables)
+
+def cached(con, tables, key: tuple, read):
+    # the result of read() while the versions of tables are the ones it
+    # was read at, as a copy the caller can modify; the versions are
+    # read first so that a write in between makes the entry stale
+    # rather than wrong; in-memory databases and databases without
+    # catalog_versions are read every time
+    path = con.execute('PRAGMA database_list').fetchone()[2]
+    versions = get_catalog_versions(con, tables) if path else None
+    if versions is None:
+        return read()
+    key = (path,) + key
+    entry = catalog_cache.get(key)
+    if entry is None or entry[0] != versions:
+        entry = (versions, read())
+        catalog_cache[key] = entry
+    return entry[1].copy()
+
+def get_people(con, active_only: bool = False) -> pd.DataFrame:
+    sql = "SELECT * FROM people WHERE active" if active_only else "SELECT * FROM people"
+    return cached(con, ('people',), ('people', sql), lambda: pd.read_sql(con = con, sql = sql))
+
+def get_person(con, person_id: int) -> pd.DataFrame:
+    return pd.read_sql(con = con, params = (person_id,), sql = "SELECT * FROM people WHERE id = ?")
+
+def get_tasks(con, task_type: str, **kwargs) -> pd.DataFrame:
+    check_task_type(task_type)
+    return cached(
+        con, (f'{task_type}_tasks',), ('tasks', task_type, repr(sorted(kwargs.items()))),
+        lambda: pd.read_sql(con = con, sql = f"SELECT * FROM {task_type}_tasks", **kwargs)
+    )
+
+def get_task(con, task_type: str, task_id: int) -> pd.DataFrame:
+    check_task_type(task_type)
+    return pd.read_sql(
+        con = con, params = (task_id,),
+        sql = f"SELECT * FROM {task_type}_tasks WHERE id = ?"
+    )
+
+def get_preferences(con) -> pd.DataFrame:
+    return cached(
+        con, ('preferences',), ('preferences',),
+        lambda: pd.read_sql(con = con, sql = "SELECT * FROM preferences")
+    )
+
+def get_active_preferences(con) -> pd.DataFrame:
+    # the preferences of the active people with their first name
+    return cached(
+        con, ('preferences', 'people'), ('active_preferences',),
+        lambda: pd.read_sql(con = con, sql = """
+            SELECT pr.*, p.first_name FROM preferences AS pr
+            JOIN people AS p ON pr.person_id = p.id
+            WHERE p.active""")
+    )
+
+def get_preference_pivot(con) -> pd.DataFrame:
+    # the preferences of the active people as a task x person table: one
+    # row per task (sorted), the columns are ('id' or 'preference',
+    # person_id) with the people sorted by first name
+    def read():
+        prefs = get_active_preferences(con)
+        people = prefs[['person_id', 'first_name']].drop_duplicates().sort_values(
+            ['first_name', 'person_id']
+        )
+        return prefs.pivot(
+            index = 'task', columns = 'person_id', values = ['id', 'preference']
+        ).astype('Int64').reindex(columns = people.person_id, level = 'person_id')
+    return cached(con, ('preferences', 'people'), ('preference_pivot',), read)
+
+def update_preferences(con, values: dict) -> int:
+    # values maps preference ids to preferences, only the ones that
+    # differ from the stored value are written; returns their number
+    current = get_preferences(con).set_index('id').preference
+    changed = [
+        (preference, pref_id) for pref_id, preference in values.items()
+        if pref_id in current.index and current[pref_id] != preference
+    ]
+    if changed:
+        con.executemany("UPDATE preferences SET preference = ? WHERE id = ?", changed)
+        bump_catalog_versions(con, 'preferences')
+    return len(changed)
+
+def get_requests(con, first_monday: date, last_monday: date) -> pd.DataFrame:
+    return pd.read_sql(
+        con = con, params = (str(first_monday), str(last_monday)),
+        sql = "SELECT * FROM requests WHERE week_start_date BETWEEN ? AND ?"
+    )
+
+def get_person_requests(con, person_id: int, monday: date) -> pd.DataFrame:
+    return pd.read_sql(
+        con = con, params = (str(monday), person_id),
+        sql = "SELECT * FROM requests WHERE week_start_date = ? AND person_id = ?"
+    )
+
+def get_deficit(con, monday: date) -> pd.Series:
+    # total leftover hours of the active people in the previous week
+    prev_monday = monday + timedelta(days = -7)
+    hours = pd.read_sql(
+        con = con, params = (str(prev_monday),), sql = """
+        SELECT h.person_id, SUM(leftover_hours) AS leftover_hours
+        FROM hours AS h JOIN people AS p ON h.person_id = p.id
+        WHERE p.active AND week_start_date = ?
+        GROUP BY person_id"""
+    )
+    return hours.set_index('person_id').leftover_hours
+
+# the latest week each task was assigned, kept up to date by the
+# writers of the assignments table (update_last_performed) so that the
+# urgency of the seasonal and occasional tasks does not scan the whole
+# history
+TASK_LAST_PERFORMED_TABLE = """CREATE TABLE IF NOT EXISTS task_last_performed(
+    task_type TEXT NOT NULL, task_id INT NOT NULL, week_start_date DATE NOT NULL,
+    PRIMARY KEY (task_type, task_id))"""
+
+# the latest archived week of every task, written by archive.py when the
+# archived weeks are deleted from the assignments table: the weeks
+# planned again after a compaction and the rebuilds of
+# task_last_performed fall back to it
+ARCHIVED_LAST_PERFORMED_TABLE = """CREATE TABLE IF NOT EXISTS archived_last_performed(
+    task_type TEXT NOT NULL, task_id INT NOT NULL, week_start_date DATE NOT NULL,
+    PRIMARY KEY (task_type, task_id))"""
+
+def has_table(con, table: str) -> bool:
+    return con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+def performed_weeks(con) -> str:
+    # the rows (task_type, task_id, week_start_date) the latest weeks are
+    # taken from: the assignments and, after a compaction, the archived
+    # weeks
+    if not has_table(con, 'archived_last_performed'):
+        return 'assignments'
+    return """(SELECT task_type, task_id, week_start_date FROM assignments
+        UNION ALL SELECT task_type, task_id, week_start_date FROM archived_last_performed)"""
+
+def rebuild_last_performed(con):
+    # recompute task_last_performed from the assignments table and the
+    # archived weeks of a compacted database; the
+    # table is created in the same transaction as its rows (sqlite3
+    # would otherwise commit the CREATE on its own), so a rebuild that
+    # is not committed leaves no empty table behind
+    if not con.in_transaction:
+        con.execute('BEGIN')
+    con.execute(TASK_LAST_PERFORMED_TABLE)
+    con.execute("DELETE FROM task_last_performed")
+    con.execute(f"""
+        INSERT INTO task_last_performed (task_type, task_id, week_start_date)
+        SELECT task_type, task_id, MAX(week_start_date) FROM {performed_weeks(con)}
+        WHERE week_start_date IS NOT NULL
+        GROUP BY task_type, task_id""")
+
+def update_last_performed(con, mondays):
+    # refresh the tasks assigned in the weeks of mondays and the ones
+    # whose latest week is one of them, after the assignments of those
+    # weeks were replaced, the archived weeks count for the tasks no
+    # longer assigned in SQLite; a database without the table is left alone,
+    # get_last_performed builds it from the whole history
+    if not has_table(con, 'task_last_performed'):
+        return
+    keys = set()
+    for monday in mondays:
+        keys.update(con.execute("""
+            SELECT task_type, task_id FROM task_last_performed WHERE week_start_date = ?
+            UNION SELECT task_type, task_id FROM assignments WHERE week_start_date = ?""",
+            (str(monday), str(monday))
+        ).fetchall())
+    con.executemany(
+        "DELETE FROM task_last_performed WHERE task_type = ? AND task_id = ?", keys
+    )
+    con.executemany(f"""
+        INSERT INTO task_last_performed (task_type, task_id, week_start_date)
+        SELECT task_type, task_id, MAX(week_start_date) FROM {performed_weeks(con)}
+        WHERE task_type = ? AND task_id = ? AND week_start_date IS NOT NULL
+        GROUP BY task_type, task_id""", keys
+    )
+
+def get_last_performed(con, task_type: str, monday: date) -> pd.Series:
+    # the week each task of the type was last assigned before monday,
+    # a pd.Series of dates indexed by task id; the latest weeks come
+    # from task_last_performed, only the tasks whose latest week is
+    # monday or later (a week planned again) are looked up in the
+    # assignments
+    if not has_table(con, 'task_last_performed'):
+        rebuild_last_performed(con)
+    latest = pd.read_sql(
+        con = con, params = (task_type,), sql = """
+        SELECT task_id AS id, week_start_date AS date_last_performed
+        FROM task_last_performed WHERE task_type = ?"""
+    )
+    stale = latest.date_last_performed >= str(monday)
+    if stale.any():
+        stale_ids = latest.id[stale].tolist()
+        before = pd.read_sql(
+            con = con, params = (task_type, str(monday), *stale_ids), sql = f"""
+            SELECT task_id AS id, MAX(week_start_date) AS date_last_performed
+            FROM {performed_weeks(con)} WHERE task_type = ? AND week_start_date < ?
+            AND task_id IN ({', '.join('?'*len(stale_ids))})
+            GROUP BY task_id"""
+        ).astype(latest.dtypes)
+        latest = pd.concat((latest[~stale], before), ignore_index = True)
+    return latest.set_index('id').date_last_performed
+
+def get_assignment_weeks(con) -> pd.Series:
+    return pd.read_sql(
+        con = con, sql = "SELECT DISTINCT week_start_date FROM assignments ORDER BY week_start_date"
+    ).week_start_date
+
+def get_week_assignments(con, monday) -> pd.DataFrame:
+    # the weekly, seasonal and occasional chores of the week with the
+    # task and the first name of the person, in the order they were
+    # written
+    return pd.read_sql(
+        con = con, params = (str(monday),), sql = f"""
+        SELECT a.week_start_date, a.person_id, a.task_type, a.task_id,
+        t.task, t.category, t.description, t.duration_hours, p.first_name
+        FROM assignments AS a
+        JOIN ({UNTIMED_TASKS}) AS t ON a.task_type = t.task_type AND a.task_id = t.id
+        JOIN people AS p ON a.person_id = p.id
+        WHERE a.week_start_date = ?
+        ORDER BY a.rowid"""
+    )
+
+def get_week_assignments_timed(con, monday) -> pd.DataFrame:
+    # the daily chores of the week with the task and the first name of
+    # the person, in the order they were written
+    return pd.read_sql(
+        con = con, params = (str(monday),), sql = """
+        SELECT a.week_start_date, a.person_id, a.weekday, a.task_id,
+        t.task, t.category, t.description, t.duration_hours, p.first_name
+        FROM assignments_timed AS a
+        JOIN daily_tasks AS t ON a.task_id = t.id
+        JOIN people AS p ON a.person_id = p.id
+        WHERE a.week_start_date = ?
+        ORDER BY a.rowid"""
+    )
+
+def is_week_planned(con, monday) -> bool:
+    return con.execute(
+        "SELECT 1 FROM hours WHERE week_start_date = ? LIMIT 1", (str(monday),)
+    ).fetchone() is not None
+
+def get_week_people(con, monday) -> pd.DataFrame:
+    # the people with chores in the week in the order they first
+    # appear in the assignments and then in the timed assignments
+    monday = str(monday)
+    return pd.read_sql(
+        con = con, params = (monday, monday, monday), sql = """
+        SELECT u.person_id, p.first_name FROM (
+            SELECT person_id, 0 AS part, MIN(rowid) AS position FROM assignments
+            WHERE week_start_date = ? GROUP BY person_id
+            UNION ALL
+            SELECT person_id, 1, MIN(rowid) FROM assignments_timed
+            WHERE week_start_date = ? AND person_id NOT IN (
+                SELECT person_id FROM assignments WHERE week_start_date = ?)
+            GROUP BY person_id
+        ) AS u JOIN people AS p ON u.person_id = p.id
+        ORDER BY u.part, u.position"""
+    )
+
+def get_week_hours(con, monday) -> pd.DataFrame:
+    # the hours of the week with the first name and parent flag
+    return pd.read_sql(
+        con = con, params = (str(monday),), sql = """
+        SELECT h.*, p.first_name, p.parent
+        FROM hours AS h JOIN people AS p ON h.person_id = p.id
+        WHERE h.week_start_date = ?
+        ORDER BY h.rowid"""
+    )
+
+def get_preference_tasks(con) -> pd.DataFrame:
+    return cached(
+        con, ('preferences',), ('preference_tasks',),
+        lambda: pd.read_sql(con = con, sql = "SELECT DISTINCT task, task_type FROM preferences")
+    )
+
+def next_id(con, table: str) -> int:
+    return con.execute(f"SELECT COALESCE(MAX(id) + 1, 0) FROM {table}").fetchone()[0]
+
+def add_default_preferences(con, rows):
+    # rows of (task, task_type, person_id) with DEFAULT_PREFERENCE
+    first = next_id(con, 'preferences')
+    con.executemany(
+        """INSERT INTO preferences (id, task, task_type, person_id, preference)
+        VALUES (?, ?, ?, ?, ?)""",
+        [(first + k, *row, DEFAULT_PREFERENCE) for k, row in enumerate(rows)]
+    )
+
+def add_missing_preferences(con, task: str, task_type: str):
+    # a preference is per task name (tasks of different types can share
+    # one), the active people without one for task get the default
+    add_default_preferences(con, [
+        (task, task_type, person_id) for (person_id,) in con.execute(
+            """SELECT id FROM people WHERE active AND id NOT IN (
+            SELECT person_id FROM preferences WHERE task = ?)""", (task,)
+        ).fetchall()
+    ])
+
+def task_name_in_use(con, task: str) -> bool:
+    return con.execute(
+        f"""SELECT 1 FROM ({' UNION ALL '.join(f'SELECT task FROM {task_type}_tasks' for task_type in TASK_TYPES)})
+        WHERE task = ? LIMIT 1""", (task,)
+    ).fetchone() is not None
+
+def update_person(con, person_id: int, load_fraction: float, parent: int, active: int):
+    con.execute(
+        "UPDATE people SET load_fraction = ?, parent = ?, active = ? WHERE id = ?",
+        (load_fraction, parent, active, person_id)
+    )
+    bump_catalog_versions(con, 'people')
+
+def add_person(con, first_name: str, last_name: str, load_fraction: float,
+               parent: int, email: str) -> int:
+    # an active person with the default preference for every task name
+    # that has preferences; returns the id of the person
+    person_id = next_id(con, 'people')
+    con.execute(
+        """INSERT INTO people (id, first_name, last_name, load_fraction, parent, active, email)
+        VALUES (?, ?, ?, ?, ?, 1, ?)""",
+        (person_id, first_name, last_name, load_fraction, parent, email)
+    )
+    tasks = get_preference_tasks(con).drop_duplicates('task')
+    add_default_preferences(con, [
+        (task, task_type, person_id) for task, task_type in zip(tasks.task, tasks.task_type)
+    ])
+    bump_catalog_versions(con, 'people', 'preferences')
+    return person_id
+
+def add_task(con, task_type: str, values: dict) -> int:
+    # values has the TASK_COLUMNS of the task type; every active person
+    # without a preference for its name gets the default one; returns
+    # the id of the task
+    check_task_type(task_type)
+    columns = TASK_COLUMNS[task_type]
+    task_id = next_id(con, f'{task_type}_tasks')
+    con.execute(
+        f"""INSERT INTO {task_type}_tasks (id, {', '.join(columns)})
+        VALUES ({', '.join('?'*(len(columns) + 1))})""",
+        (task_id, *(values.get(column) for column in columns))
+    )
+    add_missing_preferences(con, values['task'], task_type)
+    bump_catalog_versions(con, f'{task_type}_tasks', 'preferences')
+    return task_id
+
+def update_task(con, task_type: str, task_id: int, values: dict):
+    # values has some of the TASK_COLUMNS of the task type; on a new
+    # name the preferences move to it unless another task still has the
+    # old name, the people without a preference for the new name get
+    # the default one
+    check_task_type(task_type)
+    row = con.execute(f"SELECT task FROM {task_type}_tasks WHERE id = ?", (task_id,)).fetchone()
+    if row is None:
+        raise ValueError(f'No {task_type} task {task_id}')
+    columns = [column for column in TASK_COLUMNS[task_type] if column in values]
+    con.execute(
+        f"UPDATE {task_type}_tasks SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+        (*(values[column] for column in columns), task_id)
+    )
+    old, new = row[0], values.get('task', row[0])
+    if new != old:
+        if not task_name_in_use(con, old):
+            con.execute(
+                """UPDATE preferences SET task = ?, task_type = ? WHERE task = ? AND person_id NOT IN (
+                SELECT person_id FROM preferences WHERE task = ?)""", (new, task_type, old, new)
+            )
+            con.execute("DELETE FROM preferences WHERE task = ?", (old,))
+        add_missing_preferences(con, new, task_type)
+    bump_catalog_versions(con, f'{task_type}_tasks', 'preferences')
+
+def delete_task(con, task_type: str, task_id: int):
+    # the task, and its preferences unless another task has its name
+    check_task_type(task_type)
+    row = con.execute(f"SELECT task FROM {task_type}_tasks WHERE id = ?", (task_id,)).fetchone()
+    if row is None:
+        return
+    con.execute(f"DELETE FROM {task_type}_tasks WHERE id = ?", (task_id,))
+    if not task_name_in_use(con, row[0]):
+        con.execute("DELETE FROM preferences WHERE task = ?", (row[0],))
+    bump_catalog_versions(con, f'{task_type}_tasks', 'preferences')
+
+# the people whose requests changed in a planned week and whose chores
+# were not repaired yet, written with the request (add_pending_repair)
+# and taken by the reassign job of the week (take_pending_repairs)
+PENDING_REPAIRS_TABLE = """CREATE TABLE IF NOT EXISTS pending_repairs(
+    week_start_date TEXT NOT NULL, person_id INT NOT NULL,
+    PRIMARY KEY (week_start_date, person_id))"""
+
+def add_pending_repair(con, monday, person_id: int):
+    con.execute(PENDING_REPAIRS_TABLE)
+    con.execute(
+        "INSERT OR IGNORE INTO pending_repairs VALUES (?, ?)", (str(monday), person_id)
+    )
+
+def take_pending_repairs(con, monday) -> list:
+    # the pending people of the week, who are no longer pending
+    with con:
+        con.execute(PENDING_REPAIRS_TABLE)
+        person_ids = [row[0] for row in con.execute(
+            "SELECT person_id FROM pending_repairs WHERE week_start_date = ? ORDER BY person_id",
+            (str(monday),)
+        )]
+        con.execute("DELETE FROM pending_repairs WHERE week_start_date = ?", (str(monday),))
+    return person_ids
+
+def replace_request(con, monday, person_id: int, masks):
+    # masks are the days_in_town, dishes_am, dishes_pm, cook_meal,
+    # sous_chef, meal_cleanup and night_sweep bitmasks
+    con.execute(
+        "DELETE FROM requests WHERE week_start_date = ? AND person_id = ?",
+        (str(monday), person_id)
+    )
+    con.execute(
+        "INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (str(monday), person_id, *masks)
+    )
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# assign the chores of many houses, one database per house, over a
+# process pool; the weeks of a house run in order (each week needs the
+# leftover hours of the previous one) while different houses run in
+# parallel, and every worker loads a house's read-only catalog once
+import argparse
+import os
+import sys
+import time
+import yaml
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, timedelta
+from maitri_db import connect
+from assign_chores import (
+    load_catalog, load_requests, load_deficit, load_last_performed,
+    solve_week, write_weeks, check_solver
+)
+
+# per-worker cache, keys are database paths, values are the catalog
+# and the fixed chore assignments of the house
+catalogs = {}
+
+def fixed_chores_path(db_path):
+    # a house keeps its fixed chores next to its database, otherwise
+    # the default fixed_chores.yaml is used
+    path = os.path.join(os.path.dirname(db_path), 'fixed_chores.yaml')
+    return path if os.path.exists(path) else 'fixed_chores.yaml'
+
+def house_catalog(db_path):
+    if db_path not in catalogs:
+        con = connect(db_path)
+        try:
+            catalog = load_catalog(con)
+        finally:
+            con.close()
+        fixed_chores_config = yaml.safe_load(open(fixed_chores_path(db_path), 'r'))
+        catalogs[db_path] = (catalog, fixed_chores_config)
+    return catalogs[db_path]
+
+def run_house_week(db_path, monday, solver):
+    # solve and write one week of one house, returns a report dict
+    start = time.perf_counter()
+    try:
+        catalog, fixed_chores_config = house_catalog(db_path)
+        with connect(db_path) as con:
+            requests = load_requests(con, monday, monday)
+            deficit = load_deficit(con, monday)
+            last_performed = load_last_performed(con, monday)
+            success, message, week = solve_week(
+                monday, catalog, requests, deficit, last_performed,
+                fixed_chores_config, solver
+            )
+            if success:
+                write_weeks(con, {monday: week})
+        con.close()
+    except Exception as error:
+        success, message = False, repr(error)
+    return {
+        'house': db_path,
+        'monday': str(monday),
+        'success': success,
+        'message': message,
+        'seconds': time.perf_counter() - start,
+        'pid': os.getpid(),
+    }
+
+def run_houses(db_paths, start_monday: date, weeks: int, solver = 'greedy',
+               workers = None):
+    # returns the list of week reports in completion order; a house
+    # stops at its first failed week
+    check_solver(solver)
+    mondays = [start_monday + timedelta(days = 7*week) for week in range(weeks)]
+    reports = []
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        # keys are the futures, values are (house, index of the week)
+        pending = {
+            pool.submit(run_house_week, path, mondays[0], solver): (path, 0)
+            for path in db_paths
+        }
+        while pending:
+            done, _ = wait(pending, return_when = FIRST_COMPLETED)
+            for future in done:
+                path, week = pending.pop(future)
+                report = future.result()
+                reports.append(report)
+                if report['success'] and week + 1 < len(mondays):
+                    pending[pool.submit(
+                        run_house_week, path, mondays[week + 1], solver
+                    )] = (path, week + 1)
+    return reports
+
+def print_summary(reports, db_paths, weeks, elapsed):
+    df = pd.DataFrame(reports)
+    for path in db_paths:
+        house = df[df.house == path]
+        failed = house[~house.success]
+        print(f"{path}: {house.success.sum()}/{weeks} weeks in "
+              f"{house.seconds.sum():.2f}s (slowest week {house.seconds.max():.2f}s)")
+        for _, row in failed.iterrows():
+            print(f"  {row.monday} failed: {row.message}")
+    print(f"{len(db_paths)} houses x {weeks} weeks in {elapsed:.2f}s "
+          f"on {df.pid.nunique()} workers")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('monday', type = str,
+                        help = 'first monday date in YYYY-MM-DD format')
+    parser.add_argument('databases', nargs = '+', help = 'one chore database per house')
+    parser.add_argument('--weeks', type = int, default = 1,
+                        help = 'number of consecutive weeks to plan')
+    parser.add_argument('--solver', choices = ('greedy', 'optimal'), default = 'greedy')
+    parser.add_argument('--workers', type = int, default = os.cpu_count(),
+                        help = 'number of worker processes')
+    args = parser.parse_args()
+    monday = pd.to_datetime(args.monday).date()
+    if monday.weekday() != 0:
+        parser.error(f'{args.monday} is not a Monday')
+    start = time.perf_counter()
+    reports = run_houses(args.databases, monday, args.weeks, args.solver, args.workers)
+    print_summary(reports, args.databases, args.weeks, time.perf_counter() - start)
+    if not all(report['success'] for report in reports):
+        sys.exit(1)
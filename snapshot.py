@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# dump every table of the chore database into one compressed snapshot
+# file and restore it: the rows are streamed in chunks of chunk_rows,
+# so a multi-year history never sits in memory at once, and are stored
+# as JSON, which keeps the SQLite types (integer, real, text, null) of
+# every value as they are, a blob is stored as {"blob": base64}; JSON
+# reads the same on every Python version, the version in the header
+# changes with the layout of the records
+#
+# the file is a gzip stream of JSON records, one per line:
+#   {"version", "user_version"}               header
+#   ["table", name, sql, rowid]               a table and its schema
+#   ["rows", [row arrays]]                    a chunk of its rows (with
+#                                             the rowid first if rowid)
+#   ["sequence", [[name, seq]]]               the AUTOINCREMENT counters
+#   ["index", sql]                            the indexes, after the rows
+import argparse
+import base64
+import gzip
+import json
+import os
+import sqlite3
+import time
+from maitri_db import db, tables
+from repository import bump_catalog_versions, get_catalog_versions
+from repository import bump_week_versions_past, get_weeks_version
+
+# 1 was a marshal stream, which only the Python version that wrote it
+# can read
+SNAPSHOT_VERSION = 2
+
+def schema(con, kind: str):
+    # (name, sql) of the tables or indexes, without the internal
+    # sqlite_ ones and the automatic indexes of the keys
+    return con.execute(
+        """SELECT name, sql FROM sqlite_master
+        WHERE type = ? AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY rowid""", (kind,)
+    ).fetchall()
+
+def dump(database: str, path: str, chunk_rows: int = 10000) -> dict:
+    # write the snapshot of the database to path, the rows are read in
+    # one read transaction so the snapshot is consistent while the app
+    # keeps writing; returns the number of rows per table
+    con = sqlite3.connect(database, isolation_level = None)
+    counts = {}
+    try:
+        con.execute('BEGIN')
+        with gzip.open(path + '.tmp', 'wt', encoding = 'utf-8', compresslevel = 6) as f:
+            write_record(f, {
+                'version': SNAPSHOT_VERSION,
+                'user_version': con.execute('PRAGMA user_version').fetchone()[0],
+            })
+            for table, sql in schema(con, 'table'):
+                # the rowids are kept since the week queries order by
+                # them, WITHOUT ROWID tables have none
+                rowid = 'WITHOUT ROWID' not in sql.upper()
+                write_record(f, ('table', table, sql, rowid))
+                counts[table] = 0
+                cur = con.execute(f'SELECT {"rowid, " if rowid else ""}* FROM "{table}"')
+                for rows in iter(lambda: cur.fetchmany(chunk_rows), []):
+                    write_record(f, ('rows', rows))
+                    counts[table] += len(rows)
+            if con.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+                write_record(f, ('sequence', con.execute('SELECT * FROM sqlite_sequence').fetchall()))
+            for _, sql in schema(con, 'index'):
+                write_record(f, ('index', sql))
+        con.execute('COMMIT')
+    finally:
+        con.close()
+    os.replace(path + '.tmp', path)
+    return counts
+
+def encode_blob(value):
+    if isinstance(value, bytes):
+        return {'blob': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'Can not store {type(value).__name__} in a snapshot')
+
+def decode_blob(obj: dict):
+    # the values of the rows are never objects, an object with the
+    # single key blob is a blob
+    if obj.keys() == {'blob'}:
+        return base64.b64decode(obj['blob'])
+    return obj
+
+def write_record(f, record):
+    f.write(json.dumps(record, default = encode_blob, separators = (',', ':')))
+    f.write('\n')
+
+def records(path: str):
+    with gzip.open(path, 'rt', encoding = 'utf-8') as f:
+        for line in f:
+            yield json.loads(line, object_hook = decode_blob)
+
+def restore(path: str, database: str, replace: bool = False) -> dict:
+    # load the snapshot into database in one transaction, the indexes
+    # are created after the rows; an existing table is an error unless
+    # replace, which drops it first and bumps the catalog versions and
+    # the week stamps past the live ones; returns the number of rows per
+    # table
+    con = sqlite3.connect(database, isolation_level = None)
+    counts = {}
+    try:
+        stream = records(path)
+        try:
+            header = next(stream)
+        except ValueError:
+            # not JSON, e.g. a marshal snapshot of version 1
+            header = {}
+        if not isinstance(header, dict) or header.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f'Unknown snapshot version: {header.get("version")}')
+        con.execute('BEGIN')
+        try:
+            # the counters of the live database, which the processes
+            # that cache the catalog may hold
+            live = get_catalog_versions(con, tables) if replace else None
+            live_week = get_weeks_version(con)[2] if replace else 0
+            insert = None
+            for record in stream:
+                if record[0] == 'table':
+                    _, table, sql, rowid = record
+                    if replace:
+                        con.execute(f'DROP TABLE IF EXISTS "{table}"')
+                    con.execute(sql)
+                    columns = [f'"{row[1]}"' for row in con.execute(f'PRAGMA table_info("{table}")')]
+                    if rowid:
+                        columns.insert(0, 'rowid')
+                    insert = f"""INSERT INTO "{table}" ({', '.join(columns)})
+                    VALUES ({', '.join('?'*len(columns))})"""
+                    counts[table] = 0
+                elif record[0] == 'rows':
+                    con.executemany(insert, record[1])
+                    counts[table] += len(record[1])
+                elif record[0] == 'sequence':
+                    # SQLite creates sqlite_sequence with the first
+                    # AUTOINCREMENT table, without one there is nothing
+                    # to count
+                    if not con.execute(
+                        "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'"
+                    ).fetchone():
+                        continue
+                    con.execute('DELETE FROM sqlite_sequence')
+                    con.executemany('INSERT INTO sqlite_sequence VALUES (?, ?)', record[1])
+                elif record[0] == 'index':
+                    con.execute(record[1])
+            if replace:
+                # the app processes that cached the replaced catalog
+                # read it again, also when the snapshot wrote back older
+                # counters or has none
+                bump_catalog_versions(con, *tables, past = dict(zip(tables, live or ())))
+                # and the week pages the clients hold are stale
+                bump_week_versions_past(con, live_week)
+            con.execute(f"PRAGMA user_version = {int(header['user_version'])}")
+            con.execute('COMMIT')
+        except Exception:
+            con.execute('ROLLBACK')
+            raise
+    finally:
+        con.close()
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest = 'command', required = True)
+    dump_parser = subparsers.add_parser('dump', help = 'write a snapshot of the database')
+    dump_parser.add_argument('path', help = 'snapshot file (e.g. chores.snapshot.gz)')
+    dump_parser.add_argument('--db', default = db, help = 'chore database')
+    dump_parser.add_argument('--chunk-rows', type = int, default = 10000)
+    restore_parser = subparsers.add_parser('restore', help = 'load a snapshot into a database')
+    restore_parser.add_argument('path', help = 'snapshot file')
+    restore_parser.add_argument('--db', default = db, help = 'chore database')
+    restore_parser.add_argument('--replace', action = 'store_true',
+                                help = 'drop the tables of the snapshot that already exist')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    if args.command == 'dump':
+        counts = dump(args.db, args.path, args.chunk_rows)
+        print(f'Dumped {args.db} to {args.path}', end = '')
+    else:
+        counts = restore(args.path, args.db, args.replace)
+        print(f'Restored {args.path} into {args.db}', end = '')
+    print(f' in {time.perf_counter() - start:.2f}s:', counts)
@@ -0,0 +1,32 @@
+# the tests import the modules of the repository root and run in it,
+# since the app and the solver read fixed_chores.yaml from there; run
+# them with
+#   python -m pytest tests
+import os
+import shutil
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(autouse = True)
+def in_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+@pytest.fixture
+def sample_db(tmp_path):
+    # a copy of the sample database with its original schema
+    path = str(tmp_path/'chores.db')
+    shutil.copy(os.path.join(ROOT, 'data', 'maitri_chores.db'), path)
+    return path
+
+@pytest.fixture
+def migrated_db(sample_db):
+    # the sample database at the latest schema version
+    from maitri_db import open_db
+    from migrations import migrate
+    con = open_db(sample_db)
+    migrate(con)
+    con.close()
+    return sample_db
@@ -0,0 +1,46 @@
+# the JSON API of the week history: pages, cursors, the NDJSON stream
+# and the refused arguments
+import json
+import pytest
+from param import api_max_page_rows
+
+@pytest.fixture
+def client(migrated_db):
+    import chore_chart
+    return chore_chart.create_app(DATABASE = migrated_db, SQLITE_WAL = False).test_client()
+
+def test_pages_cover_the_stream(client):
+    rows, after = [], None
+    while True:
+        query = {'limit': 500, 'person': 5} if after is None else {'limit': 500, 'person': 5, 'after': after}
+        page = client.get('/api/assignments', query_string = query).get_json()
+        rows.extend(page['rows'])
+        after = page['next']
+        if after is None:
+            break
+    stream = client.get('/api/assignments', query_string = {'format': 'ndjson', 'person': 5})
+    assert stream.status_code == 200
+    assert [json.loads(line) for line in stream.get_data(as_text = True).splitlines()] == rows
+    assert rows and all(row['person_id'] == 5 for row in rows)
+
+def test_ndjson_limit(client):
+    response = client.get('/api/hours', query_string = {'format': 'ndjson', 'limit': 3})
+    assert response.status_code == 200
+    assert len(response.get_data(as_text = True).splitlines()) == 3
+
+@pytest.mark.parametrize('query', [
+    {'format': 'ndjson', 'limit': -1},
+    {'format': 'ndjson', 'limit': 0},
+    {'format': 'ndjson', 'limit': 'many'},
+    {'limit': 0},
+    {'limit': api_max_page_rows + 1},
+    {'after': 'not a cursor'},
+    {'week': '2026-13-01'},
+])
+def test_bad_arguments_are_refused_before_any_row(client, query):
+    response = client.get('/api/hours', query_string = query)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_unknown_table(client):
+    assert client.get('/api/people').status_code == 404
@@ -0,0 +1,103 @@
+# archive export round trips: the weeks read back from the archive,
+# before and after a compaction, and the assignment pages of the
+# archived weeks
+from datetime import date
+import pandas as pd
+import pytest
+import repository
+from archive import ARCHIVE_COLUMNS, export_weeks, get_cutoff, read_week_chores, read_weeks
+from archive import read_assignment_weeks
+from maitri_db import open_db
+
+CUTOFF = date(2025, 9, 1)
+
+def sqlite_weeks(con, table):
+    return pd.read_sql(
+        con = con, sql = f"""SELECT {', '.join(ARCHIVE_COLUMNS[table])} FROM {table}
+        WHERE week_start_date != 'NaT' ORDER BY week_start_date, rowid"""
+    )
+
+def assert_same_rows(frame, expected):
+    pd.testing.assert_frame_equal(
+        frame.reset_index(drop = True), expected.reset_index(drop = True), check_dtype = False
+    )
+
+@pytest.fixture
+def con(migrated_db):
+    con = open_db(migrated_db)
+    yield con
+    con.close()
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_read_weeks_round_trip(con, tmp_path, compact):
+    expected = {table: sqlite_weeks(con, table) for table in ARCHIVE_COLUMNS}
+    exported = export_weeks(con, CUTOFF, str(tmp_path), compact = compact)
+    assert get_cutoff(str(tmp_path)) == CUTOFF
+    for table, rows in expected.items():
+        assert exported[table] == (rows.week_start_date < str(CUTOFF)).sum()
+        assert_same_rows(read_weeks(con, table, directory = str(tmp_path)), rows)
+        left = con.execute(f'SELECT COUNT(*) FROM {table} WHERE week_start_date < ?', (str(CUTOFF),)).fetchone()[0]
+        assert (left == 0) == compact
+
+def test_export_in_steps(con, tmp_path):
+    expected = {table: sqlite_weeks(con, table) for table in ARCHIVE_COLUMNS}
+    export_weeks(con, date(2025, 3, 3), str(tmp_path))
+    export_weeks(con, CUTOFF, str(tmp_path), compact = True)
+    with pytest.raises(ValueError):
+        export_weeks(con, date(2025, 3, 3), str(tmp_path))
+    for table, rows in expected.items():
+        assert_same_rows(read_weeks(con, table, directory = str(tmp_path)), rows)
+    # a range of weeks across the cutoff
+    rows = expected['hours']
+    rows = rows[(rows.week_start_date >= '2025-08-04') & (rows.week_start_date <= '2025-09-29')]
+    assert_same_rows(read_weeks(con, 'hours', '2025-08-04', '2025-09-29', str(tmp_path)), rows)
+
+def test_archived_week_pages(con, tmp_path):
+    mondays = list(repository.get_assignment_weeks(con))
+    archived = [monday for monday in mondays if monday < str(CUTOFF)]
+    assert archived
+    expected = {monday: read_week_chores(con, monday, str(tmp_path)) for monday in archived}
+    export_weeks(con, CUTOFF, str(tmp_path), compact = True)
+    assert read_assignment_weeks(con, str(tmp_path)) == mondays
+    for monday, frames in expected.items():
+        for frame, archived_frame in zip(frames, read_week_chores(con, monday, str(tmp_path))):
+            assert_same_rows(archived_frame, frame)
+
+def test_last_performed_after_compaction(con, tmp_path):
+    # the tasks last assigned before the cutoff and in a single later
+    # week lose that week when it is planned again
+    last = dict(((row[0], row[1]), row[2]) for row in con.execute(
+        """SELECT task_type, task_id, MAX(week_start_date) FROM assignments
+        WHERE week_start_date < ? GROUP BY task_type, task_id""", (str(CUTOFF),)
+    ))
+    later = con.execute(
+        """SELECT task_type, task_id, MIN(week_start_date) FROM assignments
+        WHERE week_start_date >= ? GROUP BY task_type, task_id
+        HAVING COUNT(DISTINCT week_start_date) = 1""", (str(CUTOFF),)
+    ).fetchall()
+    replanned = [row for row in later if row[:2] in last]
+    assert replanned
+    export_weeks(con, CUTOFF, str(tmp_path), compact = True)
+    with con:
+        for task_type, task_id, monday in replanned:
+            con.execute(
+                'DELETE FROM assignments WHERE task_type = ? AND task_id = ? AND week_start_date = ?',
+                (task_type, task_id, monday)
+            )
+        repository.update_last_performed(con, {monday for _, _, monday in replanned})
+    expected = {key: last[key] for key in (row[:2] for row in replanned)}
+    def stored():
+        return {key: con.execute(
+            'SELECT week_start_date FROM task_last_performed WHERE task_type = ? AND task_id = ?', key
+        ).fetchone()[0] for key in expected}
+    assert stored() == expected
+    # a rebuild agrees, and the latest weeks before the cutoff are all
+    # archived weeks
+    repository.rebuild_last_performed(con)
+    con.commit()
+    assert stored() == expected
+    for task_type in ('seasonal', 'occasional'):
+        latest = repository.get_last_performed(con, task_type, CUTOFF)
+        assert {
+            (task_type, task_id): str(week)[:10] for task_id, week in latest.items()
+        } == {key: week for key, week in last.items() if key[0] == task_type}
@@ -0,0 +1,57 @@
+# the ETag and Last-Modified validators of the week pages
+import sqlite3
+import pytest
+import repository
+
+MONDAY = '2026-05-11'
+
+def bump(path, *mondays):
+    con = sqlite3.connect(path)
+    with con:
+        repository.bump_week_versions(con, mondays)
+    con.close()
+
+@pytest.fixture
+def client(migrated_db):
+    import chore_chart
+    # the week was planned after the migration stamped none
+    bump(migrated_db, MONDAY)
+    return chore_chart.create_app(DATABASE = migrated_db, SQLITE_WAL = False).test_client()
+
+@pytest.mark.parametrize('page', [f'/assignment/{MONDAY}', '/assignments'])
+def test_current_copy_is_not_modified(client, page):
+    response = client.get(page)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+    assert 'no-cache' in response.headers['Cache-Control']
+    again = client.get(page, headers = {'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.data == b''
+    assert client.get(page, headers = {'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    assert client.get(page, headers = {'If-None-Match': '"stale"'}).status_code == 200
+
+def test_week_write_changes_its_etag_only(client, migrated_db):
+    page, other = f'/assignment/{MONDAY}', '/assignment/2026-05-04'
+    etag = client.get(page).headers['ETag']
+    other_etag = client.get(other).headers['ETag']
+    bump(migrated_db, MONDAY)
+    response = client.get(page, headers = {'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert client.get(other, headers = {'If-None-Match': other_etag}).status_code == 304
+
+def test_catalog_change_changes_every_week(client, migrated_db):
+    etags = {page: client.get(page).headers['ETag'] for page in (f'/assignment/{MONDAY}', '/assignments')}
+    con = sqlite3.connect(migrated_db)
+    person_id, load_fraction, parent, active = con.execute(
+        'SELECT id, load_fraction, parent, active FROM people LIMIT 1'
+    ).fetchone()
+    con.close()
+    response = client.post('/update_person', data = {
+        'id': person_id, 'frac': load_fraction, 'parent': parent, 'active': active,
+    })
+    assert response.status_code in (200, 302)
+    for page, etag in etags.items():
+        assert client.get(page, headers = {'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,144 @@
+# the job queue: single flight per (kind, monday), the bounded queue,
+# failures, reruns and the jobs of dead processes
+import sqlite3
+import threading
+import time
+import pytest
+import jobs
+from jobs import JobQueue, JobFailed, QueueFull, get_job
+
+MONDAY = '2026-05-11'
+
+class Backend:
+    # a backend that runs until it is released, counting its runs
+    def __init__(self, fail: str = None):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.runs = 0
+        self.fail = fail
+
+    def __call__(self, monday, progress):
+        self.runs += 1
+        progress('work')
+        self.started.set()
+        assert self.release.wait(10)
+        if self.fail is not None:
+            raise JobFailed(self.fail)
+        return f'run {self.runs} of {monday}'
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path/'jobs.db')
+    return lambda: sqlite3.connect(path, timeout = 10)
+
+def wait(connect, job_id):
+    for _ in range(500):
+        con = connect()
+        job = get_job(con, job_id)
+        con.close()
+        if job['state'] in ('done', 'failed'):
+            return job
+        time.sleep(.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+def test_single_flight(connect):
+    backend = Backend()
+    queue = JobQueue(connect, {'sheet': backend}, workers = 1, queue_size = 2)
+    job_id, queued = queue.submit('sheet', MONDAY)
+    assert queued
+    # a double click and another web worker get the same job
+    assert queue.submit('sheet', MONDAY) == (job_id, False)
+    other_worker = JobQueue(connect, {'sheet': backend}, workers = 1, queue_size = 2)
+    assert other_worker.submit('sheet', MONDAY) == (job_id, False)
+    # another week is another job
+    other_id, queued = queue.submit('sheet', '2026-05-18')
+    assert queued and other_id != job_id
+    backend.release.set()
+    job = wait(connect, job_id)
+    assert (job['state'], job['message']) == ('done', f'run 1 of {MONDAY}')
+    assert 'work' in job['timings']
+    wait(connect, other_id)
+    assert backend.runs == 2
+    # a finished job is queued again
+    again, queued = queue.submit('sheet', MONDAY)
+    assert queued and again not in (job_id, other_id)
+    wait(connect, again)
+
+def test_queue_full(connect):
+    backend = Backend()
+    queue = JobQueue(connect, {'sheet': backend}, workers = 1, queue_size = 1)
+    first, _ = queue.submit('sheet', '2026-05-04')
+    second, _ = queue.submit('sheet', '2026-05-11')
+    with pytest.raises(QueueFull):
+        queue.submit('sheet', '2026-05-18')
+    # the active job is still found when the queue is full
+    assert queue.submit('sheet', '2026-05-11') == (second, False)
+    backend.release.set()
+    wait(connect, first)
+    wait(connect, second)
+    third, queued = queue.submit('sheet', '2026-05-18')
+    assert queued
+    wait(connect, third)
+
+def test_failure_frees_the_slot(connect):
+    backend = Backend(fail = 'No spreadsheet')
+    backend.release.set()
+    queue = JobQueue(connect, {'sheet': backend}, workers = 1, queue_size = 0)
+    job_id, _ = queue.submit('sheet', MONDAY)
+    job = wait(connect, job_id)
+    assert (job['state'], job['message']) == ('failed', 'No spreadsheet')
+    job_id, queued = queue.submit('sheet', MONDAY)
+    assert queued
+    wait(connect, job_id)
+
+def test_rerun_while_running(connect):
+    backend = Backend()
+    queue = JobQueue(connect, {'repair': backend}, workers = 1, queue_size = 1)
+    job_id, _ = queue.submit('repair', MONDAY, rerun = True)
+    assert backend.started.wait(10)
+    # the input changed while the job ran
+    assert queue.submit('repair', MONDAY, rerun = True) == (job_id, False)
+    assert queue.submit('repair', MONDAY, rerun = True) == (job_id, False)
+    backend.release.set()
+    job = wait(connect, job_id)
+    # the reruns asked for while it ran coalesce into one
+    assert backend.runs == 2
+    assert (job['state'], job['message'], job['rerun']) == ('done', f'run 2 of {MONDAY}', 0)
+
+def test_no_rerun_without_asking(connect):
+    backend = Backend()
+    queue = JobQueue(connect, {'emails': backend}, workers = 1, queue_size = 1)
+    job_id, _ = queue.submit('emails', MONDAY)
+    assert backend.started.wait(10)
+    assert queue.submit('emails', MONDAY) == (job_id, False)
+    backend.release.set()
+    wait(connect, job_id)
+    assert backend.runs == 1
+
+def test_jobs_of_dead_processes_fail(connect, monkeypatch):
+    con = connect()
+    jobs.create_jobs_table(con)
+    with con:
+        job_id = con.execute(
+            """INSERT INTO jobs (kind, monday, state, pid, created)
+            VALUES ('sheet', ?, 'running', 12345, ?)""", (MONDAY, time.time())
+        ).lastrowid
+    con.close()
+    monkeypatch.setattr(jobs, 'pid_alive', lambda pid: pid != 12345)
+    backend = Backend()
+    backend.release.set()
+    queue = JobQueue(connect, {'sheet': backend}, workers = 1, queue_size = 1)
+    con = connect()
+    assert (get_job(con, job_id)['state'], get_job(con, job_id)['message']) == ('failed', 'Interrupted by a restart')
+    con.close()
+    new_id, queued = queue.submit('sheet', MONDAY)
+    assert queued and new_id != job_id
+    wait(connect, new_id)
+
+def test_jobs_table_of_migration_7_gets_the_rerun_column(connect):
+    con = connect()
+    con.execute(jobs.JOBS_TABLE.replace(',\n    rerun INT NOT NULL DEFAULT 0', ''))
+    assert 'rerun' not in [row[1] for row in con.execute('PRAGMA table_info(jobs)')]
+    jobs.create_jobs_table(con)
+    assert 'rerun' in [row[1] for row in con.execute('PRAGMA table_info(jobs)')]
+    con.close()
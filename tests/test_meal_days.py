@@ -0,0 +1,59 @@
+# choose_meal_days against a brute force over every way to give the
+# cooks distinct days
+import itertools
+import numpy as np
+import pytest
+from assign_chores import choose_meal_days, DAY_BIT, MEAL_SCHEDULES
+
+RANK = {schedule: rank for rank, schedule in enumerate(MEAL_SCHEDULES)}
+
+def feasible(meal_days, clean_ids, clean_masks):
+    # every meal day keeps two cleaners once the cooks stop cleaning
+    cooks = set(meal_days)
+    return all(
+        sum(1 for person_id, mask in zip(clean_ids, clean_masks)
+            if person_id not in cooks and mask & DAY_BIT[day]) >= 2
+        for day in meal_days.values()
+    )
+
+def best_rank(cook_ids, cook_masks, clean_ids, clean_masks):
+    # the rank in MEAL_SCHEDULES of the best feasible schedule, None if
+    # no cook can make a meal
+    best = None
+    options = [
+        [None] + [day for day in range(7) if mask & DAY_BIT[day]] for mask in cook_masks
+    ]
+    for days in itertools.product(*options):
+        chosen = [day for day in days if day is not None]
+        if not chosen or len(set(chosen)) != len(chosen):
+            continue
+        meal_days = {person_id: day for person_id, day in zip(cook_ids, days) if day is not None}
+        if not feasible(meal_days, clean_ids, clean_masks):
+            continue
+        rank = RANK[sum(DAY_BIT[day] for day in chosen)]
+        best = rank if best is None else min(best, rank)
+    return best
+
+@pytest.mark.parametrize('seed', range(60))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    num_people = int(rng.integers(2, 9))
+    person_ids = list(range(num_people))
+    cook_ids = sorted(rng.choice(person_ids, size = int(rng.integers(1, min(num_people, 5) + 1)), replace = False).tolist())
+    cook_masks = [int(rng.integers(0, 128)) for _ in cook_ids]
+    clean_ids = person_ids
+    clean_masks = [int(rng.integers(0, 128)) for _ in clean_ids]
+    meal_days = choose_meal_days(cook_ids, cook_masks, clean_ids, clean_masks)
+    expected = best_rank(cook_ids, cook_masks, clean_ids, clean_masks)
+    if expected is None:
+        assert meal_days == {}
+        return
+    assert list(meal_days) == [person_id for person_id in cook_ids if person_id in meal_days]
+    assert len(set(meal_days.values())) == len(meal_days)
+    mask_of = dict(zip(cook_ids, cook_masks))
+    assert all(mask_of[person_id] & DAY_BIT[day] for person_id, day in meal_days.items())
+    assert feasible(meal_days, clean_ids, clean_masks)
+    assert RANK[sum(DAY_BIT[day] for day in meal_days.values())] == expected
+
+def test_no_cooks():
+    assert choose_meal_days([], [], [0, 1, 2], [127, 127, 127]) == {}
@@ -0,0 +1,68 @@
+# the migrations of the sample database: versions, keys, duplicate
+# rows, rollback of a failed migration
+import shutil
+import sqlite3
+import pytest
+import migrations
+from maitri_db import open_db
+from migrations import KEYED_TABLES, MIGRATIONS, get_version, migrate
+
+LATEST = MIGRATIONS[-1][0]
+
+def schema(con):
+    return sorted(con.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"
+    ).fetchall())
+
+def distinct_keys(con, table):
+    key = KEYED_TABLES[table][1]
+    return con.execute(f"SELECT COUNT(*) FROM (SELECT DISTINCT {', '.join(key)} FROM {table})").fetchone()[0]
+
+def test_migrate_to_latest_once(sample_db, capsys):
+    con = open_db(sample_db)
+    assert get_version(con) == 0
+    keys = {table: distinct_keys(con, table) for table in ('requests', 'hours', 'assignments')}
+    assert migrate(con) == LATEST
+    capsys.readouterr()
+    # a migrated database is left alone
+    before = schema(con)
+    assert migrate(con) == LATEST
+    assert capsys.readouterr().out == ''
+    assert schema(con) == before
+    # the rows of the keyed tables are the distinct keys
+    for table, count in keys.items():
+        assert con.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == count
+
+def test_step_by_step_equals_all_at_once(sample_db, tmp_path):
+    other = str(tmp_path/'other.db')
+    shutil.copy(sample_db, other)
+    con = open_db(sample_db)
+    for version, _, _ in MIGRATIONS:
+        assert migrate(con, version) == version
+    at_once = open_db(other)
+    migrate(at_once)
+    assert schema(con) == schema(at_once)
+
+def test_keys_drop_duplicates_keeping_the_last(sample_db):
+    con = open_db(sample_db)
+    migrate(con, 1)
+    row = con.execute('SELECT week_start_date, person_id FROM requests LIMIT 1').fetchone()
+    con.execute('INSERT INTO requests VALUES (?, ?, 1, 2, 3, 4, 5, 6, 7)', row)
+    con.commit()
+    migrate(con, 2)
+    assert con.execute(
+        'SELECT days_in_town, night_sweep FROM requests WHERE week_start_date = ? AND person_id = ?', row
+    ).fetchall() == [(1, 7)]
+    with pytest.raises(sqlite3.IntegrityError):
+        con.execute('INSERT INTO requests VALUES (?, ?, 0, 0, 0, 0, 0, 0, 0)', row)
+
+def test_failed_migration_rolls_back(sample_db, monkeypatch):
+    def fail(con):
+        con.execute('CREATE TABLE half_done(x)')
+        raise RuntimeError('failed')
+    monkeypatch.setattr(migrations, 'MIGRATIONS', MIGRATIONS[:1] + [(2, 'fails', fail)])
+    con = open_db(sample_db)
+    with pytest.raises(RuntimeError):
+        migrate(con)
+    assert get_version(con) == 1
+    assert not con.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone()
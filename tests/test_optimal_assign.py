@@ -0,0 +1,51 @@
+# solve_assignment against a brute force over every assignment of
+# small instances
+import itertools
+import numpy as np
+import pytest
+from optimal_assign import solve_assignment, total_value
+
+def brute_force(capacity, duration, value):
+    # the best total value, every task to a person who can take it or
+    # to nobody
+    num_people, num_tasks = value.shape
+    best = 0.
+    options = [
+        [-1] + [person for person in range(num_people) if not np.isnan(value[person, task])]
+        for task in range(num_tasks)
+    ]
+    for assignment in itertools.product(*options):
+        assignment = np.array(assignment, dtype = np.int64)
+        used = np.zeros(num_people)
+        np.add.at(used, assignment[assignment >= 0], duration[assignment >= 0])
+        if np.all(used <= capacity + 1e-9):
+            best = max(best, total_value(assignment, value))
+    return best
+
+def random_instance(seed):
+    rng = np.random.default_rng(seed)
+    num_people, num_tasks = int(rng.integers(1, 4)), int(rng.integers(1, 7))
+    capacity = rng.choice([0., .5, 1., 1.5, 2., 3.], size = num_people)
+    duration = rng.choice([.25, .5, 1., 1.5, 2.], size = num_tasks)
+    # the solver weights a preference by the hours of the task
+    value = rng.integers(1, 6, size = (num_people, num_tasks))*duration
+    value = np.where(rng.random((num_people, num_tasks)) < .2, np.nan, value)
+    return capacity, duration, value
+
+@pytest.mark.parametrize('seed', range(80))
+def test_matches_brute_force(seed):
+    capacity, duration, value = random_instance(seed)
+    assignment, optimal = solve_assignment(capacity, duration, value, time_budget = 10.)
+    assert optimal
+    assigned = np.flatnonzero(assignment >= 0)
+    assert not np.isnan(value[assignment[assigned], assigned]).any()
+    used = np.zeros(len(capacity))
+    np.add.at(used, assignment[assigned], duration[assigned])
+    assert np.all(used <= capacity + 1e-9)
+    assert total_value(assignment, value) == pytest.approx(brute_force(capacity, duration, value))
+
+def test_nobody_can_take_a_task():
+    value = np.array([[np.nan, 2.], [np.nan, 1.]])
+    assignment, optimal = solve_assignment([1., 1.], [1., 1.], value)
+    assert optimal
+    assert assignment.tolist() == [-1, 0]
@@ -0,0 +1,220 @@
+# the row diff of a repaired week and the repair of a planned week of
+# the sample database after a request change
+import contextlib
+import io
+import sqlite3
+import time
+from collections import Counter
+from datetime import date
+import pandas as pd
+import pytest
+import repository
+import reassign_chores as reassign
+from assign_chores import WEEK_COLUMNS
+from migrations import create_week_tables
+from reassign_chores import StaleWeek, fixed_credits, load_week, reassign_chores, write_changes
+
+MONDAY = date(2026, 5, 11)
+
+def week_rows(con, table):
+    return Counter(con.execute(
+        f"SELECT {', '.join(WEEK_COLUMNS[table][1:])} FROM {table} WHERE week_start_date = ?",
+        (str(MONDAY),)
+    ).fetchall())
+
+def frame(table, rows):
+    return pd.DataFrame(
+        [(MONDAY, *row) for row in rows], columns = WEEK_COLUMNS[table]
+    )
+
+def test_write_changes_touches_only_the_changed_rows():
+    con = sqlite3.connect(':memory:')
+    create_week_tables(con)
+    monday = str(MONDAY)
+    con.executemany('INSERT INTO assignments VALUES (?, ?, ?, ?)', [
+        (monday, 1, 'weekly', 10), (monday, 2, 'weekly', 11), (monday, 3, 'seasonal', 12),
+    ])
+    con.executemany('INSERT INTO assignments_timed VALUES (?, ?, ?, ?)', [
+        (monday, 1, 0, 2), (monday, 1, 0, 2), (monday, 2, 3, 4),
+    ])
+    con.executemany('INSERT INTO hours VALUES (?, ?, ?, ?, ?, ?)', [
+        (monday, 1, 7., 3., 4., 1.), (monday, 2, 7., 2., 4., 2.),
+    ])
+    # an unrelated week stays as it is
+    con.execute("INSERT INTO assignments VALUES ('2026-05-04', 1, 'weekly', 10)")
+    con.commit()
+    old = load_week(con, MONDAY)
+    rowids = {
+        tuple(row[1:]): row[0]
+        for row in con.execute(
+            'SELECT rowid, person_id, task_type, task_id FROM assignments WHERE week_start_date = ?',
+            (monday,)
+        )
+    }
+    week = {
+        # 2 loses task 11 to 4, the others keep theirs
+        'assignments': frame('assignments', [(1, 'weekly', 10), (4, 'weekly', 11), (3, 'seasonal', 12)]),
+        # one of the two identical slots of 1 goes to 3
+        'assignments_timed': frame('assignments_timed', [(1, 0, 2), (3, 0, 2), (2, 3, 4)]),
+        'hours': frame('hours', [(1, 7., 3., 4., 1.), (2, 7., 1., 4., 3.)]),
+    }
+    # a row deleted and a row inserted per changed row
+    assert write_changes(con, MONDAY, old, week) == 2 + 2 + 2
+    for table, rows in week.items():
+        assert week_rows(con, table) == Counter(
+            rows[WEEK_COLUMNS[table][1:]].itertuples(index = False, name = None)
+        )
+    # the unchanged rows were not rewritten
+    for key in ((1, 'weekly', 10), (3, 'seasonal', 12)):
+        assert con.execute(
+            'SELECT rowid FROM assignments WHERE week_start_date = ? AND person_id = ? '
+            'AND task_type = ? AND task_id = ?', (monday, *key)
+        ).fetchone()[0] == rowids[key]
+    assert con.execute("SELECT COUNT(*) FROM assignments WHERE week_start_date = '2026-05-04'").fetchone()[0] == 1
+    assert repository.get_week_version(con, MONDAY)[0] == 1
+
+def test_unchanged_week_writes_nothing():
+    con = sqlite3.connect(':memory:')
+    create_week_tables(con)
+    con.execute('INSERT INTO assignments VALUES (?, 1, ?, 10)', (str(MONDAY), 'weekly'))
+    old = load_week(con, MONDAY)
+    week = {
+        'assignments': frame('assignments', [(1, 'weekly', 10)]),
+        'assignments_timed': frame('assignments_timed', []),
+        'hours': frame('hours', []),
+    }
+    assert write_changes(con, MONDAY, old, week) == 0
+
+def test_stale_week_is_not_written():
+    con = sqlite3.connect(':memory:')
+    create_week_tables(con)
+    con.execute('INSERT INTO assignments VALUES (?, 1, ?, 10)', (str(MONDAY), 'weekly'))
+    con.commit()
+    old = load_week(con, MONDAY)
+    version = repository.get_week_version(con, MONDAY)[0]
+    # another job rewrites the week after it was read
+    with con:
+        con.execute('DELETE FROM assignments')
+        con.execute('INSERT INTO assignments VALUES (?, 2, ?, 10)', (str(MONDAY), 'weekly'))
+        repository.bump_week_versions(con, [MONDAY])
+    week = {
+        'assignments': frame('assignments', [(3, 'weekly', 10)]),
+        'assignments_timed': frame('assignments_timed', []),
+        'hours': frame('hours', []),
+    }
+    with pytest.raises(StaleWeek):
+        write_changes(con, MONDAY, old, week, version)
+    assert week_rows(con, 'assignments') == Counter([(2, 'weekly', 10)])
+
+def concurrent_rewrite(con, monday):
+    # what a full assign_chores of the week does to the rowids: the
+    # rows of the week are written again
+    with con:
+        for table in ('assignments', 'assignments_timed', 'hours'):
+            rows = con.execute(f'SELECT * FROM {table} WHERE week_start_date = ?', (str(monday),)).fetchall()
+            con.execute(f'DELETE FROM {table} WHERE week_start_date = ?', (str(monday),))
+            con.executemany(f"INSERT INTO {table} VALUES ({', '.join('?'*len(rows[0]))})", rows)
+        repository.bump_week_versions(con, [monday])
+
+def test_repair_starts_over_when_the_week_is_rewritten(migrated_db, monkeypatch):
+    con = sqlite3.connect(migrated_db)
+    person_id = con.execute(
+        'SELECT person_id FROM assignments_timed WHERE week_start_date = ? LIMIT 1', (str(MONDAY),)
+    ).fetchone()[0]
+    slots = Counter(row[1:] for row in week_rows(con, 'assignments_timed').elements())
+    untimed = week_rows(con, 'assignments')
+    repository.replace_request(con, MONDAY, person_id, (127, 0, 0, 0, 0, 0, 0))
+    con.commit()
+    repairs = []
+
+    def repair_week(*args):
+        # the week is rewritten while the first repair runs
+        if not repairs:
+            concurrent_rewrite(sqlite3.connect(migrated_db), MONDAY)
+        repairs.append(args)
+        return real_repair_week(*args)
+
+    real_repair_week = reassign.repair_week
+    monkeypatch.setattr(reassign, 'repair_week', repair_week)
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message = reassign_chores(MONDAY, [person_id], database = migrated_db)
+    assert success, message
+    assert len(repairs) == 2
+    timed = week_rows(con, 'assignments_timed')
+    assert not [row for row in timed if row[0] == person_id]
+    # no slot was lost or doubled
+    assert Counter(row[1:] for row in timed.elements()) == slots
+    assert week_rows(con, 'assignments') == untimed
+
+def test_repair_gives_up_on_a_week_that_keeps_changing(migrated_db, monkeypatch):
+    con = sqlite3.connect(migrated_db)
+    person_id = con.execute(
+        'SELECT person_id FROM assignments_timed WHERE week_start_date = ? LIMIT 1', (str(MONDAY),)
+    ).fetchone()[0]
+    real_repair_week = reassign.repair_week
+
+    def repair_week(*args):
+        concurrent_rewrite(sqlite3.connect(migrated_db), MONDAY)
+        return real_repair_week(*args)
+
+    monkeypatch.setattr(reassign, 'repair_week', repair_week)
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message = reassign_chores(MONDAY, [person_id], database = migrated_db)
+    assert not success
+    assert 'changed while it was repaired' in message
+
+def test_repair_after_a_request_change(migrated_db):
+    con = sqlite3.connect(migrated_db)
+    person_id = con.execute(
+        """SELECT person_id FROM assignments_timed WHERE week_start_date = ?
+        GROUP BY person_id ORDER BY COUNT(*) DESC LIMIT 1""", (str(MONDAY),)
+    ).fetchone()[0]
+    slots = Counter(
+        row[1:] for row in week_rows(con, 'assignments_timed').elements()
+    )
+    untimed = week_rows(con, 'assignments')
+    # in town all week but for none of the daily chores
+    repository.replace_request(con, MONDAY, person_id, (127, 0, 0, 0, 0, 0, 0))
+    con.commit()
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message = reassign_chores(MONDAY, [person_id], database = con)
+    assert success, message
+    assert 'rows changed' in message
+    timed = week_rows(con, 'assignments_timed')
+    assert not [row for row in timed if row[0] == person_id]
+    # every released slot went to somebody else
+    assert Counter(row[1:] for row in timed.elements()) == slots
+    assert week_rows(con, 'assignments') == untimed
+
+def test_requests_form_queues_the_repair(migrated_db):
+    import chore_chart
+    client = chore_chart.create_app(DATABASE = migrated_db, SQLITE_WAL = False).test_client()
+    con = sqlite3.connect(migrated_db)
+    person_id = con.execute(
+        'SELECT person_id FROM assignments_timed WHERE week_start_date = ? LIMIT 1', (str(MONDAY),)
+    ).fetchone()[0]
+    response = client.post(
+        f'/requests/{person_id}/{MONDAY}',
+        data = {'form_submit': 'Submit', **{f'intown_{day}': 'on' for day in range(7)}}
+    )
+    assert response.status_code == 302
+    assert '/jobs/' in response.location
+    job_id = int(response.location.split('/')[-2])
+    for _ in range(200):
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['state'] in ('done', 'failed'):
+            break
+        time.sleep(.05)
+    assert (job['kind'], job['state']) == ('reassign', 'done'), job['message']
+    assert con.execute('SELECT COUNT(*) FROM pending_repairs').fetchone()[0] == 0
+    assert not con.execute(
+        'SELECT 1 FROM assignments_timed WHERE week_start_date = ? AND person_id = ?',
+        (str(MONDAY), person_id)
+    ).fetchone()
+
+def test_fixed_credits_skip_empty_sections():
+    config = {'weekly': None, 'occasional': [
+        {'chore': 'Shopping', 'person': 'Karen', 'credit': 2},
+        {'chore': 'Compost', 'person': 'Emily'},
+    ]}
+    assert fixed_credits(config) == {('Karen', 'Shopping'): 2, ('Emily', 'Compost'): None}
@@ -0,0 +1,96 @@
+# snapshot dump and restore round trips
+import gzip
+import marshal
+import sqlite3
+import pytest
+import repository
+from maitri_db import open_db, tables
+from snapshot import dump, restore, SNAPSHOT_VERSION
+
+def contents(path):
+    # every row with its rowid, the schema, the sequences and the
+    # schema version of the database
+    con = sqlite3.connect(path)
+    result = {'user_version': con.execute('PRAGMA user_version').fetchone()[0]}
+    for kind, name, sql in con.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall():
+        result[(kind, name)] = sql
+        if kind == 'table':
+            rowid = '' if 'WITHOUT ROWID' in sql.upper() else 'rowid, '
+            result[name] = sorted(
+                con.execute(f'SELECT {rowid}* FROM "{name}"').fetchall(), key = repr
+            )
+    result['sequence'] = sorted(con.execute('SELECT * FROM sqlite_sequence').fetchall())
+    con.close()
+    return result
+
+def test_round_trip(migrated_db, tmp_path):
+    path = str(tmp_path/'chores.snapshot.gz')
+    target = str(tmp_path/'restored.db')
+    counts = dump(migrated_db, path, chunk_rows = 100)
+    assert restore(path, target) == counts
+    assert contents(target) == contents(migrated_db)
+
+def test_every_sqlite_type_round_trips(tmp_path):
+    database = str(tmp_path/'types.db')
+    con = sqlite3.connect(database)
+    rows = [
+        (1, 2**62, .1, 'text', None), (2, -1, 1e300, '{"blob": "AA=="}', b'\x00\xff'),
+        (3, 0, -0.5, '', b''),
+    ]
+    con.execute('CREATE TABLE mixed(id INTEGER PRIMARY KEY, i, r, t, b)')
+    con.executemany('INSERT INTO mixed VALUES (?, ?, ?, ?, ?)', rows)
+    con.commit()
+    con.close()
+    path, target = str(tmp_path/'types.snapshot.gz'), str(tmp_path/'restored.db')
+    dump(database, path)
+    restore(path, target)
+    con = sqlite3.connect(target)
+    restored = con.execute('SELECT * FROM mixed ORDER BY id').fetchall()
+    assert restored == rows
+    assert [tuple(map(type, row)) for row in restored] == [tuple(map(type, row)) for row in rows]
+
+def test_restore_refuses_other_versions(tmp_path):
+    # a marshal snapshot of version 1 and a JSON one of a later version
+    old, later = str(tmp_path/'old.snapshot.gz'), str(tmp_path/'later.snapshot.gz')
+    with gzip.open(old, 'wb') as f:
+        data = marshal.dumps({'version': 1, 'user_version': 0})
+        f.write(len(data).to_bytes(8, 'little') + data)
+    with gzip.open(later, 'wt') as f:
+        f.write(f'{{"version": {SNAPSHOT_VERSION + 1}, "user_version": 0}}\n')
+    for path in (old, later):
+        with pytest.raises(ValueError, match = 'Unknown snapshot version'):
+            restore(path, str(tmp_path/'restored.db'))
+
+def test_restore_refuses_existing_tables(migrated_db, tmp_path):
+    path = str(tmp_path/'chores.snapshot.gz')
+    dump(migrated_db, path)
+    with pytest.raises(sqlite3.OperationalError):
+        restore(path, migrated_db)
+
+def test_replace_bumps_the_versions_past_the_live_ones(migrated_db, tmp_path):
+    path = str(tmp_path/'chores.snapshot.gz')
+    dump(migrated_db, path)
+    con = open_db(migrated_db)
+    # the live database moves on after the snapshot
+    with con:
+        for _ in range(3):
+            repository.bump_catalog_versions(con, 'people')
+        repository.bump_week_versions(con, ['2026-05-11', '2026-05-11'])
+    live = repository.get_catalog_versions(con, tables)
+    live_weeks = repository.get_weeks_version(con)
+    con.close()
+    restore(path, migrated_db, replace = True)
+    con = open_db(migrated_db)
+    restored = repository.get_catalog_versions(con, tables)
+    assert all(new > old for new, old in zip(restored, live))
+    assert repository.get_weeks_version(con)[2] > live_weeks[2]
+    assert min(version for (version,) in con.execute('SELECT version FROM week_versions')) > live_weeks[2]
+    # the rows are those of the snapshot
+    fresh = str(tmp_path/'fresh.db')
+    restore(path, fresh)
+    replaced, expected = contents(migrated_db), contents(fresh)
+    for counters in ('catalog_versions', 'week_versions'):
+        del replaced[counters], expected[counters]
+    assert replaced == expected
@@ -0,0 +1,48 @@
+# the target hours of the people missing from the previous week's
+# hours: no deficit, and the week still plans
+import contextlib
+import io
+import sqlite3
+from datetime import date
+import pandas as pd
+import pytest
+from assign_chores import assign_chores, calc_target_hours
+
+MONDAY = date(2026, 5, 11)
+
+def test_missing_deficit_counts_as_none():
+    people = pd.DataFrame({
+        'load_fraction': [1., 1., .5, 1.], 'parent': [0, 1, 0, 0],
+    }, index = [1, 2, 3, 4])
+    days_in_town = pd.Series([7, 7, 7, 0], index = people.index)
+    # 3 is new this week, 4 is out of town
+    deficit = pd.Series([1.5, -.5, 2.], index = [1, 2, 4])
+    target = calc_target_hours(people, days_in_town, deficit)
+    expected = calc_target_hours(
+        people, days_in_town, pd.Series([1.5, -.5, 0., 0.], index = people.index)
+    )
+    pd.testing.assert_series_equal(target, expected)
+    assert list(target.index) == [1, 2, 3]
+
+@pytest.mark.parametrize('solver', ['greedy', 'optimal'])
+def test_week_plans_without_the_previous_hours(migrated_db, solver):
+    con = sqlite3.connect(migrated_db)
+    previous = con.execute(
+        'SELECT MAX(week_start_date) FROM hours WHERE week_start_date < ?', (str(MONDAY),)
+    ).fetchone()[0]
+    # the people out of town this week and half of the others have no
+    # leftover hours from last week
+    with con:
+        con.execute(
+            """DELETE FROM hours WHERE week_start_date = ? AND (person_id % 2 = 0 OR person_id NOT IN (
+                SELECT person_id FROM requests WHERE week_start_date = ? AND days_in_town > 0))""",
+            (previous, str(MONDAY))
+        )
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message = assign_chores(MONDAY, solver = solver, database = migrated_db)
+    assert success, message
+    # and they work this week
+    assert con.execute(
+        """SELECT COUNT(*) FROM hours WHERE week_start_date = ? AND person_id % 2 = 0
+        AND target_hours > 0""", (str(MONDAY),)
+    ).fetchone()[0] > 0
@@ -0,0 +1,57 @@
+# the add and edit forms of the tasks: a new task with its preferences,
+# and the forms refused before anything is written
+import sqlite3
+import pytest
+
+NEW = {
+    'weekly': {'name': 'Wash Windows', 'duration': '0.5'},
+    'occasional': {'name': 'Wash Windows', 'duration': '0.5', 'frequency': '4'},
+    'seasonal': {'name': 'Wash Windows', 'duration': '0.5', 'frequency': '30',
+                 'season_start': '2026/04', 'season_end': '2026/10'},
+}
+
+@pytest.fixture
+def client(migrated_db):
+    import chore_chart
+    return chore_chart.create_app(DATABASE = migrated_db, SQLITE_WAL = False).test_client()
+
+def count(migrated_db, task_type):
+    con = sqlite3.connect(migrated_db)
+    return con.execute(f'SELECT COUNT(*) FROM {task_type}_tasks').fetchone()[0]
+
+@pytest.mark.parametrize('task_type', NEW)
+def test_add_task(client, migrated_db, task_type):
+    before = count(migrated_db, task_type)
+    response = client.post(f'/add_{task_type}_task', data = NEW[task_type])
+    assert response.status_code == 302
+    assert count(migrated_db, task_type) == before + 1
+    con = sqlite3.connect(migrated_db)
+    assert con.execute("SELECT COUNT(*) FROM preferences WHERE task = 'Wash Windows'").fetchone()[0] > 0
+
+@pytest.mark.parametrize('task_type, field, value', [
+    ('weekly', 'name', None), ('weekly', 'name', '  '), ('weekly', 'duration', None),
+    ('weekly', 'duration', 'long'), ('occasional', 'frequency', None),
+    ('seasonal', 'season_end', None),
+])
+def test_add_task_refuses_incomplete_forms(client, migrated_db, task_type, field, value):
+    before = count(migrated_db, task_type)
+    form = dict(NEW[task_type])
+    if value is None:
+        del form[field]
+    else:
+        form[field] = value
+    response = client.post(f'/add_{task_type}_task', data = form)
+    assert response.status_code == 400
+    assert count(migrated_db, task_type) == before
+
+def test_edit_task_refuses_a_bad_field(client, migrated_db):
+    con = sqlite3.connect(migrated_db)
+    task_id, name, duration = con.execute('SELECT id, task, duration_hours FROM weekly_tasks LIMIT 1').fetchone()
+    for field, value in (('name', ''), ('duration', 'long')):
+        response = client.post('/edit_task', data = {'type': 'weekly', 'id': task_id, field: value})
+        assert response.status_code == 400
+    assert con.execute('SELECT task, duration_hours FROM weekly_tasks WHERE id = ?', (task_id,)).fetchone() == (name, duration)
+    # a form with only some of the fields changes only those
+    response = client.post('/edit_task', data = {'type': 'weekly', 'id': task_id, 'duration': '1.5'})
+    assert response.status_code == 302
+    assert con.execute('SELECT task, duration_hours FROM weekly_tasks WHERE id = ?', (task_id,)).fetchone() == (name, 1.5)